@@ -2,6 +2,8 @@
 ASGI config for api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The live viewer-count stream (``apps.analytics.streams``) is answered here,
+ahead of Django's request handling.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
@@ -13,4 +15,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once get_asgi_application() has set Django up.
+from apps.analytics.streams import LiveStreamApp  # noqa: E402
+
+application = LiveStreamApp(django_application)
@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party apps
     'rest_framework',
@@ -46,6 +47,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.analytics.middleware.PageViewTrackingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -184,3 +186,76 @@ CSRF_TRUSTED_ORIGINS = [
     'https://www.budgetndiostory.org',
     'https://budgetndiostory.org',
 ]
+
+# Buffered view counters (apps.content.counters)
+VIEW_COUNTER_BUFFERED = True
+VIEW_COUNTER_FLUSH_INTERVAL = 10  # seconds between batched flushes
+VIEW_COUNTER_MAX_PENDING = 1000  # flush early once this many rows are pending
+
+# Analytics write buffer (apps.analytics.buffer). Set ANALYTICS_BUFFER_SYNC
+# to True in tests to write events in the request.
+ANALYTICS_BUFFER_SYNC = False
+ANALYTICS_BUFFER_MAX_SIZE = 10000  # events held per worker
+ANALYTICS_BUFFER_BATCH_SIZE = 500  # flush once this many events are waiting
+ANALYTICS_BUFFER_FLUSH_INTERVAL = 2  # ...or this many seconds after the first
+ANALYTICS_BUFFER_FULL_POLICY = 'sample'  # 'sample', 'block' or 'drop'
+ANALYTICS_BUFFER_SAMPLE_RATE = 0.1  # share of events kept once past half full
+ANALYTICS_BUFFER_MAX_ATTEMPTS = 5  # flushes an event is retried for after a database error
+
+# Server-side page-view tracking of the public pages
+# (apps.analytics.middleware). ANALYTICS_TRACKED_URL_NAMES overrides which
+# URL names are tracked.
+ANALYTICS_TRACK_PAGE_VIEWS = True
+
+# Analytics rollups (apps.analytics.rollups): leave this many seconds of raw
+# events for the next run, so buffered writes land before they're counted.
+ANALYTICS_ROLLUP_LAG = 300
+
+# Page-view partitions on PostgreSQL (apps.analytics.partitions), maintained
+# by manage_pageview_partitions. Retention of None keeps every month; expired
+# months are dropped, or only detached with RETENTION_ACTION = 'detach'.
+ANALYTICS_PAGEVIEW_PARTITIONS_AHEAD = 3
+ANALYTICS_PAGEVIEW_RETENTION_MONTHS = None
+ANALYTICS_PAGEVIEW_RETENTION_ACTION = 'drop'
+
+# Offline GeoIP (apps.analytics.geoip): path to a MaxMind-format City or
+# Country .mmdb file. Page views without an edge-supplied country are
+# enriched from it when written; backfill_geoip enriches stored rows. None
+# disables lookups.
+GEOIP_DATABASE_PATH = None
+
+# Bot and crawler filtering (apps.analytics.bots) of analytics events:
+# 'rollup' counts bot events per day in BotHitDaily instead of writing them,
+# 'drop' discards them and 'keep' writes them like any other. Set
+# ANALYTICS_BOT_NETWORKS ({name: [CIDR, ...]}) to replace the built-in
+# crawler address ranges.
+ANALYTICS_BOT_POLICY = 'rollup'
+ANALYTICS_BOT_FLUSH_INTERVAL = 30  # seconds between writes of the bot counts
+
+# Live viewer counts (apps.analytics.live): visitors seen in the last
+# LIVE_WINDOW seconds. Set LIVE_CACHE to the alias of a shared cache to sum
+# counts over every worker; None counts each process on its own.
+ANALYTICS_LIVE_WINDOW = 300
+ANALYTICS_LIVE_CACHE = None
+ANALYTICS_LIVE_STREAM_INTERVAL = 5  # seconds between checks of an SSE stream
+
+# Cold storage of raw analytics events (apps.analytics.archive), run by
+# archive_analytics: days older than ARCHIVE_AFTER_DAYS, and already rolled
+# up, move into compressed files under ARCHIVE_DIR. None disables archiving.
+ANALYTICS_ARCHIVE_DIR = None
+ANALYTICS_ARCHIVE_AFTER_DAYS = 180
+ANALYTICS_ARCHIVE_DELETE_CHUNK = 5000  # rows deleted per transaction
+
+# Staff dashboard stats (apps.core.dashboard_stats): served from cache and
+# refreshed in the background once older than this many seconds.
+DASHBOARD_STATS_FRESH_FOR = 60
+
+# Cache - the per-process default. Cached API fragments are invalidated by
+# signals in the process that made the change, so multi-worker deployments
+# should point this at a shared backend (Redis, Memcached) to invalidate
+# everywhere; other workers otherwise catch up when entries expire.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
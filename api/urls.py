@@ -5,6 +5,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from apps.core.views import api_docs, home, config_page, index
 from apps.core import views_api
+from apps.core.views_home import home_feed_view
 
 urlpatterns = [
     # Admin - must come first to avoid conflicts
@@ -24,6 +25,8 @@ urlpatterns = [
     # API Dashboard - Custom HTML Interface
     path('api/', views_api.APIDashboardView.as_view(), name='api_dashboard'),
     path('api/browser/', views_api.APIBrowserView.as_view(), name='api_browser'),
+    # Composite homepage feed - must come before the endpoint proxy below
+    path('api/v1/home/', home_feed_view, name='api_home_feed'),
     path('api/v1/<str:app_name>/', views_api.APIEndpointProxyView.as_view(), name='api_endpoint'),
     
     # API endpoints (original DRF endpoints)
@@ -5,3 +5,12 @@ class AnalyticsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.analytics'
     verbose_name = 'Analytics & Tracking'
+
+    def ready(self):
+        from .buffer import analytics_buffer
+        from .geoip import enrich_location
+        from .live import live_counter
+        from .models import PageView
+
+        analytics_buffer.add_preprocessor(PageView, enrich_location)
+        analytics_buffer.add_listener(PageView, live_counter.record_page_views)
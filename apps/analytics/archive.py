@@ -0,0 +1,351 @@
+"""
+Cold-storage archival of raw page views and video engagement events.
+
+Raw rows older than ``ANALYTICS_ARCHIVE_AFTER_DAYS`` are moved out of the
+database into one file per table and site-local day, under
+``ANALYTICS_ARCHIVE_DIR``::
+
+    <dir>/pageviews/2026/03/pageviews-2026-03-14.npz
+    <dir>/manifest.json
+
+Each file is a compressed NumPy archive (``np.savez_compressed``) with
+column-oriented arrays. Strings are dictionary-encoded as an array of
+distinct values plus integer codes, timestamps are int64 microseconds
+since the epoch, and UUIDs are 16-byte strings. Nullable columns carry a
+separate null mask. Files load with ``allow_pickle=False``.
+
+A day is only archived after every rollup fed by the table has processed
+it, so removing the raw rows never loses counts. The file is written and
+read back before the source rows are deleted, in chunks of
+``ANALYTICS_ARCHIVE_DELETE_CHUNK`` rows. ``manifest.json`` lists every
+file with its row count and checksum. If a day is archived again (late
+rows, or a run that stopped mid-delete), the new rows go into an extra
+part file rather than replacing the first.
+
+``replay`` loads archived days back into the tables, skipping rows that
+are still there. Rollups keep their counts for archived days, but a
+rebuild (``rollup_analytics --rebuild``) only counts the rows in the
+database: replay the archive before rebuilding.
+"""
+
+import hashlib
+import json
+import os
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.content.models import VideoContent
+from apps.core.exports import stream_rows
+
+from .models import PageView, RollupWatermark, VideoEngagement
+from .rollups import local_today, page_views, site_timezone, video_engagement
+from .watch_time import WATERMARK as WATCH_TIME_WATERMARK, day_bounds
+
+
+DEFAULT_AFTER_DAYS = 180
+DEFAULT_DELETE_CHUNK = 5000
+READ_CHUNK = 5000
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+# table name: (model, watermarks of the rollups that read it)
+TABLES = {
+    'pageviews': (PageView, [page_views.name]),
+    'engagement': (VideoEngagement, [video_engagement.name, WATCH_TIME_WATERMARK]),
+}
+
+INTEGER_TYPES = {
+    'AutoField', 'BigAutoField', 'SmallAutoField', 'IntegerField', 'BigIntegerField',
+    'SmallIntegerField', 'PositiveIntegerField', 'PositiveBigIntegerField', 'PositiveSmallIntegerField',
+}
+
+
+def archive_dir(directory=None):
+    directory = directory or getattr(settings, 'ANALYTICS_ARCHIVE_DIR', None)
+    return Path(directory) if directory else None
+
+
+# Column codec
+
+def _kind(field):
+    while field.is_relation:
+        field = field.target_field
+    internal = field.get_internal_type()
+    if internal == 'UUIDField':
+        return 'uuid'
+    if internal == 'DateTimeField':
+        return 'datetime'
+    if internal in INTEGER_TYPES:
+        return 'int'
+    if internal == 'FloatField':
+        return 'float'
+    if internal == 'JSONField':
+        return 'json'
+    return 'str'
+
+
+class ColumnEncoder:
+    """Accumulates one column's values, chunk by chunk, as NumPy arrays."""
+
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        self.parts = []
+        self.nulls = []
+        self.codes = {}  # distinct string: code
+
+    def add(self, values):
+        size = len(values)
+        self.nulls.append(np.fromiter((value is None for value in values), bool, size))
+        if self.kind == 'uuid':
+            part = np.array([value.bytes if value else b'' for value in values], dtype='S16')
+        elif self.kind == 'datetime':
+            part = np.fromiter(((value - EPOCH) // MICROSECOND if value else 0 for value in values), np.int64, size)
+        elif self.kind == 'int':
+            part = np.fromiter((value or 0 for value in values), np.int64, size)
+        elif self.kind == 'float':
+            part = np.fromiter((value or 0 for value in values), np.float64, size)
+        else:
+            if self.kind == 'json':
+                values = (json.dumps(value, sort_keys=True) if value is not None else '' for value in values)
+            else:
+                values = (value if value is not None else '' for value in values)
+            codes = self.codes
+            part = np.fromiter((codes.setdefault(value, len(codes)) for value in values), np.int32, size)
+        self.parts.append(part)
+
+    def arrays(self):
+        """The arrays to store, keyed for ``np.savez``."""
+        arrays = {self.name: np.concatenate(self.parts)}
+        nulls = np.concatenate(self.nulls)
+        if nulls.any():
+            arrays[f'{self.name}__null'] = nulls
+        if self.kind in ('str', 'json'):
+            arrays[f'{self.name}__values'] = np.array(list(self.codes), dtype=str)
+        return arrays
+
+
+def decode_column(name, kind, arrays, start=0, stop=None):
+    """The Python values of rows ``[start, stop)`` of one column."""
+    data = arrays[name][start:stop]
+    if kind == 'uuid':
+        values = [uuid.UUID(bytes=item.ljust(16, b'\0')) for item in data.tolist()]
+    elif kind == 'datetime':
+        values = [EPOCH + timedelta(microseconds=item) for item in data.tolist()]
+    elif kind in ('int', 'float'):
+        values = data.tolist()
+    else:
+        values = arrays[f'{name}__values'][data].tolist()
+        if kind == 'json':
+            values = [json.loads(value) if value else None for value in values]
+
+    null_key = f'{name}__null'
+    if null_key in arrays:
+        values = [None if null else value for value, null in zip(values, arrays[null_key][start:stop].tolist())]
+    return values
+
+
+def columns(model):
+    return [(field.attname, _kind(field)) for field in model._meta.concrete_fields]
+
+
+# Manifest
+
+def load_manifest(directory):
+    path = directory / MANIFEST
+    if not path.exists():
+        return {'version': FORMAT_VERSION, 'files': []}
+    return json.loads(path.read_text())
+
+
+def save_manifest(directory, manifest):
+    path = directory / MANIFEST
+    temporary = path.with_suffix('.tmp')
+    temporary.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    os.replace(temporary, path)
+
+
+def _checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Archiving
+
+def archivable_until(table, after_days=None):
+    """The first site-local day that must stay in the database."""
+    if after_days is None:
+        after_days = getattr(settings, 'ANALYTICS_ARCHIVE_AFTER_DAYS', DEFAULT_AFTER_DAYS)
+    horizon = local_today() - timedelta(days=after_days)
+
+    _, watermarks = TABLES[table]
+    processed = dict(RollupWatermark.objects.filter(name__in=watermarks).values_list('name', 'processed_until'))
+    if len(processed) < len(watermarks):
+        return None
+    # A day is rolled up once the watermark reaches its end.
+    rolled_up = min(processed.values()).astimezone(site_timezone()).date()
+    return min(horizon, rolled_up)
+
+
+def write_day(directory, table, day, rows, manifest):
+    """Write ``rows`` (tuples in ``columns`` order) to the day's next file.
+
+    Returns the manifest entry and the primary keys written.
+    """
+    model, _ = TABLES[table]
+    fields = columns(model)
+    encoders = [ColumnEncoder(name, kind) for name, kind in fields]
+    ids = []
+    while True:
+        chunk = list(islice(rows, READ_CHUNK))
+        if not chunk:
+            break
+        values = list(zip(*chunk))
+        ids.extend(values[0])
+        for encoder, column in zip(encoders, values):
+            encoder.add(column)
+    if not ids:
+        return None, ids
+
+    arrays = {'__version': np.array(FORMAT_VERSION)}
+    for encoder in encoders:
+        arrays.update(encoder.arrays())
+        encoder.parts = encoder.nulls = None
+
+    parts = sum(1 for entry in manifest['files'] if entry['table'] == table and entry['day'] == day.isoformat())
+    suffix = f'.{parts}' if parts else ''
+    relative = Path(table) / f'{day:%Y}' / f'{day:%m}' / f'{table}-{day.isoformat()}{suffix}.npz'
+    path = directory / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(path.name + '.tmp')
+    with open(temporary, 'wb') as handle:
+        np.savez_compressed(handle, **arrays)
+
+    # Read it back before anything is deleted.
+    with np.load(temporary, allow_pickle=False) as check:
+        if len(check[fields[0][0]]) != len(ids):
+            raise OSError(f'{temporary} did not read back {len(ids)} rows')
+    os.replace(temporary, path)
+
+    entry = {
+        'table': table,
+        'day': day.isoformat(),
+        'path': relative.as_posix(),
+        'rows': len(ids),
+        'bytes': path.stat().st_size,
+        'sha256': _checksum(path),
+        'archived_at': timezone.now().isoformat(),
+    }
+    manifest['files'].append(entry)
+    save_manifest(directory, manifest)
+    return entry, ids
+
+
+def delete_rows(queryset, ids, chunk_size):
+    """Delete the rows of ``queryset`` with ``ids``, ``chunk_size`` at a time."""
+    deleted = 0
+    for start in range(0, len(ids), chunk_size):
+        with transaction.atomic():
+            count, _ = queryset.filter(pk__in=ids[start:start + chunk_size]).delete()
+        deleted += count
+    return deleted
+
+
+def archive_table(table, directory, after_days=None, chunk_size=None, max_days=None, dry_run=False):
+    """Archive and delete expired days of ``table``; yield ``(day, rows)``."""
+    model, _ = TABLES[table]
+    chunk_size = chunk_size or getattr(settings, 'ANALYTICS_ARCHIVE_DELETE_CHUNK', DEFAULT_DELETE_CHUNK)
+    until = archivable_until(table, after_days)
+    if until is None:
+        return
+    manifest = load_manifest(directory)
+    fields = [name for name, _ in columns(model)]
+
+    first = model.objects.filter(created_at__lt=day_bounds(until)[0]).order_by('created_at')
+    first = first.values_list('created_at', flat=True).first()
+    if first is None:
+        return
+    day = first.astimezone(site_timezone()).date()
+    done = 0
+    while day < until and (max_days is None or done < max_days):
+        start, end = day_bounds(day)
+        # Constant bounds, so PostgreSQL only touches the day's partition.
+        rows_of_day = model.objects.filter(created_at__gte=start, created_at__lt=end).order_by()
+        if dry_run:
+            count = rows_of_day.count()
+        else:
+            rows = stream_rows(rows_of_day, fields, READ_CHUNK)
+            _, ids = write_day(directory, table, day, rows, manifest)
+            count = len(ids)
+            delete_rows(rows_of_day, ids, chunk_size)
+        if count:
+            done += 1
+            yield day, count
+        day += timedelta(days=1)
+
+
+# Replay
+
+def archived_files(directory, table, start_day=None, end_day=None):
+    entries = [entry for entry in load_manifest(directory)['files'] if entry['table'] == table]
+    if start_day:
+        entries = [entry for entry in entries if entry['day'] >= start_day.isoformat()]
+    if end_day:
+        entries = [entry for entry in entries if entry['day'] <= end_day.isoformat()]
+    return sorted(entries, key=lambda entry: (entry['day'], entry['path']))
+
+
+def read_file(directory, entry, model, batch_size=READ_CHUNK):
+    """Model instances for the rows in one archived file, in batches."""
+    path = directory / entry['path']
+    if _checksum(path) != entry['sha256']:
+        raise OSError(f'{path} does not match its manifest checksum')
+    with np.load(path, allow_pickle=False) as arrays:
+        arrays = dict(arrays)
+    fields = columns(model)
+    names = [name for name, _ in fields]
+    for start in range(0, entry['rows'], batch_size):
+        data = [decode_column(name, kind, arrays, start, start + batch_size) for name, kind in fields]
+        yield [model(**dict(zip(names, row))) for row in zip(*data)]
+
+
+def _existing(model, ids):
+    return set(model.objects.filter(pk__in={pk for pk in ids if pk}).values_list('pk', flat=True))
+
+
+def replay(directory, table, start_day=None, end_day=None, batch_size=READ_CHUNK):
+    """Insert archived rows back into ``table``; yield ``(day, rows inserted)``.
+
+    Rows still in the table are skipped. Users deleted since archiving are
+    replaced by NULL, as the live rows' ``on_delete`` would have done, and
+    events of deleted videos are left out.
+    """
+    model, _ = TABLES[table]
+    for entry in archived_files(directory, table, start_day, end_day):
+        start, end = day_bounds(date.fromisoformat(entry['day']))
+        present = model.objects.filter(created_at__gte=start, created_at__lt=end)
+        before = present.count()
+        for instances in read_file(directory, entry, model, batch_size):
+            if model is VideoEngagement:
+                videos = _existing(VideoContent, (row.video_id for row in instances))
+                instances = [row for row in instances if row.video_id in videos]
+            users = _existing(User, (row.user_id for row in instances))
+            for row in instances:
+                if row.user_id not in users:
+                    row.user_id = None
+            model.objects.bulk_create(instances, ignore_conflicts=True)
+        yield entry['day'], present.count() - before
@@ -0,0 +1,320 @@
+"""
+Bot and crawler filtering in front of the analytics writes.
+
+A request is a bot's when its user agent contains one of ``BOT_KEYWORDS``
+or its address falls in one of the crawler networks in
+``ANALYTICS_BOT_NETWORKS``. Link-preview fetchers (WhatsApp, X, TikTok,
+Facebook and friends), search engines and scripted clients make up a large
+share of hits on shared links, and counting them as readers inflates page
+views, live counts and ``view_count``.
+
+The keywords are compiled into a single regex, factored on common
+prefixes, so one pass over the user agent both detects a bot and names
+it. Results are memoised per user agent and per address in LRU caches,
+so a repeat visitor costs a dictionary lookup. Network lookups are a
+binary search over sorted, merged address ranges.
+
+``ANALYTICS_BOT_POLICY`` decides what happens to a bot's events:
+
+``'rollup'``
+    Not written; counted per site-local day, bot and event kind in
+    ``BotHitDaily`` instead. Counts are gathered in memory and written a
+    few rows at a time.
+``'drop'``
+    Not written and not counted anywhere.
+``'keep'``
+    Written like any other event, with ``device_type`` ``'bot'`` on page
+    views.
+
+Content view counters skip bots whatever the policy.
+``bot_filter.metrics()`` reports how many events were filtered and how
+many database writes that saved.
+"""
+
+import atexit
+import ipaddress
+import logging
+import re
+import threading
+from bisect import bisect_right
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+
+from .rollups import local_today
+
+
+CACHE_SIZE = 4096
+DEFAULT_POLICY = 'rollup'
+DEFAULT_FLUSH_INTERVAL = 30
+
+# Bot name: lower-case substrings of its user agents. Names end up in
+# BotHitDaily.bot.
+BOT_KEYWORDS = {
+    'whatsapp': ['whatsapp/'],
+    'facebook': ['facebookexternalhit', 'facebookcatalog', 'facebot', 'meta-externalagent'],
+    'twitter': ['twitterbot'],
+    'tiktok': ['bytespider', 'tiktokspider', 'bytedancespider'],
+    'telegram': ['telegrambot'],
+    'linkedin': ['linkedinbot'],
+    'slack': ['slackbot', 'slack-imgproxy'],
+    'discord': ['discordbot'],
+    'pinterest': ['pinterestbot', 'pinterest/'],
+    'skype': ['skypeuripreview'],
+    'google': [
+        'googlebot', 'google-inspectiontool', 'googleother', 'apis-google', 'adsbot-google',
+        'mediapartners-google', 'feedfetcher-google',
+    ],
+    'bing': ['bingbot', 'bingpreview', 'msnbot'],
+    'yandex': ['yandexbot', 'yandeximages', 'yandexmobilebot'],
+    'baidu': ['baiduspider'],
+    'duckduckgo': ['duckduckbot', 'duckassistbot'],
+    'apple': ['applebot'],
+    'seo': ['ahrefsbot', 'semrushbot', 'mj12bot', 'dotbot', 'petalbot', 'dataforseobot', 'blexbot', 'serpstatbot'],
+    'ai': [
+        'gptbot', 'chatgpt-user', 'oai-searchbot', 'claudebot', 'claude-web', 'anthropic-ai', 'ccbot',
+        'perplexitybot', 'amazonbot',
+    ],
+    'monitor': ['uptimerobot', 'pingdom', 'statuscake', 'site24x7', 'better uptime'],
+    'script': ['headlesschrome', 'phantomjs'],
+    'other': ['crawl', 'spider', 'slurp', 'preview', 'headless', 'python-'],
+}
+
+# HTTP libraries, recognised by how their user agent starts.
+SCRIPT_PREFIXES = (
+    'curl/', 'wget/', 'python-requests', 'python-urllib', 'go-http-client', 'okhttp', 'java/', 'axios/',
+    'node-fetch', 'libwww-perl',
+)
+
+KEYWORD_BOTS = {keyword: name for name, keywords in BOT_KEYWORDS.items() for keyword in keywords}
+
+
+def _trie_pattern(words):
+    """A regex matching any of ``words``, factored on common prefixes.
+
+    The regex engine tries each alternative at every position of the
+    string; factored, a position that can't start a keyword fails on its
+    first character.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        optional = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if optional:
+            # Greedy, so the longest keyword wins ('headlesschrome' over 'headless').
+            pattern = f'(?:{pattern})?'
+        return pattern
+
+    return build(trie)
+
+
+# One pass finds the leftmost keyword, or a generic 'bot' word ('Cubot' is a
+# phone brand).
+BOT_RE = re.compile(f'(?P<keyword>{_trie_pattern(KEYWORD_BOTS)})|(?<!cu)bot\\b')
+
+# Crawler networks, from the operators' published lists. Replace them with
+# ANALYTICS_BOT_NETWORKS ({name: [CIDR, ...]}) to keep them current.
+DEFAULT_BOT_NETWORKS = {
+    'google': ['66.249.64.0/19', '2001:4860:4801::/48'],
+    'bing': ['157.55.39.0/24', '207.46.13.0/24', '40.77.167.0/24', '13.66.139.0/24', '13.66.144.0/24'],
+    'facebook': ['69.63.176.0/20', '66.220.144.0/20', '173.252.64.0/18', '31.13.24.0/21'],
+}
+
+KINDS = ('pageview', 'engagement')
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def user_agent_bot(user_agent):
+    """The name of the bot ``user_agent`` belongs to, or ``''``."""
+    if not user_agent:
+        return ''
+    user_agent = user_agent.lower()
+    if user_agent.startswith(SCRIPT_PREFIXES):
+        return 'script'
+    match = BOT_RE.search(user_agent)
+    if match is None:
+        return ''
+    return KEYWORD_BOTS[match['keyword']] if match['keyword'] else 'other'
+
+
+class Networks:
+    """Sorted, non-overlapping address ranges per IP version, searched with bisect."""
+
+    def __init__(self, networks):
+        ranges = {4: [], 6: []}
+        for name, cidrs in networks.items():
+            for cidr in cidrs:
+                network = ipaddress.ip_network(cidr, strict=False)
+                ranges[network.version].append(
+                    (int(network.network_address), int(network.broadcast_address), name)
+                )
+        self.starts, self.ends, self.names = {}, {}, {}
+        for version, items in ranges.items():
+            merged = []
+            for start, end, name in sorted(items):
+                if merged and start <= merged[-1][1]:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], end), merged[-1][2])
+                else:
+                    merged.append((start, end, name))
+            self.starts[version] = [start for start, _, _ in merged]
+            self.ends[version] = [end for _, end, _ in merged]
+            self.names[version] = [name for _, _, name in merged]
+
+    def lookup(self, address):
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return ''
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        value = int(ip)
+        index = bisect_right(self.starts[ip.version], value) - 1
+        if index >= 0 and value <= self.ends[ip.version][index]:
+            return self.names[ip.version][index]
+        return ''
+
+
+@lru_cache(maxsize=1)
+def _networks():
+    return Networks(getattr(settings, 'ANALYTICS_BOT_NETWORKS', None) or DEFAULT_BOT_NETWORKS)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def address_bot(address):
+    """The name of the crawler network ``address`` is in, or ``''``."""
+    if not address:
+        return ''
+    return _networks().lookup(address)
+
+
+def classify(user_agent, address):
+    """The bot a request came from, by user agent then address, or ``''``."""
+    return user_agent_bot(user_agent) or address_bot(address)
+
+
+def request_bot(request):
+    """``classify`` for a request, worked out once per request."""
+    bot = getattr(request, '_analytics_bot', None)
+    if bot is None:
+        bot = classify(request.headers.get('User-Agent', ''), request.META.get('REMOTE_ADDR'))
+        request._analytics_bot = bot
+    return bot
+
+
+class BotFilter:
+    """Applies ``ANALYTICS_BOT_POLICY`` and keeps the ``BotHitDaily`` counts."""
+
+    def __init__(self):
+        self._pending = defaultdict(int)  # (day, bot, kind): hits
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()
+        self._timer = None
+
+    @property
+    def policy(self):
+        return getattr(settings, 'ANALYTICS_BOT_POLICY', DEFAULT_POLICY)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'ANALYTICS_BOT_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+
+    def screen(self, request, kind, events=1):
+        """Whether ``events`` events of ``kind`` from ``request`` should be written.
+
+        Bot events are counted or dropped here, according to the policy.
+        """
+        bot = request_bot(request)
+        if not bot or self.policy == 'keep':
+            return True
+        with self._lock:
+            self._counts['filtered'] += events
+            self._counts[f'filtered_{kind}'] += events
+            if self.policy == 'rollup':
+                self._pending[(local_today(), bot, kind)] += events
+                if self._timer is None:
+                    self._schedule()
+        return False
+
+    def flush(self):
+        """Add the pending counts to ``BotHitDaily``; return the rows touched."""
+        from .models import BotHitDaily
+
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+        written = 0
+        try:
+            for (day, bot, kind), hits in pending.items():
+                rows = BotHitDaily.objects.filter(day=day, bot=bot, kind=kind)
+                if not rows.update(hits=F('hits') + hits):
+                    try:
+                        with transaction.atomic():
+                            BotHitDaily.objects.create(day=day, bot=bot, kind=kind, hits=hits)
+                    except IntegrityError:
+                        # Another worker created the row first.
+                        rows.update(hits=F('hits') + hits)
+                written += 1
+        except Exception:
+            # Put the unwritten counts back for the next flush.
+            with self._lock:
+                for key, hits in list(pending.items())[written:]:
+                    self._pending[key] += hits
+            raise
+        finally:
+            with self._lock:
+                self._counts['rollup_writes'] += written
+        return written
+
+    def _schedule(self):
+        self._timer = threading.Timer(self.flush_interval, self._run)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _run(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Flushing bot hit counts failed; kept for the next flush')
+        finally:
+            connection.close()
+            with self._lock:
+                self._timer = None
+                if self._pending:
+                    self._schedule()
+
+    def metrics(self):
+        with self._lock:
+            counts = dict(self._counts)
+        filtered, rollup_writes = counts.get('filtered', 0), counts.get('rollup_writes', 0)
+        return {
+            'policy': self.policy,
+            'filtered': filtered,
+            **{f'filtered_{kind}': counts.get(f'filtered_{kind}', 0) for kind in KINDS},
+            'rollup_writes': rollup_writes,
+            'writes_avoided': filtered - rollup_writes,
+            'user_agent_cache': user_agent_bot.cache_info()._asdict(),
+        }
+
+
+bot_filter = BotFilter()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        bot_filter.flush()
+    except Exception:
+        logger.exception('Flushing bot hit counts at exit failed')
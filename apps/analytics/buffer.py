@@ -0,0 +1,354 @@
+"""
+In-process write buffer for analytics events.
+
+Page views, video engagement and donor funnel events are put on a bounded
+queue instead of being inserted in the request. A background thread drains
+the queue and writes each batch with ``bulk_create``, once
+``ANALYTICS_BUFFER_BATCH_SIZE`` events are waiting or
+``ANALYTICS_BUFFER_FLUSH_INTERVAL`` seconds after the first one arrived,
+whichever comes first.
+
+When the database can't keep up and the queue fills, the
+``ANALYTICS_BUFFER_FULL_POLICY`` setting decides what happens:
+
+``'sample'``
+    Past half full, keep only ``ANALYTICS_BUFFER_SAMPLE_RATE`` of new
+    events. Drop everything once the queue is full.
+``'block'``
+    Wait up to ``ANALYTICS_BUFFER_BLOCK_TIMEOUT`` seconds for space, then
+    drop.
+``'drop'``
+    Drop new events while the queue is full.
+
+Preprocessors registered with ``add_preprocessor`` run on each event's
+fields in the writer thread just before the insert, which keeps slower
+enrichment (such as GeoIP lookups) off the request path. Listeners
+registered with ``add_listener`` see events as they're submitted, before
+any are sampled out or dropped, and must be cheap.
+
+A failed insert doesn't hold up the rest of the queue. Each model's events
+are written in their own transaction; when the database rejects one
+(``IntegrityError``, ``DataError``, e.g. an engagement event for a video
+deleted since), the events are split in halves until the rejected rows
+are found, and those are dropped and counted as ``failed``. Events that
+fail for any other reason, such as a lost connection, are kept for the
+next flush, at most ``ANALYTICS_BUFFER_MAX_ATTEMPTS`` times.
+
+Whatever is still queued at exit is written by an ``atexit`` hook, so a
+graceful worker restart doesn't lose events. Set
+``ANALYTICS_BUFFER_SYNC = True`` (e.g. in tests) to write every event
+immediately in the calling thread.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DataError, IntegrityError, close_old_connections, connection, transaction
+
+
+DEFAULT_MAX_SIZE = 10000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 2
+DEFAULT_FULL_POLICY = 'sample'
+DEFAULT_SAMPLE_RATE = 0.1
+DEFAULT_BLOCK_TIMEOUT = 0.05
+DEFAULT_MAX_ATTEMPTS = 5
+
+SAMPLE_ABOVE = 0.5  # fraction of max size at which sampling starts
+STOP_TIMEOUT = 10
+
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+class EventBuffer:
+    """A bounded queue of ``(model label, fields)`` pairs with a writer thread."""
+
+    def __init__(self):
+        self._write_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._preprocessors = defaultdict(list)
+        self._listeners = defaultdict(list)
+        self._reset()
+
+    def _reset(self):
+        # Called again in a forked child: the parent's thread didn't survive
+        # the fork, and its queued events belong to the parent.
+        self._pid = os.getpid()
+        self._queue = queue.Queue(maxsize=self.max_size)
+        self._retry = []  # (label, fields, failed attempts)
+        self._thread = None
+        self._stopping = threading.Event()
+        self._counts = defaultdict(int)
+        self._last_flush_seconds = None
+        self._max_flush_seconds = 0.0
+        self._last_flush_at = None
+
+    @property
+    def sync(self):
+        return getattr(settings, 'ANALYTICS_BUFFER_SYNC', False)
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'ANALYTICS_BUFFER_MAX_SIZE', DEFAULT_MAX_SIZE)
+
+    @property
+    def batch_size(self):
+        return getattr(settings, 'ANALYTICS_BUFFER_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'ANALYTICS_BUFFER_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+
+    @property
+    def full_policy(self):
+        return getattr(settings, 'ANALYTICS_BUFFER_FULL_POLICY', DEFAULT_FULL_POLICY)
+
+    @property
+    def sample_rate(self):
+        return getattr(settings, 'ANALYTICS_BUFFER_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)
+
+    @property
+    def block_timeout(self):
+        return getattr(settings, 'ANALYTICS_BUFFER_BLOCK_TIMEOUT', DEFAULT_BLOCK_TIMEOUT)
+
+    @property
+    def max_attempts(self):
+        return getattr(settings, 'ANALYTICS_BUFFER_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+
+    def add_preprocessor(self, model, function):
+        """Run ``function(fields)`` on every ``model`` event before it's written."""
+        self._preprocessors[model._meta.label].append(function)
+
+    def add_listener(self, model, function):
+        """Call ``function(events)`` with every list of ``model`` events submitted."""
+        self._listeners[model._meta.label].append(function)
+
+    def _count(self, name, amount=1):
+        with self._metrics_lock:
+            self._counts[name] += amount
+
+    # Producers
+
+    def submit(self, model, fields):
+        """Queue one event and return whether it was accepted."""
+        return self.submit_many(model, [fields]) == 1
+
+    def submit_many(self, model, events):
+        """Queue ``events`` (dicts of model fields) and return how many were accepted."""
+        if not events:
+            return 0
+        label = model._meta.label
+        self._count('submitted', len(events))
+        for function in self._listeners.get(label, ()):
+            try:
+                function(events)
+            except Exception:
+                # A listener must never cost the event.
+                logger.exception('Analytics buffer listener %r failed', function)
+
+        if self.sync:
+            self._write([(label, fields) for fields in events])
+            self._count('accepted', len(events))
+            return len(events)
+
+        if self._pid != os.getpid():
+            self._reset()
+        self._ensure_thread()
+
+        accepted = 0
+        for fields in events:
+            if self._put((label, fields)):
+                accepted += 1
+        self._count('accepted', accepted)
+        return accepted
+
+    def _put(self, item):
+        policy = self.full_policy
+        if policy == 'sample' and self._queue.qsize() >= self.max_size * SAMPLE_ABOVE:
+            if random.random() >= self.sample_rate:
+                self._count('sampled_out')
+                return False
+        try:
+            if policy == 'block':
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            self._count('dropped')
+            return False
+        return True
+
+    # Consumer
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name='analytics-buffer', daemon=True
+                )
+                self._thread.start()
+
+    def _next_batch(self):
+        """Block until a batch is due and return it (possibly empty)."""
+        batch = []
+        try:
+            item = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return batch
+        deadline = time.monotonic() + self.flush_interval
+        while item is not _STOP:
+            batch.append(item)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.batch_size or remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        try:
+            while not self._stopping.is_set():
+                batch = self._next_batch()
+                if batch or self._retry:
+                    # The thread lives as long as the worker, so honour
+                    # CONN_MAX_AGE and replace broken connections.
+                    close_old_connections()
+                    try:
+                        self._write(batch)
+                    except Exception:
+                        logger.exception('Analytics buffer flush failed')
+        finally:
+            connection.close()
+
+    def _write(self, batch):
+        """Insert ``batch`` plus any events kept from a failed flush."""
+        with self._write_lock:
+            events, self._retry = self._retry + [(label, fields, 0) for label, fields in batch], []
+            if not events:
+                return 0
+
+            by_model = defaultdict(list)
+            for label, fields, attempts in events:
+                by_model[label].append((fields, attempts))
+
+            started = time.perf_counter()
+            written = 0
+            for label, model_events in by_model.items():
+                written += self._insert(apps.get_model(label), model_events)
+            elapsed = time.perf_counter() - started
+
+        with self._metrics_lock:
+            self._counts['written'] += written
+            self._counts['flushes'] += 1
+            self._last_flush_seconds = elapsed
+            self._max_flush_seconds = max(self._max_flush_seconds, elapsed)
+            self._last_flush_at = time.time()
+        return written
+
+    def _insert(self, model, events):
+        """Insert ``(fields, attempts)`` events of ``model`` and return how many were written.
+
+        Called with the write lock held.
+        """
+        label = model._meta.label
+        try:
+            with transaction.atomic():
+                rows = [fields for fields, _ in events]
+                for function in self._preprocessors.get(label, ()):
+                    rows = [function(fields) for fields in rows]
+                model.objects.bulk_create([model(**fields) for fields in rows], batch_size=self.batch_size)
+        except (IntegrityError, DataError) as error:
+            if len(events) > 1:
+                middle = len(events) // 2
+                return self._insert(model, events[:middle]) + self._insert(model, events[middle:])
+            logger.warning('Dropped %s event rejected by the database: %s', label, error)
+            self._count('failed')
+            return 0
+        except Exception:
+            kept = [(label, fields, attempts + 1) for fields, attempts in events if attempts + 1 < self.max_attempts]
+            # Keep the events for the next flush, as long as they fit.
+            room = max(self.max_size - len(self._retry), 0)
+            self._retry.extend(kept[:room])
+            self._count('failed_flushes')
+            self._count('failed', len(events) - len(kept))
+            self._count('dropped', len(kept) - len(kept[:room]))
+            logger.exception(
+                'Writing %d %s events failed; %d kept for the next flush', len(events), label, len(kept[:room])
+            )
+            return 0
+        return len(events)
+
+    def flush(self):
+        """Write everything queued so far in the calling thread."""
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+        return self._write(batch)
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """Stop the writer thread and write whatever is left."""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._stopping.set()
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            thread.join(timeout)
+        return self.flush()
+
+    def metrics(self):
+        with self._metrics_lock:
+            counts = dict(self._counts)
+            last, worst, at = self._last_flush_seconds, self._max_flush_seconds, self._last_flush_at
+        return {
+            'queue_depth': self._queue.qsize(),
+            'max_size': self.max_size,
+            'retry_pending': len(self._retry),
+            'writer_alive': self._thread is not None and self._thread.is_alive(),
+            'submitted': counts.get('submitted', 0),
+            'accepted': counts.get('accepted', 0),
+            'sampled_out': counts.get('sampled_out', 0),
+            'dropped': counts.get('dropped', 0),
+            'failed': counts.get('failed', 0),
+            'written': counts.get('written', 0),
+            'flushes': counts.get('flushes', 0),
+            'failed_flushes': counts.get('failed_flushes', 0),
+            'last_flush_ms': round(last * 1000, 2) if last is not None else None,
+            'max_flush_ms': round(worst * 1000, 2),
+            'last_flush_at': at,
+        }
+
+
+analytics_buffer = EventBuffer()
+
+
+@atexit.register
+def _drain_on_exit():
+    if analytics_buffer._pid != os.getpid():
+        return
+    try:
+        analytics_buffer.stop()
+    except Exception:
+        logger.exception('Writing the analytics buffer at exit failed')
@@ -0,0 +1,233 @@
+"""
+Donor funnel conversion and monthly acquisition cohorts.
+
+A donor reaches a stage the first time a ``DonorFunnel`` event records it.
+Completed donations count as well: the first one reaches ``donation``, the
+second ``retention``. Every donor profile has reached ``awareness`` by the
+time its user joined. Reaching a stage implies the earlier ones, even
+without an event for them, so a donor's furthest stage decides which
+stages they count towards.
+
+``DonorFunnelState`` keeps each donor's furthest stage, the time they first
+reached each stage and their cohort, the month they first reached any
+stage in ``settings.TIME_ZONE``. A refresh recomputes only donors with new
+funnel events or donations since the last one, in a handful of set-based
+queries per batch of donors.
+
+``DonorCohortStage`` then holds, per cohort and for all donors together,
+how many donors reached each stage and the median time from the previous
+stage. It's rebuilt from the state table with NumPy, which costs one row
+per donor rather than a scan of every event. Readers only touch this
+table.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Min, Q, Window
+from django.db.models.functions import Coalesce, RowNumber
+from django.utils import timezone
+
+from apps.accounts.models import DonorProfile
+from apps.sponsors.models import Donation
+
+from .models import DonorCohortStage, DonorFunnel, DonorFunnelState, RollupWatermark
+from .rollups import DEFAULT_LAG, site_timezone
+
+
+STAGES = [stage for stage, _ in DonorFunnel._meta.get_field('stage').choices]
+STAGE_FIELDS = [f'{stage}_at' for stage in STAGES]
+AWARENESS, DONATION, RETENTION = (STAGES.index(stage) for stage in ('awareness', 'donation', 'retention'))
+
+BATCH_SIZE = 5000
+WATERMARK = 'donorfunnel'
+
+
+def _epoch(moment):
+    return moment.timestamp() if moment is not None else np.nan
+
+
+def stage_times(donor_ids):
+    """``(donor ids, times)``: when each donor first reached each stage.
+
+    ``times`` has a row per donor and a column per stage, holding epoch
+    seconds or NaN. Three queries, whatever the number of donors.
+    """
+    profiles = list(DonorProfile.objects.filter(pk__in=donor_ids).values_list('pk', 'user__date_joined'))
+    index = {pk: row for row, (pk, _) in enumerate(profiles)}
+    times = np.full((len(profiles), len(STAGES)), np.nan)
+    times[:, AWARENESS] = [_epoch(joined) for _, joined in profiles]
+
+    def reach(donor_id, stage, moment):
+        row = index.get(donor_id)
+        if row is not None:
+            times[row, stage] = np.fmin(times[row, stage], _epoch(moment))
+
+    firsts = (
+        DonorFunnel.objects.filter(donor_id__in=donor_ids)
+        .values('donor_id', 'stage').annotate(first=Min('created_at'))
+        .values_list('donor_id', 'stage', 'first').order_by()
+    )
+    stage_index = {stage: column for column, stage in enumerate(STAGES)}
+    for donor_id, stage, first in firsts:
+        if stage in stage_index:
+            reach(donor_id, stage_index[stage], first)
+
+    completed_at = Coalesce('completed_at', 'created_at')
+    donations = (
+        Donation.objects.filter(donor_id__in=donor_ids, status=Donation.Status.COMPLETED)
+        .annotate(at=completed_at, number=Window(
+            RowNumber(), partition_by=[F('donor_id')], order_by=[completed_at.asc(), F('id').asc()],
+        ))
+        .filter(number__lte=2)
+        .values_list('donor_id', 'number', 'at').order_by()
+    )
+    for donor_id, number, moment in donations:
+        reach(donor_id, DONATION if number == 1 else RETENTION, moment)
+
+    return [pk for pk, _ in profiles], times
+
+
+def furthest_stages(times):
+    """Index of each row's furthest reached stage (-1 for none)."""
+    reached = ~np.isnan(times)
+    last = len(STAGES) - 1 - np.argmax(reached[:, ::-1], axis=1)
+    return np.where(reached.any(axis=1), last, -1)
+
+
+def _cohorts(times):
+    """First day of the site-local month of each row's earliest stage."""
+    tz = site_timezone()
+    earliest = np.nanmin(times, axis=1)
+    return [
+        datetime.fromtimestamp(moment, tz).date().replace(day=1) for moment in earliest
+    ]
+
+
+def refresh_states(donor_ids):
+    """Recompute the ``DonorFunnelState`` of ``donor_ids``; return how many."""
+    ids, times = stage_times(donor_ids)
+    furthest = furthest_stages(times)
+    tz = site_timezone()
+    states = []
+    for pk, row, stage, cohort in zip(ids, times, furthest, _cohorts(times) if len(ids) else []):
+        states.append(DonorFunnelState(
+            donor_id=pk, cohort=cohort, furthest_stage=STAGES[stage],
+            **{
+                field: None if np.isnan(moment) else datetime.fromtimestamp(moment, tz)
+                for field, moment in zip(STAGE_FIELDS, row)
+            },
+        ))
+    with transaction.atomic():
+        DonorFunnelState.objects.filter(donor_id__in=donor_ids).delete()
+        DonorFunnelState.objects.bulk_create(states, batch_size=BATCH_SIZE)
+    return len(states)
+
+
+def changed_donors(since):
+    """Donors with funnel events or donations since ``since``, and new donors."""
+    changed = DonorFunnel.objects.filter(created_at__gte=since).values_list('donor_id').order_by().union(
+        Donation.objects.filter(Q(created_at__gte=since) | Q(completed_at__gte=since))
+        .values_list('donor_id').order_by(),
+        DonorProfile.objects.filter(funnel_state__isnull=True).values_list('pk').order_by(),
+    )
+    return [pk for pk, in changed]
+
+
+def summarise(cohorts, furthest, times):
+    """``DonorCohortStage`` rows for the whole population and each cohort."""
+    rows = []
+    groups = [(None, np.ones(len(furthest), dtype=bool))]
+    cohorts = np.array(cohorts, dtype='datetime64[D]')
+    groups += [(month.item(), cohorts == month) for month in np.unique(cohorts)]
+
+    # Seconds from each stage to the next, where both times are known.
+    gaps = np.diff(times, axis=1)
+    gaps[gaps < 0] = np.nan
+    for cohort, members in groups:
+        reached = np.bincount(furthest[members][furthest[members] >= 0], minlength=len(STAGES))
+        donors = np.cumsum(reached[::-1])[::-1]
+        for stage, name in enumerate(STAGES):
+            median = None
+            if stage:
+                known = gaps[members, stage - 1]
+                known = known[~np.isnan(known)]
+                median = float(np.median(known)) if len(known) else None
+            rows.append(DonorCohortStage(
+                cohort=cohort, stage=name, donors=int(donors[stage]), median_seconds_from_previous=median,
+            ))
+    return rows
+
+
+def rebuild_cohorts():
+    """Replace ``DonorCohortStage`` from the state table."""
+    states = list(DonorFunnelState.objects.values_list('cohort', 'furthest_stage', *STAGE_FIELDS))
+    stage_index = {stage: column for column, stage in enumerate(STAGES)}
+    cohorts = [state[0] for state in states]
+    furthest = np.array([stage_index.get(state[1], -1) for state in states], dtype=np.int64)
+    times = np.array([[_epoch(moment) for moment in state[2:]] for state in states]).reshape(-1, len(STAGES))
+    rows = summarise(cohorts, furthest, times)
+    with transaction.atomic():
+        DonorCohortStage.objects.all().delete()
+        DonorCohortStage.objects.bulk_create(rows)
+    return rows
+
+
+def refresh_funnel(rebuild=False, now=None):
+    """Bring the funnel tables up to date and return the donors recomputed."""
+    lag = getattr(settings, 'ANALYTICS_ROLLUP_LAG', DEFAULT_LAG)
+    until = (now or timezone.now()) - timedelta(seconds=lag)
+    watermark = None if rebuild else RollupWatermark.objects.filter(name=WATERMARK).first()
+
+    if watermark is None:
+        DonorFunnelState.objects.all().delete()
+        donor_ids = list(DonorProfile.objects.values_list('pk', flat=True))
+    else:
+        donor_ids = changed_donors(watermark.processed_until)
+
+    refreshed = 0
+    for start in range(0, len(donor_ids), BATCH_SIZE):
+        refreshed += refresh_states(donor_ids[start:start + BATCH_SIZE])
+    # Deleted donors take their states with them, so always resummarise.
+    rebuild_cohorts()
+    RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'processed_until': until})
+    return refreshed
+
+
+def funnel_overview(cohorts=True):
+    """Stage counts, conversion rates and median days between stages.
+
+    Returns the stages for all donors and, unless ``cohorts`` is false, for
+    each monthly cohort, newest cohort first.
+    """
+    rows = DonorCohortStage.objects.all()
+    if not cohorts:
+        rows = rows.filter(cohort__isnull=True)
+    groups = {}
+    for cohort, stage, donors, median in rows.values_list(
+        'cohort', 'stage', 'donors', 'median_seconds_from_previous'
+    ):
+        groups.setdefault(cohort, {})[stage] = (donors, median)
+
+    def stages(counts):
+        result, previous = [], None
+        for stage in STAGES:
+            donors, median = counts.get(stage, (0, None))
+            result.append({
+                'stage': stage,
+                'donors': donors,
+                'conversion_rate': round(donors / previous, 4) if previous else None,
+                'median_days_from_previous': round(median / 86400, 1) if median is not None else None,
+            })
+            previous = donors
+        return result
+
+    return {
+        'stages': stages(groups.pop(None, {})),
+        'cohorts': [
+            {'cohort': cohort.strftime('%Y-%m'), 'stages': stages(counts)}
+            for cohort, counts in sorted(groups.items(), reverse=True)
+        ],
+    }
@@ -0,0 +1,263 @@
+"""
+Offline IP geolocation from a MaxMind-format ``.mmdb`` database.
+
+``GEOIP_DATABASE_PATH`` points at a GeoLite2/GeoIP2 City or Country file
+(or any database using the same record layout). The file is memory-mapped,
+so only the pages a lookup touches are read, and the OS shares them between
+worker processes. Results are kept in an LRU cache keyed by IP, because
+the same visitors come back again and again. No network access is
+involved; leave the setting unset to disable enrichment.
+
+The reader implements the MaxMind DB format (version 2) directly: a
+binary search tree over the address bits followed by a data section of
+typed, pointer-compressed values.
+
+A missing or unreadable database disables enrichment rather than failing
+page-view writes: the error is logged once and every lookup comes back
+blank.
+"""
+
+import ipaddress
+import logging
+import mmap
+import struct
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+
+
+METADATA_MARKER = b'\xab\xcd\xefMaxMind.com'
+DATA_SECTION_SEPARATOR = 16
+CACHE_SIZE = 65536  # IPs
+RECORD_CACHE_SIZE = 4096  # decoded records
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidDatabaseError(Exception):
+    pass
+
+
+class Decoder:
+    """Decodes values from an MMDB data section."""
+
+    def __init__(self, buffer, pointer_base=0):
+        self.buffer = buffer
+        self.pointer_base = pointer_base
+
+    def decode(self, offset):
+        """Return ``(value, next offset)`` for the value stored at ``offset``."""
+        buffer = self.buffer
+        control = buffer[offset]
+        offset += 1
+        kind = control >> 5
+
+        if kind == 1:
+            pointer, offset = self._pointer(control, offset)
+            value, _ = self.decode(pointer)
+            return value, offset
+
+        if kind == 0:
+            kind = 7 + buffer[offset]
+            offset += 1
+
+        size = control & 0x1F
+        if size >= 29:
+            extra = size - 28
+            value = int.from_bytes(buffer[offset:offset + extra], 'big')
+            offset += extra
+            size = (29, 285, 65821)[extra - 1] + value
+
+        if kind == 2:
+            end = offset + size
+            return buffer[offset:end].decode('utf-8'), end
+        if kind == 7:
+            result = {}
+            for _ in range(size):
+                key, offset = self.decode(offset)
+                result[key], offset = self.decode(offset)
+            return result, offset
+        if kind == 11:
+            result = []
+            for _ in range(size):
+                item, offset = self.decode(offset)
+                result.append(item)
+            return result, offset
+        if kind in (5, 6, 9, 10):
+            end = offset + size
+            return int.from_bytes(buffer[offset:end], 'big'), end
+        if kind == 8:
+            end = offset + size
+            return int.from_bytes(buffer[offset:end].rjust(4, b'\0'), 'big', signed=True), end
+        if kind == 3:
+            return struct.unpack('>d', buffer[offset:offset + 8])[0], offset + 8
+        if kind == 15:
+            return struct.unpack('>f', buffer[offset:offset + 4])[0], offset + 4
+        if kind == 14:
+            return bool(size), offset
+        if kind == 4:
+            end = offset + size
+            return bytes(buffer[offset:end]), end
+        raise InvalidDatabaseError(f'Unsupported data type {kind} at offset {offset - 1}')
+
+    def _pointer(self, control, offset):
+        buffer = self.buffer
+        length = ((control >> 3) & 0x3) + 1
+        high = control & 0x7
+        raw = int.from_bytes(buffer[offset:offset + length], 'big')
+        if length == 1:
+            pointer = (high << 8) | raw
+        elif length == 2:
+            pointer = ((high << 16) | raw) + 2048
+        elif length == 3:
+            pointer = ((high << 24) | raw) + 526336
+        else:
+            pointer = raw
+        return self.pointer_base + pointer, offset + length
+
+
+class Reader:
+    """A memory-mapped MMDB file."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = self._mmap
+
+        start = buffer.rfind(METADATA_MARKER, max(0, len(buffer) - 128 * 1024))
+        if start == -1:
+            raise InvalidDatabaseError(f'{path} is not a MaxMind DB file')
+        try:
+            self.metadata, _ = Decoder(buffer).decode(start + len(METADATA_MARKER))
+            self.node_count = self.metadata['node_count']
+            self.record_size = self.metadata['record_size']
+            self.ip_version = self.metadata['ip_version']
+        except (IndexError, KeyError, TypeError, ValueError, struct.error) as error:
+            raise InvalidDatabaseError(f'{path} has unreadable metadata: {error!r}')
+        if self.record_size not in (24, 28, 32):
+            raise InvalidDatabaseError(f'Unsupported record size {self.record_size}')
+        self._node_bytes = self.record_size // 4
+        search_tree_size = self.node_count * self._node_bytes
+        self._decoder = Decoder(buffer, search_tree_size + DATA_SECTION_SEPARATOR)
+        self._ipv4_start = self._find_ipv4_start()
+        # Many networks share one record, so decoded records are cached by
+        # offset too, within a bound.
+        self._record_at = lru_cache(maxsize=RECORD_CACHE_SIZE)(self._decode_at)
+
+    def _read_node(self, node, right):
+        buffer = self._mmap
+        base = node * self._node_bytes
+        if self.record_size == 24:
+            offset = base + 3 * right
+            return int.from_bytes(buffer[offset:offset + 3], 'big')
+        if self.record_size == 32:
+            offset = base + 4 * right
+            return int.from_bytes(buffer[offset:offset + 4], 'big')
+        # 28-bit records share the middle byte's nibbles.
+        middle = buffer[base + 3]
+        if right:
+            return ((middle & 0x0F) << 24) | int.from_bytes(buffer[base + 4:base + 7], 'big')
+        return ((middle & 0xF0) << 20) | int.from_bytes(buffer[base:base + 3], 'big')
+
+    def _find_ipv4_start(self):
+        if self.ip_version == 4:
+            return 0
+        # IPv4 addresses live under ::/96 in an IPv6 tree.
+        node = 0
+        for _ in range(96):
+            if node >= self.node_count:
+                break
+            node = self._read_node(node, 0)
+        return node
+
+    def get(self, ip):
+        """The record for ``ip`` (a string or ipaddress object), or ``None``."""
+        address = ipaddress.ip_address(ip)
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if address.version == 6 and self.ip_version == 4:
+            return None
+        packed = address.packed
+        bit_count = len(packed) * 8
+        node = self._ipv4_start if address.version == 4 else 0
+
+        integer = int.from_bytes(packed, 'big')
+        for depth in range(bit_count):
+            if node >= self.node_count:
+                break
+            node = self._read_node(node, (integer >> (bit_count - 1 - depth)) & 1)
+
+        if node == self.node_count:
+            return None
+        if node < self.node_count:
+            raise InvalidDatabaseError('Search tree ended inside the tree')
+        offset = node - self.node_count - DATA_SECTION_SEPARATOR + self._decoder.pointer_base
+        return self._record_at(offset)
+
+    def _decode_at(self, offset):
+        return self._decoder.decode(offset)[0]
+
+    def close(self):
+        self._mmap.close()
+
+
+_reader = None  # (path, Reader or None)
+_reader_lock = threading.Lock()
+_warned = set()
+
+
+def _warn_once(message, *args):
+    if message not in _warned:
+        _warned.add(message)
+        logger.warning(message, *args)
+
+
+def get_reader():
+    """The reader for ``GEOIP_DATABASE_PATH``, or ``None`` if unset or unreadable."""
+    global _reader
+    path = getattr(settings, 'GEOIP_DATABASE_PATH', None)
+    if not path:
+        return None
+    if _reader is None or _reader[0] != path:
+        with _reader_lock:
+            if _reader is None or _reader[0] != path:
+                try:
+                    reader = Reader(path)
+                except (OSError, ValueError, InvalidDatabaseError) as error:
+                    # Not retried until the setting changes or the process restarts.
+                    logger.warning('GeoIP disabled, %s can\'t be read: %s', path, error)
+                    reader = None
+                _reader = (path, reader)
+    return _reader[1]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def locate(ip):
+    """Return ``(country code, city name)`` for ``ip``, blank when unknown."""
+    reader = get_reader()
+    if reader is None or not ip:
+        return '', ''
+    try:
+        record = reader.get(ip)
+    except (IndexError, struct.error, InvalidDatabaseError) as error:
+        _warn_once('GeoIP lookups are failing, the database may be corrupt: %r', error)
+        return '', ''
+    except ValueError:
+        return '', ''
+    if not isinstance(record, dict):
+        return '', ''
+    country = (record.get('country') or record.get('registered_country') or {}).get('iso_code', '')
+    city = (record.get('city') or {}).get('names', {}).get('en', '')
+    return country[:2], city[:100]
+
+
+def enrich_location(fields):
+    """Fill blank ``country``/``city`` in page-view fields from ``ip_address``."""
+    if fields.get('country') or not fields.get('ip_address'):
+        return fields
+    country, city = locate(str(fields['ip_address']))
+    if country:
+        fields['country'] = country
+        fields['city'] = fields.get('city') or city
+    return fields
@@ -0,0 +1,120 @@
+"""
+Page-view ingestion.
+
+Events arrive in batches from ``navigator.sendBeacon`` or ``fetch`` as a
+JSON object or an array of objects. They are checked by a small hand-written
+parser rather than a DRF serializer, which would cost a serializer per event.
+Valid events go to the analytics write buffer (``apps.analytics.buffer``),
+which inserts them in batches off the request path. Events that don't
+validate are dropped one by one; a bad event doesn't reject its batch.
+"""
+
+import json
+import uuid
+from urllib.parse import urlsplit
+
+from django.utils import timezone
+
+from .buffer import analytics_buffer
+from .models import PageView
+from .useragent import parse_user_agent
+
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_EVENTS_PER_REQUEST = 200
+
+# Field name: maximum length, taken from the model.
+STRING_FIELDS = {
+    name: PageView._meta.get_field(name).max_length
+    for name in ('url', 'path', 'content_type', 'session_id', 'referrer')
+}
+
+
+class InvalidPayload(ValueError):
+    pass
+
+
+def _string(event, name):
+    value = event.get(name, '')
+    if not isinstance(value, str):
+        return None
+    return value.strip()
+
+
+def parse_event(event):
+    """Return the ``PageView`` fields for one event, or ``None`` if invalid."""
+    if not isinstance(event, dict):
+        return None
+
+    fields = {}
+    for name, max_length in STRING_FIELDS.items():
+        value = _string(event, name)
+        if value is None or len(value) > max_length:
+            return None
+        fields[name] = value
+
+    if not fields['url'].startswith(('http://', 'https://')):
+        return None
+    if fields['referrer'] and not fields['referrer'].startswith(('http://', 'https://')):
+        return None
+    fields['path'] = fields['path'] or urlsplit(fields['url']).path or '/'
+
+    content_id = event.get('content_id')
+    if content_id:
+        try:
+            content_id = uuid.UUID(str(content_id))
+        except ValueError:
+            return None
+    fields['content_id'] = content_id or None
+    return fields
+
+
+def parse_payload(body):
+    """Decode a request body into a list of valid event field dicts."""
+    if len(body) > MAX_BODY_BYTES:
+        raise InvalidPayload('Payload too large')
+    try:
+        payload = json.loads(body)
+    except (UnicodeDecodeError, ValueError):
+        raise InvalidPayload('Malformed JSON')
+
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list):
+        raise InvalidPayload('Expected an event object or a list of events')
+    if len(payload) > MAX_EVENTS_PER_REQUEST:
+        raise InvalidPayload(f'At most {MAX_EVENTS_PER_REQUEST} events per request')
+
+    return [fields for fields in map(parse_event, payload) if fields is not None]
+
+
+def request_context(request, resolve_user=True):
+    """Fields taken from the request rather than trusted from the client.
+
+    With ``resolve_user=False`` the user is only recorded if something
+    already loaded it during the request; loading it costs a session and a
+    user query.
+    """
+    user_agent = request.headers.get('User-Agent', '')
+    device_type, browser, os = parse_user_agent(user_agent)
+    if resolve_user:
+        user = getattr(request, 'user', None)
+    else:
+        user = getattr(request, '_cached_user', None)
+    return {
+        'ip_address': request.META.get('REMOTE_ADDR') or None,
+        'user_agent': user_agent,
+        'device_type': device_type,
+        'browser': browser,
+        'os': os,
+        # Only resolved when a session cookie came with the request.
+        'user_id': user.pk if user is not None and user.is_authenticated else None,
+    }
+
+
+def record_events(events):
+    """Queue a list of ``PageView`` field dicts and return how many were accepted."""
+    received_at = timezone.now()
+    return analytics_buffer.submit_many(
+        PageView, [{'created_at': received_at, **fields} for fields in events]
+    )
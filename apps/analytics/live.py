@@ -0,0 +1,276 @@
+"""
+Live "currently viewing" counts.
+
+``LiveCounter`` counts, per content item and page, the distinct visitors
+seen in the last ``ANALYTICS_LIVE_WINDOW`` seconds (five minutes by
+default). It's a ring buffer of one-second slots. Each visitor sits in the
+slot of their latest page view, and moves forward when they view the page
+again. When the clock passes a slot, the slot is emptied and its visitors
+are subtracted from the running totals. Recording a view and reading a
+count therefore never scans the window, and nothing touches the database.
+
+Page views reach the counter from the analytics write buffer as they're
+submitted (see ``EventBuffer.add_listener``), whichever way they came in:
+the API, ``/collect/`` or the page-view middleware. Views the buffer
+samples out or drops still count here.
+
+Each process counts its own traffic. With ``ANALYTICS_LIVE_CACHE`` set to
+a cache alias on a shared backend (Redis, Memcached), every process also
+publishes its live slots there once a second, and counts are summed over
+all processes. A visitor whose requests reach two processes is then
+counted in both, so shared counts are a slight overestimate.
+"""
+
+import heapq
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .rollups import visitor_key
+
+
+DEFAULT_WINDOW = 5 * 60
+PUBLISH_INTERVAL = 1  # seconds between publishing to the shared cache
+CACHE_PREFIX = 'analytics:live'
+SITE = '*'  # key counting visitors anywhere on the site
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(content_type='', content_id=None, path=''):
+    """The key counting a content item's viewers, or a page's if it has none."""
+    if content_id:
+        return f'{content_type}:{content_id}'
+    return path
+
+
+def requested_key(params):
+    """The key named by ``content_type`` and ``content_id``, or ``path``.
+
+    Raises ``ValueError`` when neither is given or the id isn't a UUID.
+    """
+    content_id = params.get('content_id')
+    if content_id:
+        return content_key(params.get('content_type', ''), uuid.UUID(content_id))
+    if params.get('path'):
+        return params['path']
+    raise ValueError('content_id or path required')
+
+
+class LiveCounter:
+    """Distinct visitors per key over a sliding window of one-second slots."""
+
+    def __init__(self, window=None):
+        self._window = window
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # Called again in a forked child, which would otherwise publish
+        # under its parent's name.
+        self._pid = os.getpid()
+        self.window = self._window or getattr(settings, 'ANALYTICS_LIVE_WINDOW', DEFAULT_WINDOW)
+        self._now = None  # latest second the slots have been advanced to
+        self._slots = [defaultdict(int) for _ in range(self.window)]  # key: visitors
+        self._members = [set() for _ in range(self.window)]  # (key, visitor)
+        self._last_seen = {}  # (key, visitor): second
+        self._totals = defaultdict(int)
+        self._published_at = 0
+        self._timer = None
+        self._merged = None  # (second, totals) summed over processes
+
+    @property
+    def cache(self):
+        alias = getattr(settings, 'ANALYTICS_LIVE_CACHE', None)
+        return caches[alias] if alias else None
+
+    @property
+    def worker(self):
+        return f'{socket.gethostname()}:{self._pid}'
+
+    def _advance(self, second):
+        """Empty the slots the clock has passed since the last call."""
+        if self._now is not None and second <= self._now:
+            return
+        first = second - self.window + 1
+        if self._now is not None:
+            first = max(first, self._now + 1)
+        for passed in range(first, second + 1):
+            index = passed % self.window
+            for key, count in self._slots[index].items():
+                self._totals[key] -= count
+                if not self._totals[key]:
+                    del self._totals[key]
+            for member in self._members[index]:
+                del self._last_seen[member]
+            self._slots[index].clear()
+            self._members[index].clear()
+        self._now = second
+
+    def _hit(self, key, visitor, second):
+        member = (key, visitor)
+        previous = self._last_seen.get(member)
+        if previous is None:
+            self._totals[key] += 1
+        elif previous >= second:
+            return
+        else:
+            slot = self._slots[previous % self.window]
+            slot[key] -= 1
+            if not slot[key]:
+                del slot[key]
+            self._members[previous % self.window].discard(member)
+        index = second % self.window
+        self._slots[index][key] += 1
+        self._members[index].add(member)
+        self._last_seen[member] = second
+
+    def record(self, key, visitor, at=None):
+        """Count ``visitor`` as viewing ``key`` (and the site) at ``at``."""
+        self.record_many([(key, visitor)], at)
+
+    def record_many(self, views, at=None):
+        """Count ``(key, visitor)`` pairs seen at ``at`` (default: now)."""
+        if self._pid != os.getpid():
+            self._reset()
+        now = int(time.time())
+        # A view can only be as old as the window allows.
+        second = max(min(int(at) if at is not None else now, now), now - self.window + 1)
+        with self._lock:
+            self._advance(now)
+            for key, visitor in views:
+                self._hit(key, visitor, second)
+                self._hit(SITE, visitor, second)
+        if self.cache is not None:
+            self._schedule()
+
+    def record_page_views(self, events):
+        """Buffer listener: count a batch of ``PageView`` field dicts."""
+        views = []
+        at = None
+        for fields in events:
+            user = fields.get('user')
+            user_id = fields.get('user_id') or (user.pk if user is not None else None)
+            visitor = visitor_key(
+                fields.get('session_id'), user_id, fields.get('ip_address'), fields.get('user_agent', ''),
+            )
+            key = content_key(fields.get('content_type', ''), fields.get('content_id'), fields.get('path', ''))
+            views.append((key, visitor))
+            if fields.get('created_at') is not None:
+                at = fields['created_at'].timestamp()
+        self.record_many(views, at)
+
+    def _local(self, now, key=None):
+        with self._lock:
+            self._advance(now)
+            return dict(self._totals) if key is None else self._totals.get(key, 0)
+
+    # Shared cache
+
+    def _schedule(self):
+        """Publish from a timer thread, ``PUBLISH_INTERVAL`` after the last time at the earliest.
+
+        Never on the request thread, so a cache outage can't fail page views.
+        """
+        now = time.time()
+        with self._lock:
+            if self._timer is not None:
+                return
+            wait = max(self._published_at + PUBLISH_INTERVAL - now, 0)
+            self._timer = threading.Timer(wait, self._run)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _run(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self._publish(int(time.time()))
+        except Exception:
+            # Published again after the next view.
+            logger.exception('Publishing live counts to the cache failed')
+
+    def _publish(self, now):
+        cache = self.cache
+        if cache is None:
+            return
+        with self._lock:
+            self._advance(now)
+            # Non-empty slots only, keyed by second so readers can expire them.
+            slots = {
+                self._now - offset: dict(self._slots[(self._now - offset) % self.window])
+                for offset in range(self.window)
+                if self._slots[(self._now - offset) % self.window]
+            }
+            self._published_at = now
+        cache.set(f'{CACHE_PREFIX}:{self.worker}', slots, timeout=self.window)
+
+        # The worker list is read-modify-write; a lost update is repaired on
+        # the next publish.
+        workers = cache.get(f'{CACHE_PREFIX}:workers') or {}
+        if now - workers.get(self.worker, 0) > self.window // 2:
+            workers = {name: at for name, at in workers.items() if now - at <= self.window}
+            workers[self.worker] = now
+            cache.set(f'{CACHE_PREFIX}:workers', workers, timeout=None)
+
+    def _shared(self, cache, now):
+        merged = self._merged
+        if merged is not None and merged[0] == now:
+            return merged[1]
+        self._publish(now)
+        workers = set(cache.get(f'{CACHE_PREFIX}:workers') or ()) | {self.worker}
+        snapshots = cache.get_many([f'{CACHE_PREFIX}:{name}' for name in workers])
+
+        totals = defaultdict(int)
+        for slots in snapshots.values():
+            for second, counts in slots.items():
+                if second > now - self.window:
+                    for key, count in counts.items():
+                        totals[key] += count
+        totals = {key: count for key, count in totals.items() if count > 0}
+        self._merged = (now, totals)
+        return totals
+
+    # Readers
+
+    def totals(self):
+        """``{key: visitors}`` for every key with viewers right now."""
+        if self._pid != os.getpid():
+            self._reset()
+        now = int(time.time())
+        cache = self.cache
+        if cache is not None:
+            try:
+                return self._shared(cache, now)
+            except Exception:
+                logger.exception('Reading live counts from the cache failed; showing this process only')
+        return self._local(now)
+
+    def viewers(self, key):
+        """Visitors viewing ``key`` right now."""
+        if self.cache is None and self._pid == os.getpid():
+            return self._local(int(time.time()), key)
+        return self.totals().get(key, 0)
+
+    def overview(self, top=10):
+        """Visitors on the site and the ``top`` busiest keys right now."""
+        totals = self.totals()
+        site = totals.get(SITE, 0)
+        busiest = heapq.nlargest(
+            top, ((key, count) for key, count in totals.items() if key != SITE), key=lambda item: item[1],
+        )
+        return {
+            'window_seconds': self.window,
+            'viewers': site,
+            'top': [{'key': key, 'viewers': count} for key, count in busiest],
+        }
+
+
+live_counter = LiveCounter()
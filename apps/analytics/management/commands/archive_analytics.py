@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.analytics.archive import DEFAULT_AFTER_DAYS, DEFAULT_DELETE_CHUNK, TABLES, archive_dir, archive_table
+
+
+class Command(BaseCommand):
+    help = 'Move raw page views and engagement events past the retention horizon into archive files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory', help='Archive directory (default: ANALYTICS_ARCHIVE_DIR)')
+        parser.add_argument(
+            '--older-than-days', type=int,
+            default=getattr(settings, 'ANALYTICS_ARCHIVE_AFTER_DAYS', DEFAULT_AFTER_DAYS),
+            help='Archive site-local days that ended more than this many days ago',
+        )
+        parser.add_argument('--table', choices=list(TABLES), help='Only archive this table')
+        parser.add_argument(
+            '--chunk-size', type=int,
+            default=getattr(settings, 'ANALYTICS_ARCHIVE_DELETE_CHUNK', DEFAULT_DELETE_CHUNK),
+            help='Rows deleted per transaction',
+        )
+        parser.add_argument('--max-days', type=int, help='Stop after archiving this many days per table')
+        parser.add_argument('--dry-run', action='store_true', help='Only report the days that would be archived')
+
+    def handle(self, *args, **options):
+        directory = archive_dir(options['directory'])
+        if directory is None:
+            raise CommandError('ANALYTICS_ARCHIVE_DIR is not set; pass --directory.')
+        directory.mkdir(parents=True, exist_ok=True)
+
+        for table in [options['table']] if options['table'] else TABLES:
+            days = rows = 0
+            for day, count in archive_table(
+                table, directory, after_days=options['older_than_days'], chunk_size=options['chunk_size'],
+                max_days=options['max_days'], dry_run=options['dry_run'],
+            ):
+                days += 1
+                rows += count
+                self.stdout.write(f'{table} {day}: {count} rows{" to archive" if options["dry_run"] else ""}')
+            verb = 'Would archive' if options['dry_run'] else 'Archived'
+            self.stdout.write(self.style.SUCCESS(f'{verb} {rows} {table} rows from {days} days'))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.analytics.geoip import get_reader, locate
+from apps.analytics.models import PageView
+from apps.analytics.views import BadRequest, created_at_filters
+
+
+class Command(BaseCommand):
+    help = 'Fill in country and city of stored page views from the GeoIP database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows read and updated per batch')
+        parser.add_argument('--since', help='Only page views from this day or datetime on')
+        parser.add_argument('--until', help='Only page views up to this day (inclusive) or datetime')
+
+    def handle(self, *args, **options):
+        if get_reader() is None:
+            raise CommandError('GEOIP_DATABASE_PATH is not set.')
+        try:
+            bounds = created_at_filters(options['since'], options['until'])
+        except BadRequest as exc:
+            raise CommandError(exc.detail['date'])
+
+        pending = PageView.objects.filter(
+            country='', ip_address__isnull=False, **bounds,
+        ).only('id', 'ip_address').order_by('id')
+
+        # Walk by primary key so rows without a match aren't fetched again.
+        scanned = updated = 0
+        last_id = None
+        while True:
+            batch = pending if last_id is None else pending.filter(id__gt=last_id)
+            rows = list(batch[:options['batch_size']])
+            if not rows:
+                break
+            last_id = rows[-1].id
+            scanned += len(rows)
+
+            changed = []
+            for row in rows:
+                row.country, row.city = locate(row.ip_address)
+                if row.country:
+                    changed.append(row)
+            PageView.objects.bulk_update(changed, ['country', 'city'])
+            updated += len(changed)
+            self.stdout.write(f'{scanned} scanned, {updated} updated')
+
+        self.stdout.write(self.style.SUCCESS(f'Enriched {updated} of {scanned} page views'))
@@ -0,0 +1,55 @@
+import resource
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.analytics.views import PageViewViewSet, VideoEngagementViewSet
+from apps.core.exports import export_chunks
+from apps.newsletter.views import EmailLogViewSet
+from apps.sponsors.views import DonationViewSet
+
+
+VIEWSETS = {
+    'pageviews': PageViewViewSet,
+    'engagement': VideoEngagementViewSet,
+    'donations': DonationViewSet,
+    'email-logs': EmailLogViewSet,
+}
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+class Command(BaseCommand):
+    help = 'Stream an export to a file (default /dev/null) and report throughput and peak memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=VIEWSETS)
+        parser.add_argument('--type', choices=['csv', 'jsonl'], default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Compress as the export endpoint does for gzip clients')
+        parser.add_argument('--limit', type=int, help='Export at most this many rows')
+        parser.add_argument('--output', default='/dev/null')
+
+    def handle(self, *args, **options):
+        viewset = VIEWSETS[options['table']]
+        queryset = viewset.queryset.model.objects.order_by(*viewset.export_ordering)
+        if options['limit']:
+            queryset = queryset[:options['limit']]
+
+        rss_before = peak_rss_mb()
+        started = time.perf_counter()
+        size = 0
+        with open(options['output'], 'wb') as output:
+            for chunk in export_chunks(queryset, viewset.export_fields, options['type'], options['gzip']):
+                output.write(chunk)
+                size += len(chunk)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{size / 1e6:.1f} MB in {elapsed:.1f}s ({size / 1e6 / elapsed:.1f} MB/s); '
+            f'peak RSS {peak_rss_mb():.0f} MB (was {rss_before:.0f} MB before the export)'
+        ))
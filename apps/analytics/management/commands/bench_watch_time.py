@@ -0,0 +1,123 @@
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.analytics.watch_time import (
+    COMPLETE, COMPLETE_AT, MAX_PLAYBACK_RATE, PAUSE, PLAY, SEEK, SESSION_GAP, session_stats,
+)
+
+
+def synthetic_events(count, duration, rng):
+    """Plausible play/pause/seek/complete streams, about eight events a session."""
+    lengths = rng.integers(2, 15, size=count // 2 + 1)
+    lengths = lengths[:np.searchsorted(np.cumsum(lengths), count) + 1]
+    sessions = np.repeat(np.arange(len(lengths)), lengths)[:count]
+    first = np.r_[True, sessions[1:] != sessions[:-1]]
+
+    kinds = rng.choice([PLAY, PAUSE, SEEK, COMPLETE], size=count, p=[0.4, 0.3, 0.2, 0.1]).astype(np.int8)
+    kinds[first] = PLAY
+    gaps = rng.exponential(40.0, size=count)
+    starts = rng.uniform(0, 86400, size=len(lengths))
+    times = np.cumsum(gaps)
+    times += (starts - times[first] + gaps[first])[sessions]
+    # Positions follow the wall clock from the session start; seeks jump.
+    since_start = times - times[first][np.cumsum(first) - 1]
+    positions = np.where(
+        kinds == SEEK, rng.integers(0, duration, size=count), np.minimum(np.floor(since_start), duration)
+    )
+    # In time order, as they're loaded from the database.
+    order = np.argsort(times, kind='stable')
+    return sessions[order], kinds[order], positions[order], times[order]
+
+
+def reference_stats(sessions, kinds, positions, times, duration):
+    """Event-by-event version of session_stats, for checking it."""
+    streams = defaultdict(list)
+    for index in np.lexsort((times, sessions)):
+        streams[sessions[index]].append((times[index], kinds[index], float(positions[index])))
+
+    viewing, completions, watched = 0, 0, 0.0
+    retention = np.zeros(int(duration), dtype=np.int64)
+    for events in streams.values():
+        runs, run = [], []
+        for event in events:
+            if run and event[0] - run[-1][0] > SESSION_GAP.total_seconds():
+                runs.append(run)
+                run = []
+            run.append(event)
+        runs.append(run)
+
+        for run in runs:
+            playing, start, seconds, furthest = False, 0.0, set(), 0.0
+            played = completed = False
+            for (moment, kind, position), following in zip(run, run[1:] + [None]):
+                if kind == PLAY:
+                    playing, start, played = True, position, True
+                elif kind in (PAUSE, COMPLETE):
+                    playing = False
+                    completed |= kind == COMPLETE
+                elif kind == SEEK and playing:
+                    start = position
+                if playing and following is not None:
+                    elapsed = following[0] - moment
+                    end = following[2] if following[1] in (PAUSE, COMPLETE) else start + elapsed
+                    end = min(max(end, start), start + elapsed * MAX_PLAYBACK_RATE)
+                    lo, hi = min(start, duration), min(end, duration)
+                    watched += hi - lo
+                    furthest = max(furthest, hi)
+                    seconds.update(range(int(np.floor(lo)), int(np.ceil(hi))) if hi > lo else ())
+            if played:
+                viewing += 1
+                completions += completed or furthest >= duration * COMPLETE_AT
+                for second in seconds:
+                    retention[second] += 1
+    return viewing, completions, watched, retention
+
+
+class Command(BaseCommand):
+    help = 'Time the vectorised watch-time engine on synthetic engagement events'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=10_000_000)
+        parser.add_argument('--duration', type=int, default=600, help='Video length in seconds')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--check-events', type=int, default=20000,
+            help='Also compare against an event-by-event implementation on this many events (0 to skip)',
+        )
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        duration = options['duration']
+
+        if options['check_events']:
+            events = synthetic_events(options['check_events'], duration, rng)
+            stats = session_stats(*events, duration=duration)
+            viewing, completions, watched, retention = reference_stats(*events, duration)
+            if (
+                (stats.sessions, stats.completions) != (viewing, completions)
+                or not np.isclose(stats.watch_seconds, watched)
+                or not np.array_equal(stats.retention, retention)
+            ):
+                raise CommandError(
+                    f'Mismatch: sessions {stats.sessions}/{viewing}, completions '
+                    f'{stats.completions}/{completions}, seconds {stats.watch_seconds:.1f}/{watched:.1f}'
+                )
+            self.stdout.write(f'Matches the event-by-event result on {options["check_events"]} events')
+
+        events = synthetic_events(options['events'], duration, rng)
+        started = time.perf_counter()
+        stats = session_stats(*events, duration=duration)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f'{options["events"]} events, {stats.sessions} viewing sessions: '
+            f'average watch time {stats.average_watch_time:.1f}s, '
+            f'completion rate {stats.completion_rate:.1%}, '
+            f'retention at 50% {stats.retention[duration // 2] / max(stats.sessions, 1):.1%}'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Computed in {elapsed:.2f}s ({options["events"] / elapsed / 1e6:.1f}M events/s)'
+        ))
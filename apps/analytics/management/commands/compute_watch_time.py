@@ -0,0 +1,48 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from apps.analytics.watch_time import compute_day, run_watch_time
+
+
+class Command(BaseCommand):
+    help = 'Compute per-video daily watch time, completions and retention from engagement events'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Drop the stored stats and recompute every day')
+        parser.add_argument('--day', help='Recompute only this site-local day (YYYY-MM-DD)')
+        parser.add_argument('--loop', action='store_true', help='Keep running, checking every --interval seconds')
+        parser.add_argument('--interval', type=int, default=3600, help='Seconds between runs with --loop')
+
+    def handle(self, *args, **options):
+        if options['day']:
+            try:
+                day = date.fromisoformat(options['day'])
+            except ValueError:
+                raise CommandError('--day must be YYYY-MM-DD.')
+            sessions = compute_day(day)
+            self.stdout.write(self.style.SUCCESS(f'{day}: {sessions} viewing sessions'))
+            return
+
+        if not options['loop']:
+            self.run_once(rebuild=options['rebuild'])
+            return
+
+        self.stdout.write(f'Computing watch time every {options["interval"]}s...')
+        try:
+            while True:
+                close_old_connections()
+                self.run_once(quiet=True)
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped.')
+
+    def run_once(self, rebuild=False, quiet=False):
+        done = run_watch_time(rebuild=rebuild)
+        if not done and quiet:
+            return
+        for day, sessions in done.items():
+            self.stdout.write(f'{day}: {sessions} viewing sessions')
+        self.stdout.write(self.style.SUCCESS(f'Computed {len(done)} days'))
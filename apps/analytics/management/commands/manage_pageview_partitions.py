@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.analytics.partitions import (
+    DEFAULT_MONTHS_AHEAD, drop_partition, ensure_partitions, expired_partitions, is_partitioned,
+)
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming analytics_pageview partitions and drop or detach expired ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead', type=int,
+            default=getattr(settings, 'ANALYTICS_PAGEVIEW_PARTITIONS_AHEAD', DEFAULT_MONTHS_AHEAD),
+            help='Months of partitions to keep created ahead of the current one',
+        )
+        parser.add_argument(
+            '--retention-months', type=int,
+            default=getattr(settings, 'ANALYTICS_PAGEVIEW_RETENTION_MONTHS', None),
+            help='Expire partitions that ended more than this many months ago (default: keep everything)',
+        )
+        parser.add_argument(
+            '--detach-only', action='store_true',
+            default=getattr(settings, 'ANALYTICS_PAGEVIEW_RETENTION_ACTION', 'drop') == 'detach',
+            help='Detach expired partitions as standalone tables instead of dropping them',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be expired')
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            self.stdout.write('analytics_pageview is not partitioned on this database; nothing to do.')
+            return
+
+        if not options['dry_run']:
+            for name in ensure_partitions(options['months_ahead']):
+                self.stdout.write(f'Created {name}')
+
+        if options['retention_months'] is None:
+            return
+        action = 'Detached' if options['detach_only'] else 'Dropped'
+        for month, name in sorted(expired_partitions(options['retention_months']).items()):
+            if options['dry_run']:
+                self.stdout.write(f'Would expire {name}')
+                continue
+            drop_partition(name, detach_only=options['detach_only'])
+            self.stdout.write(self.style.SUCCESS(f'{action} {name}'))
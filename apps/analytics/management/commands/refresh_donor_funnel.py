@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.analytics.funnel import refresh_funnel
+from apps.core.cache import bump_version
+from apps.core.dashboard_stats import STATS_CACHE_NAMESPACE
+
+
+class Command(BaseCommand):
+    help = 'Recompute donor funnel stages for donors with new activity and rebuild the cohort table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recompute every donor, not just changed ones')
+        parser.add_argument('--loop', action='store_true', help='Keep running, refreshing every --interval seconds')
+        parser.add_argument('--interval', type=int, default=900, help='Seconds between runs with --loop')
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.run_once(rebuild=options['rebuild'])
+            return
+
+        self.stdout.write(f'Refreshing the donor funnel every {options["interval"]}s...')
+        try:
+            while True:
+                close_old_connections()
+                self.run_once(quiet=True)
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped.')
+
+    def run_once(self, rebuild=False, quiet=False):
+        started = time.perf_counter()
+        refreshed = refresh_funnel(rebuild=rebuild)
+        if refreshed:
+            bump_version(STATS_CACHE_NAMESPACE)
+        elif quiet:
+            return
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {refreshed} donors in {elapsed:.2f}s'))
@@ -0,0 +1,36 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.analytics.archive import TABLES, archive_dir, replay
+
+
+class Command(BaseCommand):
+    help = 'Load archived page views or engagement events back into their table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=list(TABLES))
+        parser.add_argument('--directory', help='Archive directory (default: ANALYTICS_ARCHIVE_DIR)')
+        parser.add_argument('--since', help='First site-local day to replay (YYYY-MM-DD)')
+        parser.add_argument('--until', help='Last site-local day to replay (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        directory = archive_dir(options['directory'])
+        if directory is None:
+            raise CommandError('ANALYTICS_ARCHIVE_DIR is not set; pass --directory.')
+        try:
+            since = date.fromisoformat(options['since']) if options['since'] else None
+            until = date.fromisoformat(options['until']) if options['until'] else None
+        except ValueError:
+            raise CommandError('--since and --until must be YYYY-MM-DD.')
+
+        total = 0
+        for day, inserted in replay(directory, options['table'], since, until):
+            total += inserted
+            self.stdout.write(f'{day}: {inserted} rows restored')
+        self.stdout.write(self.style.SUCCESS(f'Restored {total} {options["table"]} rows'))
+        if total:
+            self.stdout.write(
+                'Rollups still hold the counts of the archived days; run rollup_analytics --rebuild '
+                '(or compute_watch_time --rebuild) to recompute them from the restored rows.'
+            )
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.analytics.rollups import run_rollups
+from apps.core.cache import bump_version
+from apps.core.dashboard_stats import STATS_CACHE_NAMESPACE
+
+
+class Command(BaseCommand):
+    help = 'Add page views and video engagement since the last run to the daily rollup tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Drop the rollups and recompute them from the raw tables')
+        parser.add_argument('--loop', action='store_true', help='Keep running, rolling up every --interval seconds')
+        parser.add_argument('--interval', type=int, default=300, help='Seconds between runs with --loop')
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.run_once(rebuild=options['rebuild'])
+            return
+
+        self.stdout.write(f'Rolling up analytics every {options["interval"]}s...')
+        try:
+            while True:
+                close_old_connections()
+                self.run_once(quiet=True)
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped.')
+
+    def run_once(self, rebuild=False, quiet=False):
+        counts = run_rollups(rebuild=rebuild)
+        if any(counts.values()):
+            bump_version(STATS_CACHE_NAMESPACE)
+        elif quiet:
+            return
+        summary = ', '.join(f'{count} {name} rows' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {summary}'))
@@ -0,0 +1,99 @@
+"""
+Server-side page-view tracking for the public HTML pages.
+
+``PageViewTrackingMiddleware`` records a ``PageView`` for every successful
+GET of a URL named in ``ANALYTICS_TRACKED_URL_NAMES``. It fills in the
+device, browser and OS from the user agent (see
+``apps.analytics.useragent``), and the country and city from the edge's
+geolocation headers, falling back to the offline GeoIP database
+(``apps.analytics.geoip``) when the buffer writes the row. Rows go to the
+analytics write buffer, so a tracked request pays for building one dict
+and a queue put, not for an INSERT. Requests from bots and crawlers are
+screened out first (see ``apps.analytics.bots``).
+
+Detail views name the object they rendered with ``track_content(request,
+obj)``, so the middleware needn't look it up again from the URL's slug.
+"""
+
+import hashlib
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.utils import timezone
+
+from .bots import bot_filter
+from .buffer import analytics_buffer
+from .ingest import request_context
+from .models import PageView
+
+
+DEFAULT_TRACKED_URL_NAMES = {
+    'public-videos': '',
+    'public-video-detail': 'video',
+    'public-blog': '',
+    'public-blog-detail': 'post',
+    'donate': '',
+    'newsletter': '',
+    'about': '',
+    'contact': '',
+}
+
+# Geolocation headers set by the platform's edge network, first match wins.
+COUNTRY_HEADERS = ('X-Vercel-IP-Country', 'CF-IPCountry')
+CITY_HEADERS = ('X-Vercel-IP-City',)
+
+
+def track_content(request, instance):
+    """Record ``instance`` as the content a tracked page displayed."""
+    request.tracked_content = instance
+
+
+def _header(request, names):
+    for name in names:
+        value = request.headers.get(name)
+        if value:
+            return unquote(value)
+    return ''
+
+
+class PageViewTrackingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'ANALYTICS_TRACK_PAGE_VIEWS', True)
+        # url name: content type of the object it displays ('' for listings)
+        self.tracked = getattr(settings, 'ANALYTICS_TRACKED_URL_NAMES', DEFAULT_TRACKED_URL_NAMES)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if self.enabled and request.method == 'GET' and response.status_code == 200:
+            match = request.resolver_match
+            if match is not None and match.url_name in self.tracked:
+                self.record(request, self.tracked[match.url_name])
+        return response
+
+    def record(self, request, content_type):
+        if not bot_filter.screen(request, 'pageview'):
+            return
+        instance = getattr(request, 'tracked_content', None)
+        country = _header(request, COUNTRY_HEADERS).upper()
+        fields = {
+            'created_at': timezone.now(),
+            'url': request.build_absolute_uri()[:200],
+            'path': request.path[:500],
+            'content_type': content_type if instance is not None else '',
+            'content_id': instance.pk if instance is not None else None,
+            'session_id': self.session_id(request),
+            'referrer': request.headers.get('Referer', '')[:200],
+            'country': country if len(country) == 2 else '',
+            'city': _header(request, CITY_HEADERS)[:100],
+            **request_context(request, resolve_user=False),
+        }
+        analytics_buffer.submit(PageView, fields)
+
+    def session_id(self, request):
+        # A digest rather than the session key itself, which would let anyone
+        # who can read analytics take over the session.
+        key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        if not key:
+            return ''
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.2 on 2026-10-17 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='pageview',
+            name='analytics_p_created_4c2b45_idx',
+        ),
+        migrations.AddIndex(
+            model_name='pageview',
+            index=models.Index(fields=['-created_at', '-id'], name='analytics_p_created_7020bb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videoengagement',
+            index=models.Index(fields=['-created_at', '-id'], name='analytics_v_created_16151e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videoengagement',
+            index=models.Index(fields=['video', '-created_at'], name='analytics_v_video_i_45bc43_idx'),
+        ),
+    ]
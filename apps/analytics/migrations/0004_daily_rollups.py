@@ -0,0 +1,58 @@
+# Generated by Django 6.0.2 on 2026-10-17 06:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_buffered_created_at'),
+        ('content', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('processed_until', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'analytics_rollup_watermark',
+            },
+        ),
+        migrations.CreateModel(
+            name='PageViewDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('path', models.CharField(max_length=500)),
+                ('content_type', models.CharField(blank=True, max_length=50)),
+                ('content_id', models.UUIDField(blank=True, null=True)),
+                ('country', models.CharField(blank=True, max_length=2)),
+                ('device_type', models.CharField(blank=True, max_length=20)),
+                ('views', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'analytics_pageview_daily',
+                'indexes': [models.Index(fields=['day', 'path'], name='analytics_p_day_a38213_idx'), models.Index(fields=['content_type', 'content_id', 'day'], name='analytics_p_content_27e140_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VideoEngagementDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('event_type', models.CharField(max_length=20)),
+                ('events', models.PositiveIntegerField(default=0)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_engagement', to='content.videocontent')),
+            ],
+            options={
+                'db_table': 'analytics_videoengagement_daily',
+                'indexes': [models.Index(fields=['video', 'day'], name='analytics_v_video_i_f7bb56_idx')],
+                'unique_together': {('day', 'video', 'event_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-17 06:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UniqueVisitorSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('content_type', models.CharField(blank=True, max_length=50)),
+                ('content_id', models.UUIDField(blank=True, null=True)),
+                ('registers', models.BinaryField()),
+            ],
+            options={
+                'db_table': 'analytics_unique_visitor_sketch',
+                'indexes': [models.Index(fields=['content_type', 'content_id', 'day'], name='analytics_u_content_034ce3_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 6.0.2 on 2026-10-17 06:40
+
+import zoneinfo
+from datetime import date, datetime, time
+
+from django.conf import settings
+from django.db import migrations
+
+
+TABLE = 'analytics_pageview'
+LEGACY = 'analytics_pageview_legacy'
+MONTHS_AHEAD = 3
+
+
+def _month_start(month):
+    return datetime.combine(month, time.min, tzinfo=zoneinfo.ZoneInfo(settings.TIME_ZONE))
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_pageviews(apps, schema_editor):
+    """Rebuild analytics_pageview as a table range-partitioned by month.
+
+    Only on PostgreSQL; other databases keep the plain table. See
+    apps.analytics.partitions for how partitions are maintained afterwards.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() "
+            "AND tablename = %s AND indexname <> %s",
+            [TABLE, f'{TABLE}_pkey'],
+        )
+        index_definitions = [definition for definition, in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f'SELECT min(created_at) FROM {TABLE}')
+        oldest = cursor.fetchone()[0]
+
+    schema_editor.execute(f'ALTER TABLE {TABLE} RENAME TO {LEGACY}')
+    schema_editor.execute(f'ALTER INDEX {TABLE}_pkey RENAME TO {LEGACY}_pkey')
+    schema_editor.execute(
+        f'CREATE TABLE {TABLE} (LIKE {LEGACY} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)'
+    )
+    # Unique constraints on a partitioned table must include the partition key.
+    schema_editor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, created_at)')
+    schema_editor.execute(f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT')
+
+    tz = zoneinfo.ZoneInfo(settings.TIME_ZONE)
+    this_month = datetime.now(tz).date().replace(day=1)
+    month = oldest.astimezone(tz).date().replace(day=1) if oldest else this_month
+    while month <= _add_months(this_month, MONTHS_AHEAD):
+        schema_editor.execute(
+            f'CREATE TABLE {TABLE}_p{month.year:04d}_{month.month:02d} PARTITION OF {TABLE} '
+            'FOR VALUES FROM (%s) TO (%s)',
+            [_month_start(month), _month_start(_add_months(month, 1))],
+        )
+        month = _add_months(month, 1)
+
+    schema_editor.execute(f'INSERT INTO {TABLE} SELECT * FROM {LEGACY}')
+    schema_editor.execute(f'DROP TABLE {LEGACY}')
+
+    # Recreated on the parent (and so on every partition) under their old names.
+    for definition in index_definitions:
+        schema_editor.execute(definition)
+    for name, definition in foreign_keys:
+        schema_editor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_unique_visitor_sketches'),
+    ]
+
+    operations = [
+        # Irreversible in place: rolling back leaves the partitioned table,
+        # which the model works with unchanged.
+        migrations.RunPython(partition_pageviews, migrations.RunPython.noop),
+    ]
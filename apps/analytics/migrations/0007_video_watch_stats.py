@@ -0,0 +1,32 @@
+# Generated by Django 6.0.2 on 2026-10-17 09:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_partition_pageview'),
+        ('content', '0004_related_content'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoWatchStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('sessions', models.PositiveIntegerField(default=0)),
+                ('completions', models.PositiveIntegerField(default=0)),
+                ('watch_seconds', models.FloatField(default=0)),
+                ('retention', models.BinaryField(default=bytes)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watch_stats', to='content.videocontent')),
+            ],
+            options={
+                'db_table': 'analytics_video_watch_stats',
+                'indexes': [models.Index(fields=['video', 'day'], name='analytics_v_video_i_8a35e3_idx')],
+                'unique_together': {('day', 'video')},
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.2 on 2026-10-17 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_organizationprofile'),
+        ('analytics', '0007_video_watch_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonorCohortStage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cohort', models.DateField(blank=True, null=True)),
+                ('stage', models.CharField(max_length=50)),
+                ('donors', models.PositiveIntegerField(default=0)),
+                ('median_seconds_from_previous', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'analytics_donor_cohort_stage',
+                'unique_together': {('cohort', 'stage')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DonorFunnelState',
+            fields=[
+                ('donor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='funnel_state', serialize=False, to='accounts.donorprofile')),
+                ('cohort', models.DateField()),
+                ('furthest_stage', models.CharField(max_length=50)),
+                ('awareness_at', models.DateTimeField(blank=True, null=True)),
+                ('interest_at', models.DateTimeField(blank=True, null=True)),
+                ('consideration_at', models.DateTimeField(blank=True, null=True)),
+                ('donation_at', models.DateTimeField(blank=True, null=True)),
+                ('retention_at', models.DateTimeField(blank=True, null=True)),
+                ('advocacy_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'analytics_donor_funnel_state',
+                'indexes': [models.Index(fields=['cohort'], name='analytics_d_cohort_987faa_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-17 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0008_donor_funnel_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BotHitDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bot', models.CharField(max_length=30)),
+                ('kind', models.CharField(max_length=20)),
+                ('hits', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'analytics_bot_hit_daily',
+                'unique_together': {('day', 'bot', 'kind')},
+            },
+        ),
+    ]
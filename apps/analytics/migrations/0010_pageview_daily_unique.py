@@ -0,0 +1,42 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:40
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+BUCKET = ['day', 'path', 'content_type', 'content_id', 'country', 'device_type']
+
+
+def merge_duplicate_buckets(apps, schema_editor):
+    # Fold any bucket written twice into its first row so the constraint
+    # can be added.
+    PageViewDaily = apps.get_model('analytics', 'PageViewDaily')
+    duplicates = (
+        PageViewDaily.objects.values(*BUCKET)
+        .annotate(rows=Count('pk'), keep=Min('pk'), total=Sum('views'))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for bucket in duplicates:
+        rows = PageViewDaily.objects.filter(**{name: bucket[name] for name in BUCKET})
+        rows.exclude(pk=bucket['keep']).delete()
+        rows.filter(pk=bucket['keep']).update(views=bucket['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0009_bot_hit_daily'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_buckets, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='pageviewdaily',
+            name='analytics_p_day_a38213_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='pageviewdaily',
+            constraint=models.UniqueConstraint(fields=('day', 'path', 'content_type', 'content_id', 'country', 'device_type'), name='analytics_pageview_daily_bucket', nulls_distinct=False),
+        ),
+    ]
@@ -31,13 +31,13 @@ class PageView(models.Model):
     country = models.CharField(max_length=2, blank=True)
     city = models.CharField(max_length=100, blank=True)
     
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         db_table = 'analytics_pageview'
         indexes = [
             models.Index(fields=['content_type', 'content_id']),
-            models.Index(fields=['created_at']),
+            models.Index(fields=['-created_at', '-id']),
             models.Index(fields=['path']),
         ]
     
@@ -73,10 +73,14 @@ class VideoEngagement(models.Model):
     timestamp_seconds = models.PositiveIntegerField(default=0)
     metadata = models.JSONField(default=dict, blank=True)
     
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         db_table = 'analytics_videoengagement'
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['video', '-created_at']),
+        ]
 
 
 class DonorFunnel(models.Model):
@@ -99,7 +103,176 @@ class DonorFunnel(models.Model):
     )
     source = models.CharField(max_length=100, blank=True)
     value = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         db_table = 'analytics_donorfunnel'
+
+
+class DonorFunnelState(models.Model):
+    """Each donor's furthest funnel stage and when they first reached each
+    stage (see apps.analytics.funnel)"""
+    donor = models.OneToOneField(
+        'accounts.DonorProfile',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='funnel_state'
+    )
+    cohort = models.DateField()  # first day of the acquisition month
+    furthest_stage = models.CharField(max_length=50)
+    awareness_at = models.DateTimeField(null=True, blank=True)
+    interest_at = models.DateTimeField(null=True, blank=True)
+    consideration_at = models.DateTimeField(null=True, blank=True)
+    donation_at = models.DateTimeField(null=True, blank=True)
+    retention_at = models.DateTimeField(null=True, blank=True)
+    advocacy_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'analytics_donor_funnel_state'
+        indexes = [
+            models.Index(fields=['cohort']),
+        ]
+
+    def __str__(self):
+        return f"{self.donor_id}: {self.furthest_stage}"
+
+
+class DonorCohortStage(models.Model):
+    """Donors of a monthly acquisition cohort (all donors when cohort is
+    null) that reached each funnel stage"""
+    cohort = models.DateField(null=True, blank=True)
+    stage = models.CharField(max_length=50)
+    donors = models.PositiveIntegerField(default=0)
+    median_seconds_from_previous = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'analytics_donor_cohort_stage'
+        unique_together = ['cohort', 'stage']
+
+    def __str__(self):
+        return f"{self.cohort or 'all'} {self.stage}: {self.donors}"
+
+
+class PageViewDaily(models.Model):
+    """Page views per site-local day, path, content, country and device"""
+    day = models.DateField()
+    path = models.CharField(max_length=500)
+    content_type = models.CharField(max_length=50, blank=True)
+    content_id = models.UUIDField(null=True, blank=True)
+    country = models.CharField(max_length=2, blank=True)
+    device_type = models.CharField(max_length=20, blank=True)
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'analytics_pageview_daily'
+        constraints = [
+            # Also serves lookups by day and path. content_id is NULL for
+            # pages that aren't content, and those rows must be unique too.
+            models.UniqueConstraint(
+                fields=['day', 'path', 'content_type', 'content_id', 'country', 'device_type'],
+                name='analytics_pageview_daily_bucket',
+                nulls_distinct=False,
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['content_type', 'content_id', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.path}: {self.views}"
+
+
+class VideoEngagementDaily(models.Model):
+    """Video engagement events per site-local day, video and event type"""
+    day = models.DateField()
+    video = models.ForeignKey(
+        'content.VideoContent',
+        on_delete=models.CASCADE,
+        related_name='daily_engagement'
+    )
+    event_type = models.CharField(max_length=20)
+    events = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'analytics_videoengagement_daily'
+        unique_together = ['day', 'video', 'event_type']
+        indexes = [
+            models.Index(fields=['video', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.video_id} {self.event_type}: {self.events}"
+
+
+class VideoWatchStats(models.Model):
+    """Viewing sessions, completions, watch time and retention per site-local
+    day and video (see apps.analytics.watch_time)"""
+    day = models.DateField()
+    video = models.ForeignKey(
+        'content.VideoContent',
+        on_delete=models.CASCADE,
+        related_name='watch_stats'
+    )
+    sessions = models.PositiveIntegerField(default=0)
+    completions = models.PositiveIntegerField(default=0)
+    watch_seconds = models.FloatField(default=0)
+    # uint32 count of sessions that watched each second of the video
+    retention = models.BinaryField(default=bytes)
+
+    class Meta:
+        db_table = 'analytics_video_watch_stats'
+        unique_together = ['day', 'video']
+        indexes = [
+            models.Index(fields=['video', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.video_id}: {self.sessions} sessions"
+
+
+class UniqueVisitorSketch(models.Model):
+    """HyperLogLog sketch of the visitors of one content item (or the whole
+    site, with a blank content_type) on one site-local day"""
+    day = models.DateField()
+    content_type = models.CharField(max_length=50, blank=True)
+    content_id = models.UUIDField(null=True, blank=True)
+    registers = models.BinaryField()
+
+    class Meta:
+        db_table = 'analytics_unique_visitor_sketch'
+        indexes = [
+            models.Index(fields=['content_type', 'content_id', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.content_type or 'site'} {self.content_id or ''}".strip()
+
+
+class BotHitDaily(models.Model):
+    """Bot and crawler events per site-local day, bot and event kind, counted
+    instead of written (see apps.analytics.bots)"""
+    day = models.DateField()
+    bot = models.CharField(max_length=30)
+    kind = models.CharField(max_length=20)
+    hits = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'analytics_bot_hit_daily'
+        unique_together = ['day', 'bot', 'kind']
+
+    def __str__(self):
+        return f"{self.day} {self.bot} {self.kind}: {self.hits}"
+
+
+class RollupWatermark(models.Model):
+    """How far each rollup has processed its raw table"""
+    name = models.CharField(max_length=50, primary_key=True)
+    processed_until = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'analytics_rollup_watermark'
+
+    def __str__(self):
+        return f"{self.name} until {self.processed_until}"
@@ -0,0 +1,161 @@
+"""
+Monthly range partitions for ``analytics_pageview`` on PostgreSQL.
+
+Migration ``0006_partition_pageview`` turns the table into a table
+partitioned by range on ``created_at``. Each site-local calendar month
+(``settings.TIME_ZONE``) gets its own partition, named
+``analytics_pageview_pYYYY_MM``, and a default partition catches anything
+outside them. Queries bounded on ``created_at`` only scan the months they
+cover, and expiring a month is a metadata-only ``DETACH``/``DROP`` instead
+of a huge ``DELETE``.
+
+The primary key becomes ``(id, created_at)`` because PostgreSQL requires
+the partition key in unique constraints. Django still treats ``id`` as the
+key; UUIDv4 ids don't collide in practice.
+
+``manage_pageview_partitions`` keeps partitions created ahead of time and
+enforces ``ANALYTICS_PAGEVIEW_RETENTION_MONTHS``. On other databases the
+table stays a plain table and the command does nothing.
+"""
+
+import re
+import zoneinfo
+from datetime import date, datetime, time
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import PageView
+from .rollups import page_views
+
+
+PARENT = PageView._meta.db_table
+DEFAULT_PARTITION = f'{PARENT}_default'
+PARTITION_RE = re.compile(rf'^{PARENT}_p(\d{{4}})_(\d{{2}})$')
+
+DEFAULT_MONTHS_AHEAD = 3
+
+
+def partition_name(month):
+    return f'{PARENT}_p{month.year:04d}_{month.month:02d}'
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_start(month):
+    """The first instant of ``month`` in the site time zone."""
+    return datetime.combine(month, time.min, tzinfo=zoneinfo.ZoneInfo(settings.TIME_ZONE))
+
+
+def current_month():
+    today = datetime.now(zoneinfo.ZoneInfo(settings.TIME_ZONE)).date()
+    return today.replace(day=1)
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [PARENT]
+        )
+        row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def existing_partitions():
+    """``{month: table name}`` for the monthly partitions attached to the parent."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            """,
+            [PARENT],
+        )
+        names = [name for name, in cursor.fetchall()]
+    partitions = {}
+    for name in names:
+        match = PARTITION_RE.match(name)
+        if match:
+            partitions[date(int(match[1]), int(match[2]), 1)] = name
+    return partitions
+
+
+def create_partition(month):
+    """Create the partition for ``month``.
+
+    Rows for that month that already landed in the default partition are
+    moved into the new partition; PostgreSQL refuses to attach over them.
+    """
+    name = partition_name(month)
+    lower, upper = month_start(month), month_start(add_months(month, 1))
+    quote = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT EXISTS (SELECT 1 FROM {quote(DEFAULT_PARTITION)} '
+            'WHERE created_at >= %s AND created_at < %s)',
+            [lower, upper],
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                f'CREATE TABLE {quote(name)} PARTITION OF {quote(PARENT)} '
+                'FOR VALUES FROM (%s) TO (%s)',
+                [lower, upper],
+            )
+            return name
+
+        cursor.execute(f'CREATE TABLE {quote(name)} (LIKE {quote(PARENT)} INCLUDING DEFAULTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {quote(DEFAULT_PARTITION)} '
+            'WHERE created_at >= %s AND created_at < %s RETURNING *) '
+            f'INSERT INTO {quote(name)} SELECT * FROM moved',
+            [lower, upper],
+        )
+        cursor.execute(
+            f'ALTER TABLE {quote(PARENT)} ATTACH PARTITION {quote(name)} '
+            'FOR VALUES FROM (%s) TO (%s)',
+            [lower, upper],
+        )
+    return name
+
+
+def ensure_partitions(months_ahead=None):
+    """Create partitions from this month to ``months_ahead`` months out."""
+    if months_ahead is None:
+        months_ahead = getattr(settings, 'ANALYTICS_PAGEVIEW_PARTITIONS_AHEAD', DEFAULT_MONTHS_AHEAD)
+    existing = existing_partitions()
+    start = current_month()
+    return [
+        create_partition(month)
+        for month in (add_months(start, offset) for offset in range(months_ahead + 1))
+        if month not in existing
+    ]
+
+
+def expired_partitions(retention_months):
+    """Partitions that ended before the retention window and are rolled up.
+
+    A month is only expired once the page-view rollup has processed all of
+    it, so dropping raw rows never loses counts.
+    """
+    cutoff = add_months(current_month(), -retention_months)
+    watermark = page_views.watermark()
+    return {
+        month: name
+        for month, name in existing_partitions().items()
+        if month < cutoff and watermark is not None and month_start(add_months(month, 1)) <= watermark
+    }
+
+
+def drop_partition(name, detach_only=False):
+    quote = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {quote(PARENT)} DETACH PARTITION {quote(name)}')
+        if not detach_only:
+            cursor.execute(f'DROP TABLE {quote(name)}')
@@ -0,0 +1,302 @@
+"""
+Incremental daily rollups of the raw analytics tables.
+
+``PageViewDaily`` and ``VideoEngagementDaily`` hold counts per site-local
+day (``settings.TIME_ZONE``, Africa/Nairobi). Each rollup has a
+``RollupWatermark`` row recording how far the raw table has been counted.
+A run only groups the rows created since then and adds them to the
+existing buckets. Each day-sized window is committed in the same
+transaction as its watermark, so an interrupted run never counts a row
+twice.
+
+The watermark trails the clock by ``ANALYTICS_ROLLUP_LAG`` seconds. Events
+are buffered before they're written (see ``apps.analytics.buffer``), and a
+row that lands behind the watermark would never be counted. Readers add
+the raw rows past the watermark (see ``tail``) to get up-to-date totals.
+
+The page-view rollup also maintains ``UniqueVisitorSketch`` rows:
+HyperLogLog sketches of each day's visitors per content item and site-wide
+(see ``apps.analytics.hll``). Unique visitors over a range of days is the
+merge of that range's sketches.
+"""
+
+import zoneinfo
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .hll import HyperLogLog, hash_item
+from .models import (
+    PageView, PageViewDaily, RollupWatermark, UniqueVisitorSketch, VideoEngagement, VideoEngagementDaily,
+)
+
+
+DEFAULT_LAG = 5 * 60
+WINDOW = timedelta(days=1)
+WRITE_BATCH_SIZE = 1000
+
+
+def site_timezone():
+    return zoneinfo.ZoneInfo(settings.TIME_ZONE)
+
+
+def local_today():
+    return timezone.localdate(timezone=site_timezone())
+
+
+class Rollup:
+    """Counts of ``source`` rows grouped by day and ``dimensions`` into ``target``."""
+
+    def __init__(self, name, source, target, dimensions, measure, sketches=None):
+        self.name = name
+        self.source = source
+        self.target = target
+        self.dimensions = dimensions
+        self.measure = measure
+        # Optional extra state built from the same windows; see VisitorSketches.
+        self.sketches = sketches
+
+    def watermark(self):
+        row = RollupWatermark.objects.filter(name=self.name).first()
+        return row.processed_until if row else None
+
+    def grouped(self, start, end):
+        """``{(day, *dimensions): count}`` for raw rows in ``[start, end)``."""
+        rows = (
+            self.source.objects.filter(created_at__gte=start, created_at__lt=end)
+            .annotate(day=TruncDate('created_at', tzinfo=site_timezone()))
+            .values('day', *self.dimensions)
+            .annotate(total=Count('pk'))
+            .order_by()
+        )
+        return {
+            (row['day'], *(row[name] for name in self.dimensions)): row['total']
+            for row in rows
+        }
+
+    def merge(self, counts):
+        """Add ``counts`` to the stored buckets."""
+        days = {key[0] for key in counts}
+        existing = {
+            (row.day, *(getattr(row, name) for name in self.dimensions)): row
+            for row in self.target.objects.filter(day__in=days)
+        }
+        changed, created = [], []
+        for key, total in counts.items():
+            row = existing.get(key)
+            if row is None:
+                created.append(self.target(
+                    day=key[0], **dict(zip(self.dimensions, key[1:])), **{self.measure: total}
+                ))
+            else:
+                setattr(row, self.measure, getattr(row, self.measure) + total)
+                changed.append(row)
+        self.target.objects.bulk_update(changed, [self.measure], batch_size=WRITE_BATCH_SIZE)
+        self.target.objects.bulk_create(created, batch_size=WRITE_BATCH_SIZE)
+
+    def run(self, until):
+        """Roll up everything created before ``until`` and return rows counted."""
+        start = self.watermark()
+        if start is None:
+            first = self.source.objects.order_by('created_at').values_list('created_at', flat=True).first()
+            if first is None:
+                return 0
+            start = first
+
+        counted = 0
+        while start < until:
+            end = min(start + WINDOW, until)
+            with transaction.atomic():
+                # Serialises concurrent runs of the same rollup.
+                watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(
+                    name=self.name, defaults={'processed_until': start}
+                )
+                if watermark.processed_until > start:
+                    # Another run got here first.
+                    start = watermark.processed_until
+                    continue
+                counts = self.grouped(start, end)
+                self.merge(counts)
+                if self.sketches is not None:
+                    self.sketches.add_window(start, end)
+                watermark.processed_until = end
+                watermark.save(update_fields=['processed_until', 'updated_at'])
+            counted += sum(counts.values())
+            start = end
+        return counted
+
+    def rebuild(self, until):
+        """Drop the stored buckets and roll the whole raw table up again."""
+        with transaction.atomic():
+            self.target.objects.all().delete()
+            if self.sketches is not None:
+                self.sketches.clear()
+            RollupWatermark.objects.filter(name=self.name).delete()
+        return self.run(until)
+
+    def tail(self):
+        """Raw rows not rolled up yet."""
+        watermark = self.watermark()
+        if watermark is None:
+            return self.source.objects.all()
+        return self.source.objects.filter(created_at__gte=watermark)
+
+
+def visitor_key(session_id, user_id, ip_address, user_agent):
+    """What identifies a visitor: the session, else the user, else IP and user agent."""
+    if session_id:
+        return f's:{session_id}'
+    if user_id:
+        return f'u:{user_id}'
+    return f'a:{ip_address}|{user_agent}'
+
+
+def visitor_hashes_by_scope(rows):
+    """Group visitor hashes by ``(day, content_type, content_id)``.
+
+    Every row counts towards its content item and towards the site-wide
+    scope ``(day, '', None)``.
+    """
+    tz = site_timezone()
+    scopes = defaultdict(list)
+    for created_at, content_type, content_id, *visitor in rows:
+        day = created_at.astimezone(tz).date()
+        hashed = hash_item(visitor_key(*visitor))
+        scopes[(day, '', None)].append(hashed)
+        if content_type:
+            scopes[(day, content_type, content_id)].append(hashed)
+    return scopes
+
+
+VISITOR_FIELDS = ['created_at', 'content_type', 'content_id', 'session_id', 'user_id', 'ip_address', 'user_agent']
+
+
+class VisitorSketches:
+    """Daily unique-visitor sketches built from page-view windows."""
+
+    def add_window(self, start, end):
+        rows = PageView.objects.filter(created_at__gte=start, created_at__lt=end).order_by()
+        scopes = visitor_hashes_by_scope(rows.values_list(*VISITOR_FIELDS).iterator(chunk_size=5000))
+        if not scopes:
+            return
+
+        existing = {
+            (row.day, row.content_type, row.content_id): row
+            for row in UniqueVisitorSketch.objects.filter(day__in={day for day, _, _ in scopes})
+        }
+        changed, created = [], []
+        for scope, hashes in scopes.items():
+            row = existing.get(scope)
+            sketch = HyperLogLog(row.registers) if row else HyperLogLog()
+            sketch.add_hashes(hashes)
+            if row is None:
+                day, content_type, content_id = scope
+                created.append(UniqueVisitorSketch(
+                    day=day, content_type=content_type, content_id=content_id, registers=sketch.to_bytes()
+                ))
+            else:
+                row.registers = sketch.to_bytes()
+                changed.append(row)
+        UniqueVisitorSketch.objects.bulk_update(changed, ['registers'], batch_size=WRITE_BATCH_SIZE)
+        UniqueVisitorSketch.objects.bulk_create(created, batch_size=WRITE_BATCH_SIZE)
+
+    def clear(self):
+        UniqueVisitorSketch.objects.all().delete()
+
+
+page_views = Rollup(
+    'pageviews', PageView, PageViewDaily,
+    dimensions=['path', 'content_type', 'content_id', 'country', 'device_type'],
+    measure='views',
+    sketches=VisitorSketches(),
+)
+video_engagement = Rollup(
+    'engagement', VideoEngagement, VideoEngagementDaily,
+    dimensions=['video_id', 'event_type'],
+    measure='events',
+)
+
+ROLLUPS = [page_views, video_engagement]
+
+
+def run_rollups(rebuild=False, now=None):
+    """Run every rollup and return ``{name: rows counted}``."""
+    lag = getattr(settings, 'ANALYTICS_ROLLUP_LAG', DEFAULT_LAG)
+    until = (now or timezone.now()) - timedelta(seconds=lag)
+    return {
+        rollup.name: rollup.rebuild(until) if rebuild else rollup.run(until)
+        for rollup in ROLLUPS
+    }
+
+
+# Readers. Each adds the raw rows past the watermark to the rollup totals.
+
+def page_view_summary(top=10):
+    week_start = local_today() - timedelta(days=7)
+    week_start_at = datetime.combine(week_start, time.min, tzinfo=site_timezone())
+    tail = page_views.tail()
+
+    totals = PageViewDaily.objects.aggregate(total=Sum('views'))
+    this_week = PageViewDaily.objects.filter(day__gte=week_start).aggregate(total=Sum('views'))
+    # The overall top pages are among the rollup's top pages and the paths
+    # viewed since the watermark, so only those paths are totalled.
+    recent = dict(tail.values('path').annotate(total=Count('pk')).order_by().values_list('path', 'total'))
+    by_path = Counter(dict(
+        PageViewDaily.objects.values('path').annotate(total=Sum('views'))
+        .order_by('-total', 'path').values_list('path', 'total')[:top]
+    ))
+    by_path.update(dict(
+        PageViewDaily.objects.filter(path__in=recent.keys() - by_path.keys())
+        .values('path').annotate(total=Sum('views')).order_by().values_list('path', 'total')
+    ))
+    by_path.update(recent)
+
+    return {
+        'total_views': (totals['total'] or 0) + tail.count(),
+        'views_this_week': (this_week['total'] or 0) + tail.filter(created_at__gte=week_start_at).count(),
+        'unique_visitors_this_week': unique_visitors(week_start, local_today()),
+        'top_pages': [{'path': path, 'count': count} for path, count in by_path.most_common(top)],
+    }
+
+
+def video_event_counts(video_id):
+    """``{event_type: count}`` for one video, most frequent first."""
+    counts = Counter(dict(
+        VideoEngagementDaily.objects.filter(video_id=video_id)
+        .values('event_type').annotate(total=Sum('events')).values_list('event_type', 'total')
+    ))
+    counts.update(dict(
+        video_engagement.tail().filter(video_id=video_id)
+        .values('event_type').annotate(total=Count('pk')).values_list('event_type', 'total')
+    ))
+    return dict(counts.most_common())
+
+
+def unique_visitors(start_day, end_day, content_type='', content_id=None):
+    """Estimated distinct visitors between two site-local days, inclusive.
+
+    Leave ``content_type`` blank for the whole site.
+    """
+    sketch = HyperLogLog.union(
+        HyperLogLog(registers) for registers in UniqueVisitorSketch.objects.filter(
+            day__range=(start_day, end_day), content_type=content_type, content_id=content_id,
+        ).values_list('registers', flat=True)
+    )
+
+    tz = site_timezone()
+    tail = page_views.tail().filter(
+        created_at__gte=datetime.combine(start_day, time.min, tzinfo=tz),
+        created_at__lt=datetime.combine(end_day + timedelta(days=1), time.min, tzinfo=tz),
+    )
+    if content_type:
+        tail = tail.filter(content_type=content_type, content_id=content_id)
+    sketch.add_hashes([
+        hash_item(visitor_key(*visitor))
+        for visitor in tail.values_list(*VISITOR_FIELDS[3:]).iterator(chunk_size=5000)
+    ])
+    return sketch.count()
@@ -6,7 +6,6 @@ class PageViewSerializer(serializers.ModelSerializer):
     """Serializer for page view analytics"""
     user_email = serializers.EmailField(source='user.email', read_only=True)
     user_name = serializers.SerializerMethodField()
-    device_type_display = serializers.CharField(source='get_device_type_display', read_only=True)
     
     class Meta:
         model = PageView
@@ -14,7 +13,7 @@ class PageViewSerializer(serializers.ModelSerializer):
             'id', 'url', 'path', 'content_type', 'content_id',
             'user', 'user_email', 'user_name', 'session_id',
             'ip_address', 'user_agent', 'referrer',
-            'device_type', 'device_type_display', 'browser', 'os',
+            'device_type', 'browser', 'os',
             'country', 'city', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
@@ -0,0 +1,147 @@
+"""
+Server-Sent Events stream of live viewer counts, served by the ASGI app.
+
+``LiveStreamApp`` wraps the Django ASGI application and answers
+``GET /api/v1/analytics/live/stream/?content_type=...&content_id=...`` (or
+``?path=...``) itself. It sends the item's viewer count when it changes,
+checking every ``ANALYTICS_LIVE_STREAM_INTERVAL`` seconds, and a comment
+line in between so proxies keep the connection open. Each stream stays
+open for at most ``STREAM_MAX_SECONDS``, after which the browser's
+``EventSource`` reconnects by itself.
+
+An open stream costs one coroutine, not a worker thread as it would behind
+Django's request handling. Counts come from ``apps.analytics.live`` in the
+serving process. Set ``ANALYTICS_LIVE_CACHE`` when page views are recorded
+by other processes as well.
+
+The stream is answered before Django's middleware runs, so it adds the
+CORS headers ``corsheaders`` would for an origin allowed by
+``CORS_ALLOWED_ORIGINS`` (or the regex and allow-all settings) itself.
+Browsers would otherwise block an ``EventSource`` opened from the
+front-end's origin.
+"""
+
+import asyncio
+import json
+import re
+import time
+from urllib.parse import parse_qsl
+
+from asgiref.sync import sync_to_async
+from corsheaders.conf import conf as cors
+from django.conf import settings
+
+from .live import live_counter, requested_key
+
+
+STREAM_PATH = '/api/v1/analytics/live/stream/'
+DEFAULT_INTERVAL = 5
+KEEPALIVE_SECONDS = 15
+STREAM_MAX_SECONDS = 10 * 60
+RETRY_MILLISECONDS = 5000
+
+
+def cors_headers(scope):
+    """The CORS response headers for the request's ``Origin``, as ``corsheaders`` sets them."""
+    origin = dict(scope['headers']).get(b'origin', b'').decode('latin-1')
+    headers = [(b'vary', b'origin')]
+    if not origin:
+        return headers
+    allowed = (
+        cors.CORS_ALLOW_ALL_ORIGINS
+        or origin in cors.CORS_ALLOWED_ORIGINS
+        or any(re.match(pattern, origin) for pattern in cors.CORS_ALLOWED_ORIGIN_REGEXES)
+    )
+    if allowed:
+        headers.append((b'access-control-allow-origin', origin.encode('latin-1')))
+        if cors.CORS_ALLOW_CREDENTIALS:
+            headers.append((b'access-control-allow-credentials', b'true'))
+    return headers
+
+
+async def _send_json(send, scope, status, body):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), *cors_headers(scope)],
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps(body).encode()})
+
+
+class LiveStreamApp:
+    def __init__(self, application, path=STREAM_PATH):
+        self.application = application
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] != self.path:
+            return await self.application(scope, receive, send)
+        if scope['method'] == 'OPTIONS':
+            # Preflight, for clients that send custom headers.
+            await send({
+                'type': 'http.response.start',
+                'status': 204,
+                'headers': [
+                    *cors_headers(scope),
+                    (b'access-control-allow-methods', b'GET, OPTIONS'),
+                    (b'access-control-allow-headers', ', '.join(cors.CORS_ALLOW_HEADERS).encode()),
+                    (b'access-control-max-age', str(cors.CORS_PREFLIGHT_MAX_AGE).encode()),
+                ],
+            })
+            return await send({'type': 'http.response.body', 'body': b''})
+        if scope['method'] != 'GET':
+            return await _send_json(send, scope, 405, {'error': 'Method not allowed'})
+        try:
+            key = requested_key(dict(parse_qsl(scope['query_string'].decode('latin-1'))))
+        except ValueError:
+            return await _send_json(send, scope, 400, {'error': 'content_id (a UUID) or path required'})
+        await self.stream(scope, key, receive, send)
+
+    async def stream(self, scope, key, receive, send):
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                # Stop nginx from buffering the stream.
+                (b'x-accel-buffering', b'no'),
+                *cors_headers(scope),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': f'retry: {RETRY_MILLISECONDS}\n\n'.encode(), 'more_body': True})
+
+        disconnected = asyncio.Event()
+
+        async def watch():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+
+        watcher = asyncio.ensure_future(watch())
+        interval = getattr(settings, 'ANALYTICS_LIVE_STREAM_INTERVAL', DEFAULT_INTERVAL)
+        # The shared cache is read over the network; keep it off the event loop.
+        viewers = sync_to_async(live_counter.viewers, thread_sensitive=False)
+        started = sent_at = time.monotonic()
+        last = None
+        try:
+            while not disconnected.is_set() and time.monotonic() - started < STREAM_MAX_SECONDS:
+                count = await viewers(key)
+                if count != last:
+                    data = json.dumps({'viewers': count, 'window_seconds': live_counter.window})
+                    message = f'data: {data}\n\n'
+                elif time.monotonic() - sent_at >= KEEPALIVE_SECONDS:
+                    message = ': keepalive\n\n'
+                else:
+                    message = None
+                if message:
+                    await send({'type': 'http.response.body', 'body': message.encode(), 'more_body': True})
+                    last, sent_at = count, time.monotonic()
+                try:
+                    await asyncio.wait_for(disconnected.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
+            if not disconnected.is_set():
+                await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            watcher.cancel()
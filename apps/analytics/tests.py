@@ -0,0 +1,301 @@
+import asyncio
+import math
+import random
+import tempfile
+import uuid
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from apps.content.models import VideoContent
+
+from . import geoip
+from .buffer import EventBuffer
+from .hll import REGISTERS, HyperLogLog
+from .models import PageView, VideoEngagement, VideoWatchStats
+from .rollups import site_timezone
+from .streams import STREAM_PATH, LiveStreamApp
+from .watch_time import compute_day
+
+
+TESTDATA = Path(__file__).resolve().parent / 'testdata'
+
+
+def page_view(session_id):
+    return {'url': 'https://example.com/a/', 'path': '/a/', 'session_id': session_id}
+
+
+@override_settings(ANALYTICS_BUFFER_SYNC=True, ANALYTICS_BUFFER_MAX_ATTEMPTS=3)
+class EventBufferFailureTests(TransactionTestCase):
+    # Foreign keys are only checked when a transaction commits on SQLite,
+    # so these tests need real transactions.
+
+    def setUp(self):
+        self.buffer = EventBuffer()
+
+    def test_rejected_event_is_dropped_without_holding_up_others(self):
+        missing_video = {'video_id': uuid.uuid4(), 'session_id': 's', 'event_type': 'play'}
+        with self.assertLogs('apps.analytics.buffer', 'WARNING'):
+            self.buffer.submit(VideoEngagement, missing_video)
+        self.buffer.submit_many(PageView, [page_view(str(i)) for i in range(3)])
+
+        self.assertEqual(PageView.objects.count(), 3)
+        self.assertEqual(VideoEngagement.objects.count(), 0)
+        metrics = self.buffer.metrics()
+        self.assertEqual(metrics['failed'], 1)
+        self.assertEqual(metrics['retry_pending'], 0)
+
+    def test_rejected_row_is_found_within_a_batch(self):
+        rows = [page_view(str(i)) for i in range(7)]
+        rows[4]['user_id'] = 999999  # no such user
+        with self.assertLogs('apps.analytics.buffer', 'WARNING'):
+            self.buffer.submit_many(PageView, rows)
+
+        self.assertEqual(
+            sorted(PageView.objects.values_list('session_id', flat=True)), ['0', '1', '2', '3', '5', '6']
+        )
+        self.assertEqual(self.buffer.metrics()['failed'], 1)
+
+    def test_failing_listener_does_not_lose_the_event(self):
+        self.buffer.add_listener(PageView, mock.Mock(side_effect=ConnectionError('cache down')))
+        with self.assertLogs('apps.analytics.buffer', 'ERROR'):
+            self.assertTrue(self.buffer.submit(PageView, page_view('a')))
+        self.assertEqual(PageView.objects.count(), 1)
+
+    def test_transient_failure_is_retried_a_limited_number_of_times(self):
+        with mock.patch.object(PageView.objects, 'bulk_create', side_effect=OperationalError('gone')):
+            with self.assertLogs('apps.analytics.buffer', 'ERROR'):
+                self.buffer.submit(PageView, page_view('a'))
+                self.assertEqual(self.buffer.metrics()['retry_pending'], 1)
+                self.buffer.flush()
+                self.buffer.flush()
+        metrics = self.buffer.metrics()
+        self.assertEqual(metrics['retry_pending'], 0)
+        self.assertEqual(metrics['failed'], 1)
+
+    def test_transient_failure_is_written_on_the_next_flush(self):
+        with mock.patch.object(PageView.objects, 'bulk_create', side_effect=OperationalError('gone')):
+            with self.assertLogs('apps.analytics.buffer', 'ERROR'):
+                self.buffer.submit(PageView, page_view('a'))
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(PageView.objects.count(), 1)
+
+
+class GeoIPReaderTests(SimpleTestCase):
+    # testdata/geoip-{24,28,32}.mmdb hold the same IPv6 tree (IPv4 under
+    # ::/96) in each record size. Kenya's and Uganda's country maps are
+    # shared, reached through a 1-byte and a 2-byte pointer.
+
+    def test_get(self):
+        for record_size in (24, 28, 32):
+            with self.subTest(record_size=record_size):
+                reader = geoip.Reader(TESTDATA / f'geoip-{record_size}.mmdb')
+                self.addCleanup(reader.close)
+                self.assertEqual(reader.record_size, record_size)
+                self.assertEqual(reader.get('41.90.12.1'), {
+                    'city': {'names': {'en': 'Nairobi'}},
+                    'country': {'iso_code': 'KE', 'names': {'en': 'Kenya'}},
+                })
+                self.assertEqual(reader.get('102.134.0.9')['country']['iso_code'], 'UG')
+                self.assertEqual(reader.get('8.8.8.8'), {
+                    'registered_country': {'iso_code': 'US'}, 'traits': {'score': 1.5, 'anycast': True},
+                })
+                self.assertEqual(reader.get('2001:db8::1')['city']['names']['en'], 'Berlin')
+                self.assertEqual(reader.get('::ffff:41.90.12.1')['country']['iso_code'], 'KE')
+                self.assertIsNone(reader.get('1.1.1.1'))
+                self.assertIsNone(reader.get('2001:db9::1'))
+
+    def test_28_bit_records_use_the_middle_nibbles(self):
+        reader = geoip.Reader.__new__(geoip.Reader)
+        reader.record_size, reader._node_bytes = 28, 7
+        left, right = 0xA123456, 0xB654321
+        reader._mmap = bytes.fromhex('123456' 'ab' '654321')
+        self.assertEqual(reader._read_node(0, 0), left)
+        self.assertEqual(reader._read_node(0, 1), right)
+
+    def test_pointer_sizes(self):
+        value = b'\x43abc'  # the UTF-8 string 'abc'
+        buffer = bytearray(600000)
+        for target, pointer in [
+            (0x123, b'\x21\x23'),
+            (2048 + 0x12345, b'\x29\x23\x45'),
+            (526336 + 0x1234, b'\x30\x00\x12\x34'),
+            (0x54321, b'\x38\x00\x05\x43\x21'),
+        ]:
+            with self.subTest(pointer=pointer.hex()):
+                buffer[target:target + len(value)] = value
+                data = bytes(buffer) + pointer
+                decoded, offset = geoip.Decoder(data).decode(len(buffer))
+                self.assertEqual(decoded, 'abc')
+                self.assertEqual(offset, len(data))
+
+    def test_not_a_database(self):
+        with tempfile.NamedTemporaryFile(suffix='.mmdb') as handle:
+            handle.write(b'not a database' * 10)
+            handle.flush()
+            with self.assertRaises(geoip.InvalidDatabaseError):
+                geoip.Reader(handle.name)
+
+
+class LocateTests(SimpleTestCase):
+
+    def setUp(self):
+        geoip.locate.cache_clear()
+        self.addCleanup(geoip.locate.cache_clear)
+
+    @override_settings(GEOIP_DATABASE_PATH=str(TESTDATA / 'geoip-28.mmdb'))
+    def test_locate(self):
+        self.assertEqual(geoip.locate('41.90.12.1'), ('KE', 'Nairobi'))
+        self.assertEqual(geoip.locate('8.8.8.8'), ('US', ''))
+        self.assertEqual(geoip.locate('1.1.1.1'), ('', ''))
+        self.assertEqual(geoip.locate('not an ip'), ('', ''))
+        fields = geoip.enrich_location({'ip_address': '2001:db8::5', 'country': ''})
+        self.assertEqual((fields['country'], fields['city']), ('DE', 'Berlin'))
+
+    def test_missing_database_disables_lookups(self):
+        with override_settings(GEOIP_DATABASE_PATH='/nonexistent/GeoLite2-City.mmdb'):
+            with self.assertLogs('apps.analytics.geoip', 'WARNING'):
+                self.assertEqual(geoip.locate('41.90.12.1'), ('', ''))
+            self.assertEqual(geoip.enrich_location({'ip_address': '41.90.12.2'}), {'ip_address': '41.90.12.2'})
+
+    def test_corrupt_database_disables_lookups(self):
+        with tempfile.NamedTemporaryFile(suffix='.mmdb') as handle:
+            handle.write((TESTDATA / 'geoip-24.mmdb').read_bytes()[:100])
+            handle.flush()
+            with override_settings(GEOIP_DATABASE_PATH=handle.name):
+                with self.assertLogs('apps.analytics.geoip', 'WARNING'):
+                    self.assertEqual(geoip.locate('41.90.12.1'), ('', ''))
+
+    def test_corrupt_records_are_blank(self):
+        data = bytearray((TESTDATA / 'geoip-24.mmdb').read_bytes())
+        reader = geoip.Reader(TESTDATA / 'geoip-24.mmdb')
+        start = reader._decoder.pointer_base
+        reader.close()
+        end = data.rfind(geoip.METADATA_MARKER)
+        data[start:end] = b'\x00\x0f' * ((end - start) // 2) + b'\x00' * ((end - start) % 2)
+        with tempfile.NamedTemporaryFile(suffix='.mmdb') as handle:
+            handle.write(data)
+            handle.flush()
+            with override_settings(GEOIP_DATABASE_PATH=handle.name):
+                with self.assertLogs('apps.analytics.geoip', 'WARNING'):
+                    self.assertEqual(geoip.locate('41.90.12.1'), ('', ''))
+
+
+class HyperLogLogTests(SimpleTestCase):
+    # Estimates must stay within this many standard errors of the truth.
+    MAX_SIGMA = 4
+
+    def setUp(self):
+        self.rng = random.Random(16)
+        self.bound = self.MAX_SIGMA * 1.04 / math.sqrt(REGISTERS)
+
+    def visitors(self, count):
+        return [f'visitor-{self.rng.getrandbits(64)}' for _ in range(count)]
+
+    def test_error_is_bounded(self):
+        for count in (10, 100, 1000, 10000, 100000):
+            with self.subTest(count=count):
+                sketch = HyperLogLog()
+                sketch.add_many(self.visitors(count))
+                self.assertLessEqual(abs(sketch.count() - count) / count, self.bound)
+
+    def test_repeat_visitors_count_once(self):
+        visitors = self.visitors(5000)
+        sketch = HyperLogLog()
+        sketch.add_many(visitors)
+        estimate = sketch.count()
+        sketch.add_many(visitors[::-1])
+        self.assertEqual(sketch.count(), estimate)
+
+    def test_merge_equals_union(self):
+        population = self.visitors(40000)
+        days = [self.rng.sample(population, 8000) for _ in range(7)]
+        sketches = []
+        for visitors in days:
+            sketch = HyperLogLog()
+            sketch.add_many(visitors)
+            sketches.append(HyperLogLog.from_bytes(sketch.to_bytes()))
+        union = HyperLogLog()
+        union.add_many(set().union(*days))
+
+        merged = HyperLogLog.union(sketches)
+        self.assertTrue((merged.registers == union.registers).all())
+        exact = len(set().union(*days))
+        self.assertLessEqual(abs(merged.count() - exact) / exact, self.bound)
+
+    def test_empty(self):
+        self.assertEqual(HyperLogLog().count(), 0)
+        self.assertEqual(HyperLogLog.union([]).count(), 0)
+
+
+class LiveStreamCorsTests(SimpleTestCase):
+
+    def request(self, method='GET', query=b'path=/a/', origin=b'https://budgetndiostory.org'):
+        scope = {
+            'type': 'http', 'method': method, 'path': STREAM_PATH, 'query_string': query,
+            'headers': [(b'origin', origin)] if origin else [],
+        }
+        sent = []
+
+        async def receive():
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(LiveStreamApp(None)(scope, receive, send))
+        return sent[0]['status'], dict(sent[0]['headers']), b''.join(m.get('body', b'') for m in sent[1:])
+
+    def test_stream_allows_configured_origins(self):
+        status, headers, body = self.request()
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'content-type'], b'text/event-stream')
+        self.assertEqual(headers[b'access-control-allow-origin'], b'https://budgetndiostory.org')
+        self.assertIn(b'"viewers": 0', body)
+
+    def test_errors_carry_cors_headers(self):
+        status, headers, _ = self.request(query=b'')
+        self.assertEqual(status, 400)
+        self.assertEqual(headers[b'access-control-allow-origin'], b'https://budgetndiostory.org')
+        status, headers, _ = self.request(method='POST')
+        self.assertEqual(status, 405)
+        self.assertIn(b'access-control-allow-origin', headers)
+
+    def test_other_origins_are_not_allowed(self):
+        _, headers, _ = self.request(origin=b'https://example.com')
+        self.assertNotIn(b'access-control-allow-origin', headers)
+        _, headers, _ = self.request(origin=None)
+        self.assertNotIn(b'access-control-allow-origin', headers)
+
+
+class WatchTimeTests(TestCase):
+
+    def setUp(self):
+        self.video = VideoContent.objects.create(
+            title='Budget', slug='budget', platform='youtube', external_id='budget',
+            external_url='https://youtube.com/watch?v=budget', content_type='explainer', duration_seconds=20000,
+        )
+        self.day = date(2026, 10, 1)
+        self.midnight = datetime.combine(self.day + timedelta(days=1), time.min, tzinfo=site_timezone())
+
+    def event(self, minutes, event_type, position):
+        # Minutes relative to the end of ``self.day``.
+        return VideoEngagement(
+            video=self.video, session_id='s', event_type=event_type, timestamp_seconds=position,
+            created_at=self.midnight + timedelta(minutes=minutes),
+        )
+
+    def test_session_running_past_midnight_is_counted_whole(self):
+        # Played from 23:50 with a heartbeat every 20 minutes until a pause
+        # at 02:20, long after the first SESSION_GAP past the day's end.
+        events = [self.event(minutes, 'play', (minutes + 10) * 60) for minutes in range(-10, 150, 20)]
+        VideoEngagement.objects.bulk_create(events + [self.event(150, 'pause', 160 * 60)])
+
+        self.assertEqual(compute_day(self.day), 1)
+        self.assertEqual(compute_day(self.day + timedelta(days=1)), 0)
+        stats = VideoWatchStats.objects.get(day=self.day)
+        self.assertEqual((stats.sessions, stats.completions), (1, 0))
+        self.assertAlmostEqual(stats.watch_seconds, 160 * 60)
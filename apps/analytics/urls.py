@@ -1,6 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PageViewViewSet, VideoEngagementViewSet, DonorFunnelViewSet
+from .views import (
+    PageViewViewSet, VideoEngagementViewSet, DonorFunnelViewSet, BufferMetricsView,
+    BotHitsView, LiveOverviewView, LiveViewersView,
+)
+from .views_collect import collect_view
 
 router = DefaultRouter()
 router.register(r'pageviews', PageViewViewSet, basename='pageview')
@@ -8,5 +12,10 @@ router.register(r'engagement', VideoEngagementViewSet, basename='engagement')
 router.register(r'funnel', DonorFunnelViewSet, basename='funnel')
 
 urlpatterns = [
+    path('collect/', collect_view, name='analytics-collect'),
+    path('buffer/', BufferMetricsView.as_view(), name='analytics-buffer'),
+    path('bots/', BotHitsView.as_view(), name='analytics-bots'),
+    path('live/', LiveViewersView.as_view(), name='analytics-live'),
+    path('live/overview/', LiveOverviewView.as_view(), name='analytics-live-overview'),
     path('', include(router.urls)),
 ]
@@ -0,0 +1,81 @@
+"""
+Minimal user-agent parsing for page-view device, browser and OS columns.
+
+This recognises the browsers and platforms that make up nearly all real
+traffic; anything else is recorded as ``Other``. A few hundred distinct
+strings account for most requests, so results are memoised in an LRU
+cache and a repeat user agent costs a dictionary lookup.
+"""
+
+import re
+from functools import lru_cache
+
+from .bots import user_agent_bot
+
+
+CACHE_SIZE = 2048
+
+TABLET_RE = re.compile(r'iPad|Tablet|Kindle|Silk|PlayBook|Nexus (7|9|10)', re.I)
+MOBILE_RE = re.compile(r'Mobi|iPhone|iPod|Android|Windows Phone|Opera Mini', re.I)
+
+# (pattern, name) in priority order: many browsers also claim to be Chrome
+# or Safari, so the specific ones come first.
+BROWSERS = [
+    (re.compile(r'Edg(?:e|A|iOS)?/(\d+)'), 'Edge'),
+    (re.compile(r'(?:OPR|Opera)/(\d+)'), 'Opera'),
+    (re.compile(r'SamsungBrowser/(\d+)'), 'Samsung Internet'),
+    (re.compile(r'UCBrowser/(\d+)'), 'UC Browser'),
+    (re.compile(r'(?:Chrome|CriOS)/(\d+)'), 'Chrome'),
+    (re.compile(r'(?:Firefox|FxiOS)/(\d+)'), 'Firefox'),
+    (re.compile(r'Version/(\d+)[\d.]* (?:Mobile/\S+ )?Safari/'), 'Safari'),
+    (re.compile(r'(?:MSIE |Trident/.*rv:)(\d+)'), 'Internet Explorer'),
+]
+
+OPERATING_SYSTEMS = [
+    (re.compile(r'Windows Phone(?: OS)? ([\d.]+)'), 'Windows Phone'),
+    (re.compile(r'Windows NT ([\d.]+)'), 'Windows'),
+    (re.compile(r'Android ([\d]+)'), 'Android'),
+    (re.compile(r'iPad.*OS (\d+)'), 'iPadOS'),
+    (re.compile(r'(?:iPhone|CPU) OS (\d+)'), 'iOS'),
+    (re.compile(r'CrOS'), 'ChromeOS'),
+    (re.compile(r'Mac OS X'), 'macOS'),
+    (re.compile(r'Linux'), 'Linux'),
+]
+
+WINDOWS_VERSIONS = {'10.0': '10', '6.3': '8.1', '6.2': '8', '6.1': '7', '6.0': 'Vista', '5.1': 'XP'}
+
+
+def _match(table, user_agent):
+    for pattern, name in table:
+        match = pattern.search(user_agent)
+        if match:
+            return name, match.group(1) if match.groups() else None
+    return 'Other', None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_user_agent(user_agent):
+    """Return ``(device_type, browser, os)`` for a User-Agent header."""
+    if not user_agent:
+        return '', '', ''
+
+    if user_agent_bot(user_agent):
+        device_type = 'bot'
+    elif TABLET_RE.search(user_agent) or ('Android' in user_agent and 'Mobile' not in user_agent):
+        device_type = 'tablet'
+    elif MOBILE_RE.search(user_agent):
+        device_type = 'mobile'
+    else:
+        device_type = 'desktop'
+
+    browser, version = _match(BROWSERS, user_agent)
+    if version:
+        browser = f'{browser} {version}'
+
+    os_name, version = _match(OPERATING_SYSTEMS, user_agent)
+    if os_name == 'Windows':
+        version = WINDOWS_VERSIONS.get(version)
+    if version:
+        os_name = f'{os_name} {version}'
+
+    return device_type, browser[:50], os_name[:50]
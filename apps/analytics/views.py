@@ -1,20 +1,164 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.db.models import Count, Avg
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
+from rest_framework.exceptions import ValidationError as BadRequest
+from rest_framework.views import APIView
+from django.core.exceptions import ValidationError
 from django.utils import timezone
-from datetime import timedelta
-from .models import PageView, VideoEngagement, DonorFunnel
+from datetime import date, datetime, time, timedelta
+from apps.core.exports import ExportMixin
+from apps.content.models import BlogPost, VideoContent
+from apps.core.pagination import KeysetPagination
+from .bots import bot_filter
+from .buffer import analytics_buffer
+from .funnel import funnel_overview
+from .live import live_counter, requested_key
+from .models import BotHitDaily, PageView, VideoEngagement, DonorFunnel
+from .rollups import local_today, page_view_summary, site_timezone, unique_visitors, video_event_counts
+from .watch_time import watch_summary
 from .serializers import (
     PageViewSerializer, VideoEngagementSerializer, DonorFunnelSerializer
 )
 
 
-class PageViewViewSet(viewsets.ModelViewSet):
-    queryset = PageView.objects.all()
+def created_at_filters(start=None, end=None):
+    """Filter kwargs for ``created_at`` between two query-string bounds.
+
+    Each bound is a ``YYYY-MM-DD`` site-local day or an ISO datetime. An end
+    day includes the whole day, as a half-open range up to the next one.
+    """
+    def parse(value):
+        try:
+            if len(value) == 10:
+                return datetime.combine(date.fromisoformat(value), time.min, tzinfo=site_timezone()), True
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            raise BadRequest({'date': f'Invalid date or datetime: {value}'})
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment, site_timezone())
+        return moment, False
+
+    filters = {}
+    if start:
+        filters['created_at__gte'], _ = parse(start)
+    if end:
+        moment, is_day = parse(end)
+        if is_day:
+            filters['created_at__lt'] = moment + timedelta(days=1)
+        else:
+            filters['created_at__lte'] = moment
+    return filters
+
+
+class BufferedCreateMixin:
+    """Queue created events on the analytics write buffer.
+
+    Responds ``202 Accepted`` before the row exists, so the response carries
+    no serialized instance. Viewsets with a ``bot_kind`` screen out bot
+    requests first (see ``apps.analytics.bots``).
+    """
+    bot_kind = None
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if self.bot_kind and not bot_filter.screen(request, self.bot_kind):
+            return Response({'status': 'filtered'}, status=status.HTTP_202_ACCEPTED)
+        accepted = analytics_buffer.submit(
+            self.queryset.model, {'created_at': timezone.now(), **serializer.validated_data}
+        )
+        return Response(
+            {'status': 'queued' if accepted else 'dropped'}, status=status.HTTP_202_ACCEPTED
+        )
+
+
+class BufferMetricsView(APIView):
+    """Queue depth, drop counts and flush latency of this worker's write buffer,
+    and the writes its bot filter saved."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({**analytics_buffer.metrics(), 'bots': bot_filter.metrics()})
+
+
+class BotHitsView(APIView):
+    """Bot and crawler events per day, bot and kind, counted instead of written."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            end = date.fromisoformat(params['end_date']) if params.get('end_date') else local_today()
+            start = date.fromisoformat(params['start_date']) if params.get('start_date') else end - timedelta(days=29)
+        except ValueError:
+            return Response({'error': 'Dates must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = BotHitDaily.objects.filter(day__gte=start, day__lte=end).order_by('-day', '-hits')
+        days = list(rows.values('day', 'bot', 'kind', 'hits'))
+        by_bot = {}
+        for row in days:
+            by_bot[row['bot']] = by_bot.get(row['bot'], 0) + row['hits']
+        return Response({
+            'start_date': start,
+            'end_date': end,
+            'total_hits': sum(by_bot.values()),
+            'by_bot': [
+                {'bot': bot, 'hits': hits} for bot, hits in sorted(by_bot.items(), key=lambda item: -item[1])
+            ],
+            'days': days,
+        })
+
+
+class LiveViewersView(APIView):
+    """Visitors viewing one content item (``content_type``, ``content_id``) or page (``path``) right now."""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            key = requested_key(request.query_params)
+        except ValueError:
+            return Response(
+                {'error': 'content_id (a UUID) or path required'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({'viewers': live_counter.viewers(key), 'window_seconds': live_counter.window})
+
+
+class LiveOverviewView(APIView):
+    """Visitors on the site right now and the busiest content and pages."""
+    permission_classes = [IsAdminUser]
+
+    # PageView content types whose titles the overview shows.
+    content_models = {'video': VideoContent, 'post': BlogPost}
+
+    def get(self, request):
+        overview = live_counter.overview()
+        wanted = {}
+        for entry in overview['top']:
+            content_type, _, content_id = entry['key'].partition(':')
+            if content_type in self.content_models and content_id:
+                wanted.setdefault(content_type, []).append(content_id)
+        titles = {}
+        for content_type, ids in wanted.items():
+            for pk, title in self.content_models[content_type].objects.filter(pk__in=ids).values_list('pk', 'title'):
+                titles[f'{content_type}:{pk}'] = title
+        for entry in overview['top']:
+            entry['title'] = titles.get(entry['key'])
+        return Response(overview)
+
+
+class PageViewViewSet(ExportMixin, BufferedCreateMixin, viewsets.ModelViewSet):
+    queryset = PageView.objects.select_related('user')
     serializer_class = PageViewSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-created_at', '-id')
+    bot_kind = 'pageview'
+    export_filename = 'pageviews'
+    export_fields = (
+        'id', 'created_at', 'url', 'path', 'content_type', 'content_id', 'user_id', 'session_id',
+        'ip_address', 'user_agent', 'referrer', 'device_type', 'browser', 'os', 'country', 'city',
+    )
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -24,41 +168,60 @@ class PageViewViewSet(viewsets.ModelViewSet):
         if content_type:
             queryset = queryset.filter(content_type=content_type)
         
-        # Filter by date range
+        # Filter by date range. Bounds are passed as constants so PostgreSQL
+        # only scans the monthly partitions they cover.
         start_date = self.request.query_params.get('start_date', None)
         end_date = self.request.query_params.get('end_date', None)
         
-        if start_date:
-            queryset = queryset.filter(created_at__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(created_at__lte=end_date)
+        queryset = queryset.filter(**created_at_filters(start_date, end_date))
         
         return queryset
     
     @action(detail=False, methods=['get'])
     def summary(self, request):
-        today = timezone.now().date()
-        week_ago = today - timedelta(days=7)
-        
-        total_views = PageView.objects.count()
-        views_this_week = PageView.objects.filter(created_at__gte=week_ago).count()
-        
-        # Top pages
-        top_pages = PageView.objects.values('path').annotate(
-            count=Count('id')
-        ).order_by('-count')[:10]
-        
+        return Response(page_view_summary())
+
+    @action(detail=False, methods=['get'])
+    def unique_visitors(self, request):
+        """Approximate distinct visitors for a range of days (default: the last 30)."""
+        params = request.query_params
+        try:
+            end = date.fromisoformat(params['end_date']) if params.get('end_date') else local_today()
+            start = date.fromisoformat(params['start_date']) if params.get('start_date') else end - timedelta(days=29)
+        except ValueError:
+            return Response({'error': 'Dates must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({'error': 'start_date is after end_date'}, status=status.HTTP_400_BAD_REQUEST)
+
+        content_type = params.get('content_type', '')
+        content_id = params.get('content_id') or None
+        if content_id and not content_type:
+            return Response({'error': 'content_id requires content_type'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            visitors = unique_visitors(start, end, content_type, content_id)
+        except ValidationError:
+            return Response({'error': 'content_id must be a UUID'}, status=status.HTTP_400_BAD_REQUEST)
+
         return Response({
-            'total_views': total_views,
-            'views_this_week': views_this_week,
-            'top_pages': list(top_pages)
+            'start_date': start,
+            'end_date': end,
+            'content_type': content_type or None,
+            'content_id': content_id,
+            'unique_visitors': visitors,
         })
 
 
-class VideoEngagementViewSet(viewsets.ModelViewSet):
+class VideoEngagementViewSet(ExportMixin, BufferedCreateMixin, viewsets.ModelViewSet):
     queryset = VideoEngagement.objects.all()
     serializer_class = VideoEngagementSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-created_at', '-id')
+    bot_kind = 'engagement'
+    export_filename = 'video-engagement'
+    export_fields = (
+        'id', 'created_at', 'video_id', 'user_id', 'session_id', 'event_type', 'timestamp_seconds', 'metadata',
+    )
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -67,6 +230,11 @@ class VideoEngagementViewSet(viewsets.ModelViewSet):
         if video_id:
             queryset = queryset.filter(video_id=video_id)
         
+        start_date = self.request.query_params.get('start_date', None)
+        end_date = self.request.query_params.get('end_date', None)
+        
+        queryset = queryset.filter(**created_at_filters(start_date, end_date))
+        
         return queryset
     
     @action(detail=False, methods=['get'])
@@ -75,20 +243,52 @@ class VideoEngagementViewSet(viewsets.ModelViewSet):
         if not video_id:
             return Response({'error': 'video_id required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        engagements = VideoEngagement.objects.filter(video_id=video_id)
-        
-        # Aggregate by event type
-        by_event = engagements.values('event_type').annotate(
-            count=Count('id')
-        ).order_by('-count')
-        
+        by_event = video_event_counts(video_id)
+        watched = watch_summary(video_id)
         return Response({
-            'total_events': engagements.count(),
-            'by_event_type': list(by_event)
+            'total_events': sum(by_event.values()),
+            'by_event_type': [
+                {'event_type': event_type, 'count': count} for event_type, count in by_event.items()
+            ],
+            'viewing_sessions': watched.sessions,
+            'completions': watched.completions,
+            'completion_rate': round(watched.completion_rate, 4),
+            'average_watch_time': round(watched.average_watch_time, 1),
         })
 
+    @action(detail=False, methods=['get'])
+    def watch_time(self, request):
+        """Watch time, completion rate and audience retention of one video."""
+        params = request.query_params
+        video_id = params.get('video_id')
+        if not video_id:
+            return Response({'error': 'video_id required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start = date.fromisoformat(params['start_date']) if params.get('start_date') else None
+            end = date.fromisoformat(params['end_date']) if params.get('end_date') else None
+        except ValueError:
+            return Response({'error': 'Dates must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            watched = watch_summary(video_id, start, end)
+        except ValidationError:
+            return Response({'error': 'video_id must be a UUID'}, status=status.HTTP_400_BAD_REQUEST)
 
-class DonorFunnelViewSet(viewsets.ModelViewSet):
+        sessions = watched.sessions
+        return Response({
+            'video_id': video_id,
+            'start_date': start,
+            'end_date': end,
+            'viewing_sessions': sessions,
+            'completions': watched.completions,
+            'completion_rate': round(watched.completion_rate, 4),
+            'average_watch_time': round(watched.average_watch_time, 1),
+            'total_watch_time': round(watched.watch_seconds, 1),
+            # Share of viewing sessions that watched each second
+            'retention': [round(count / sessions, 4) for count in watched.retention.tolist()] if sessions else [],
+        })
+
+
+class DonorFunnelViewSet(BufferedCreateMixin, viewsets.ModelViewSet):
     queryset = DonorFunnel.objects.all()
     serializer_class = DonorFunnelSerializer
     permission_classes = [IsAuthenticated]
@@ -108,11 +308,12 @@ class DonorFunnelViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def funnel_summary(self, request):
-        summary = DonorFunnel.objects.values('stage').annotate(
-            count=Count('id'),
-            total_value=Sum('value')
-        ).order_by('stage')
-        
+        """Donors per stage, conversion and time between stages, overall and by cohort.
+
+        Served from the tables kept by ``refresh_donor_funnel``.
+        """
+        overview = funnel_overview()
         return Response({
-            'funnel_stages': list(summary)
+            'funnel_stages': overview['stages'],
+            'cohorts': overview['cohorts'],
         })
@@ -0,0 +1,26 @@
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from .bots import bot_filter
+from .ingest import InvalidPayload, parse_payload, record_events, request_context
+
+
+@csrf_exempt
+@require_POST
+def collect_view(request):
+    """Public, beacon-compatible page-view ingestion.
+
+    Accepts one event or a JSON array of events. ``sendBeacon`` posts
+    ``text/plain`` to avoid a CORS preflight, so the body is parsed as JSON
+    whatever the content type.
+    """
+    try:
+        events = parse_payload(request.body)
+    except InvalidPayload as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    if events and bot_filter.screen(request, 'pageview', len(events)):
+        context = request_context(request)
+        record_events([{**event, **context} for event in events])
+    return HttpResponse(status=204)
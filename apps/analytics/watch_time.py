@@ -0,0 +1,305 @@
+"""
+Watch time, completion and audience retention from ``VideoEngagement``.
+
+Players report ``play``, ``pause``, ``seek`` and ``complete`` events with
+the playback position in ``timestamp_seconds`` (the target position for a
+seek). The events of one ``session_id`` and video make up a viewing
+session, which is split again after ``SESSION_GAP`` of inactivity.
+
+A session watched ``[position, next position)`` between a ``play`` and
+the next ``pause`` or ``complete``. When the next event is a ``seek`` or
+another ``play``, the stretch played up to it is taken from the wall
+clock. Playback can't outrun ``MAX_PLAYBACK_RATE`` times the wall clock,
+which bounds bogus positions. A play with no later event in the session
+counts for nothing.
+
+``VideoWatchStats`` holds the result per site-local day and video: viewing
+sessions (those with a play), completions, total seconds watched, and the
+number of sessions that watched each second of the video. A session is
+counted on the day it started, with all its events: loading carries on
+past the end of the day until the sessions that started in it have been
+idle for ``SESSION_GAP``. Days are computed once ``SESSION_GAP`` past
+their end, so only a session still running at that point is cut short.
+Everything after loading runs as NumPy array operations.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.content.models import VideoContent
+
+from .models import RollupWatermark, VideoEngagement, VideoWatchStats
+from .rollups import DEFAULT_LAG, site_timezone
+
+
+PLAY, PAUSE, SEEK, COMPLETE = range(4)
+EVENT_CODES = {'play': PLAY, 'pause': PAUSE, 'seek': SEEK, 'complete': COMPLETE}
+
+SESSION_GAP = timedelta(minutes=30)
+MAX_PLAYBACK_RATE = 2
+COMPLETE_AT = 0.95  # share of the duration that counts as finished
+MAX_RETENTION_SECONDS = 6 * 3600
+CHUNK_SIZE = 20000
+WATERMARK = 'watchtime'
+
+
+@dataclass
+class WatchStats:
+    sessions: int
+    completions: int
+    watch_seconds: float
+    retention: np.ndarray  # sessions that watched each second
+
+    @property
+    def average_watch_time(self):
+        return self.watch_seconds / self.sessions if self.sessions else 0.0
+
+    @property
+    def completion_rate(self):
+        return self.completions / self.sessions if self.sessions else 0.0
+
+
+def empty_stats():
+    return WatchStats(0, 0, 0.0, np.zeros(0, dtype=np.uint32))
+
+
+def session_stats(sessions, kinds, positions, times, duration=None, started=None):
+    """Watch statistics for one video's events.
+
+    ``sessions`` holds integer session codes, ``kinds`` the ``EVENT_CODES``
+    values, ``positions`` the playback positions and ``times`` the event
+    times in epoch seconds. Events in time order (as ``load_events``
+    returns them) skip a sort. With ``started=(lo, hi)``, only sessions
+    whose first event falls in ``[lo, hi)`` are counted.
+    """
+    if not len(sessions):
+        return empty_stats()
+    if np.all(times[1:] >= times[:-1]):
+        order = np.argsort(sessions, kind='stable')
+    else:
+        order = np.lexsort((times, sessions))
+    sessions, kinds = sessions[order], kinds[order]
+    positions, times = positions[order].astype(np.float64), times[order]
+
+    # Sessionize: a new session id, or a long pause in the same one.
+    new = np.ones(len(sessions), dtype=bool)
+    new[1:] = (sessions[1:] != sessions[:-1]) | (np.diff(times) > SESSION_GAP.total_seconds())
+    session = np.cumsum(new) - 1
+
+    if started is not None:
+        first = times[new]
+        keep = ((first >= started[0]) & (first < started[1]))[session]
+        kinds, positions, times, new = kinds[keep], positions[keep], times[keep], new[keep]
+        if not len(kinds):
+            return empty_stats()
+        session = np.cumsum(new) - 1
+    count = int(session[-1]) + 1
+
+    is_play = kinds == PLAY
+    is_stop = (kinds == PAUSE) | (kinds == COMPLETE)
+
+    # Playing after event i if the last play/pause/complete up to i in its
+    # session was a play; seeks keep the current state.
+    index = np.arange(len(kinds))
+    last = np.maximum.accumulate(np.where(is_play | is_stop | new, index, 0))
+    playing = is_play[last]
+
+    # A watched stretch runs from each event while playing to the next one.
+    opens = np.flatnonzero(playing[:-1] & ~new[1:])
+    start = positions[opens]
+    elapsed = times[opens + 1] - times[opens]
+    end = np.where(is_stop[opens + 1], positions[opens + 1], start + elapsed)
+    end = np.clip(end, start, start + elapsed * MAX_PLAYBACK_RATE)
+    if duration:
+        start = np.minimum(start, duration)
+        end = np.minimum(end, duration)
+    owner = session[opens]
+
+    played = np.bincount(session[is_play], minlength=count) > 0
+    completed = np.bincount(session[kinds == COMPLETE], minlength=count) > 0
+    if duration and len(opens):
+        furthest = np.zeros(count)
+        np.maximum.at(furthest, owner, end)
+        completed |= furthest >= duration * COMPLETE_AT
+    completed &= played
+
+    return WatchStats(
+        sessions=int(played.sum()),
+        completions=int(completed.sum()),
+        watch_seconds=float((end - start).sum()),
+        retention=_retention(owner, start, end, duration),
+    )
+
+
+def _retention(owner, start, end, duration):
+    """Sessions watching each second, counting overlapping stretches once."""
+    watched = end > start
+    owner, first, stop = owner[watched], np.floor(start[watched]), np.ceil(end[watched])
+    if duration:
+        length = int(duration)
+    else:
+        length = int(stop.max()) if len(stop) else 0
+    length = min(length, MAX_RETENTION_SECONDS)
+    if not len(owner) or not length:
+        return np.zeros(length, dtype=np.uint32)
+    first = np.minimum(first, length).astype(np.int64)
+    stop = np.minimum(stop, length).astype(np.int64)
+
+    # Merge each session's overlapping stretches. Offsetting by session
+    # keeps the running maximum from leaking across sessions.
+    offset = owner.astype(np.int64) * (length + 1)
+    order = np.argsort(offset + first)
+    first, stop, offset = first[order], stop[order], offset[order]
+    reach = np.maximum.accumulate(offset + stop)
+    begins = np.ones(len(first), dtype=bool)
+    begins[1:] = offset[1:] + first[1:] > reach[:-1]
+    starts = np.flatnonzero(begins)
+    ends = np.maximum.reduceat(stop, starts)
+
+    change = np.bincount(first[starts], minlength=length + 1) - np.bincount(ends, minlength=length + 1)
+    return np.cumsum(change[:length]).astype(np.uint32)
+
+
+def load_events(queryset, codes=None):
+    """``(sessions, kinds, positions, times)`` arrays in time order, read in chunks.
+
+    ``codes`` maps session ids to their integer codes; pass the same dict
+    to give the events of several loads consistent codes.
+    """
+    codes = {} if codes is None else codes
+    columns = ([], [], [], [])
+    rows = queryset.order_by('created_at').values_list(
+        'session_id', 'event_type', 'timestamp_seconds', 'created_at'
+    )
+    rows = rows.iterator(chunk_size=CHUNK_SIZE)
+    while True:
+        chunk = list(islice(rows, CHUNK_SIZE))
+        if not chunk:
+            break
+        session_ids, event_types, positions, created = zip(*chunk)
+        size = len(chunk)
+        columns[0].append(np.fromiter((codes.setdefault(s, len(codes)) for s in session_ids), np.int64, size))
+        columns[1].append(np.fromiter((EVENT_CODES[e] for e in event_types), np.int8, size))
+        columns[2].append(np.fromiter(positions, np.float64, size))
+        columns[3].append(np.fromiter((moment.timestamp() for moment in created), np.float64, size))
+    if not columns[0]:
+        return (np.zeros(0, np.int64), np.zeros(0, np.int8), np.zeros(0), np.zeros(0))
+    return tuple(np.concatenate(column) for column in columns)
+
+
+def day_bounds(day):
+    start = datetime.combine(day, time.min, tzinfo=site_timezone())
+    return start, start + timedelta(days=1)
+
+
+def load_sessions(events, start, end):
+    """Events of the sessions that may start in ``[start, end)``, in time order.
+
+    Loads ``SESSION_GAP`` either side of the range, then follows the
+    sessions seen in the range that are still active, a ``SESSION_GAP`` at
+    a time, until none of them is.
+    """
+    codes = {}
+    until = end + SESSION_GAP
+    loaded = [load_events(events.filter(created_at__gte=start - SESSION_GAP, created_at__lt=until), codes)]
+    sessions, times = loaded[0][0], loaded[0][3]
+    active = np.intersect1d(
+        sessions[(times >= start.timestamp()) & (times < end.timestamp())],
+        sessions[times >= (until - SESSION_GAP).timestamp()],
+    )
+    while len(active):
+        session_ids = list(codes)
+        more = load_events(events.filter(
+            session_id__in=[session_ids[code] for code in active],
+            created_at__gte=until, created_at__lt=until + SESSION_GAP,
+        ), codes)
+        loaded.append(more)
+        active = np.unique(more[0])
+        until += SESSION_GAP
+    return tuple(np.concatenate(column) for column in zip(*loaded))
+
+
+def compute_day(day):
+    """Replace the day's ``VideoWatchStats`` and return the sessions counted."""
+    start, end = day_bounds(day)
+    events = VideoEngagement.objects.filter(event_type__in=list(EVENT_CODES)).order_by()
+    video_ids = list(
+        events.filter(created_at__gte=start, created_at__lt=end)
+        .values_list('video_id', flat=True).distinct()
+    )
+    durations = dict(VideoContent.objects.filter(pk__in=video_ids).values_list('pk', 'duration_seconds'))
+
+    rows = []
+    for video_id in video_ids:
+        stats = session_stats(
+            *load_sessions(events.filter(video_id=video_id), start, end),
+            duration=durations.get(video_id),
+            started=(start.timestamp(), end.timestamp()),
+        )
+        if stats.sessions:
+            rows.append(VideoWatchStats(
+                day=day, video_id=video_id, sessions=stats.sessions, completions=stats.completions,
+                watch_seconds=stats.watch_seconds, retention=stats.retention.tobytes(),
+            ))
+
+    with transaction.atomic():
+        VideoWatchStats.objects.filter(day=day).delete()
+        VideoWatchStats.objects.bulk_create(rows)
+    return sum(row.sessions for row in rows)
+
+
+def run_watch_time(rebuild=False, now=None):
+    """Compute every finished day since the last run; return ``{day: sessions}``."""
+    lag = timedelta(seconds=getattr(settings, 'ANALYTICS_ROLLUP_LAG', DEFAULT_LAG))
+    until = (now or timezone.now()) - lag - SESSION_GAP
+
+    if rebuild:
+        with transaction.atomic():
+            VideoWatchStats.objects.all().delete()
+            RollupWatermark.objects.filter(name=WATERMARK).delete()
+
+    watermark = RollupWatermark.objects.filter(name=WATERMARK).first()
+    if watermark is not None:
+        day = watermark.processed_until.astimezone(site_timezone()).date()
+    else:
+        first = VideoEngagement.objects.order_by('created_at').values_list('created_at', flat=True).first()
+        if first is None:
+            return {}
+        day = first.astimezone(site_timezone()).date()
+
+    done = {}
+    while day_bounds(day)[1] <= until:
+        done[day] = compute_day(day)
+        RollupWatermark.objects.update_or_create(
+            name=WATERMARK, defaults={'processed_until': day_bounds(day)[1]}
+        )
+        day += timedelta(days=1)
+    return done
+
+
+def watch_summary(video_id, start_day=None, end_day=None):
+    """Combined watch statistics of one video over a range of days."""
+    rows = VideoWatchStats.objects.filter(video_id=video_id)
+    if start_day:
+        rows = rows.filter(day__gte=start_day)
+    if end_day:
+        rows = rows.filter(day__lte=end_day)
+
+    stats = empty_stats()
+    for sessions, completions, seconds, retention in rows.values_list(
+        'sessions', 'completions', 'watch_seconds', 'retention'
+    ):
+        stats.sessions += sessions
+        stats.completions += completions
+        stats.watch_seconds += seconds
+        curve = np.frombuffer(bytes(retention), dtype=np.uint32)
+        if len(curve) > len(stats.retention):
+            stats.retention = np.pad(stats.retention, (0, len(curve) - len(stats.retention)))
+        stats.retention[:len(curve)] += curve
+    return stats
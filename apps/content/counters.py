@@ -0,0 +1,128 @@
+"""
+Buffered view counters for content detail endpoints.
+
+Detail GETs record a view into an in-process buffer instead of writing the
+row. The buffer is flushed periodically (and at process exit) as batched
+``UPDATE ... SET view_count = view_count + n`` statements, so concurrent
+workers never overwrite each other's increments.
+"""
+
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 10
+DEFAULT_MAX_PENDING = 1000
+
+
+class ViewCounterBuffer:
+    """Accumulates view increments keyed by (model label, pk)."""
+
+    def __init__(self, field='view_count'):
+        self.field = field
+        self._pending = defaultdict(int)
+        self._lock = threading.Lock()
+        self._timer = None
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+
+    @property
+    def max_pending(self):
+        return getattr(settings, 'VIEW_COUNTER_MAX_PENDING', DEFAULT_MAX_PENDING)
+
+    def record(self, instance, amount=1):
+        """Buffer ``amount`` views for ``instance``."""
+        key = (instance._meta.label, instance.pk)
+        with self._lock:
+            self._pending[key] += amount
+            size = len(self._pending)
+            if self._timer is None:
+                self._schedule()
+        if size >= self.max_pending:
+            try:
+                self.flush()
+            except Exception:
+                # Kept for the timer's flush; a view must not fail on it.
+                logger.exception('Flushing view counts failed')
+
+    def flush(self):
+        """Write buffered increments and return the number of rows updated."""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+        if not pending:
+            return 0
+
+        # Group pks that share a model and an increment so each group is a
+        # single UPDATE ... WHERE pk IN (...).
+        batches = defaultdict(list)
+        for (label, pk), amount in pending.items():
+            batches[(label, amount)].append(pk)
+
+        updated = 0
+        try:
+            with transaction.atomic():
+                for (label, amount), pks in batches.items():
+                    model = apps.get_model(label)
+                    updated += model.objects.filter(pk__in=pks).update(
+                        **{self.field: F(self.field) + amount}
+                    )
+        except Exception:
+            # Put the increments back so a transient database error does not
+            # lose views; they are retried on the next flush.
+            with self._lock:
+                for key, amount in pending.items():
+                    self._pending[key] += amount
+            raise
+        return updated
+
+    def _schedule(self):
+        self._timer = threading.Timer(self.flush_interval, self._run)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _run(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Flushing view counts failed; %d items kept for the next flush', len(self._pending))
+        finally:
+            # The timer thread owns its own connection; don't leak it.
+            connection.close()
+            with self._lock:
+                self._timer = None
+                if self._pending:
+                    self._schedule()
+
+
+view_counter = ViewCounterBuffer()
+
+
+def record_view(instance):
+    """Record one view of ``instance``.
+
+    With ``VIEW_COUNTER_BUFFERED = False`` the increment is written
+    immediately, which is mostly useful for comparing the two paths.
+    """
+    if getattr(settings, 'VIEW_COUNTER_BUFFERED', True):
+        view_counter.record(instance)
+    else:
+        type(instance).objects.filter(pk=instance.pk).update(view_count=F('view_count') + 1)
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        view_counter.flush()
+    except Exception:
+        logger.exception('Flushing view counts at exit failed; %d items lost', len(view_counter._pending))
@@ -0,0 +1,58 @@
+"""
+Grouped video feeds served to the homepage.
+
+``videos_by_platform()`` is cached under the ``videos`` cache namespace,
+which ``apps.content.signals`` bumps whenever a video changes.
+"""
+
+from django.core.cache import cache
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from apps.core.cache import versioned_key
+
+from .models import VideoContent
+from .serializers import VideoListSerializer
+
+
+VIDEO_CACHE_NAMESPACE = 'videos'
+BY_PLATFORM_PER_PLATFORM = 12
+BY_PLATFORM_TIMEOUT = 60 * 5
+
+
+def videos_by_platform(queryset, cache_parts=(), per_platform=BY_PLATFORM_PER_PLATFORM):
+    """Return the newest ``per_platform`` videos of ``queryset`` for each platform.
+
+    ``cache_parts`` must identify any request-specific filtering already
+    applied to ``queryset``.
+    """
+    key = versioned_key(VIDEO_CACHE_NAMESPACE, 'by_platform', per_platform, *cache_parts)
+    result = cache.get(key)
+    if result is None:
+        result = _group_by_platform(queryset, per_platform)
+        cache.set(key, result, BY_PLATFORM_TIMEOUT)
+    return result
+
+
+def _group_by_platform(queryset, per_platform):
+    # One windowed query ranks videos within each platform in the model's
+    # default order and keeps the top rows of every partition.
+    ranked = queryset.annotate(
+        platform_rank=Window(
+            RowNumber(),
+            partition_by=F('platform'),
+            order_by=[
+                F('is_featured').desc(),
+                F('published_at').desc(),
+                F('created_at').desc(),
+            ],
+        )
+    ).filter(platform_rank__lte=per_platform)
+
+    grouped = {platform: [] for platform in VideoContent.Platform.values}
+    for video in ranked:
+        grouped[video.platform].append(video)
+    return {
+        platform: VideoListSerializer(videos, many=True).data
+        for platform, videos in grouped.items()
+    }
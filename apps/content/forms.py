@@ -34,6 +34,7 @@ class VideoContentForm(forms.ModelForm):
             'content_type': forms.Select(attrs={'class': 'form-control'}),
             'duration_seconds': forms.NumberInput(attrs={'class': 'form-control'}),
             'published_at': forms.DateTimeInput(attrs={'type': 'datetime-local', 'class': 'form-control'}),
+            'scheduled_publish_at': forms.DateTimeInput(attrs={'type': 'datetime-local', 'class': 'form-control'}),
             'display_order': forms.NumberInput(attrs={'class': 'form-control'}),
         }
 
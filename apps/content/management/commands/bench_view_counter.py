@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from apps.content.counters import view_counter
+from apps.content.models import BlogPost
+from apps.content.views import BlogPostViewSet
+
+
+class Command(BaseCommand):
+    help = 'Compare detail-endpoint throughput with buffered vs per-request view counting'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per run')
+        parser.add_argument('--slug', help='Post to request (defaults to the latest published post)')
+
+    def handle(self, *args, **options):
+        posts = BlogPost.objects.filter(status=BlogPost.Status.PUBLISHED)
+        post = posts.filter(slug=options['slug']).first() if options['slug'] else posts.first()
+        if post is None:
+            raise CommandError('No published post to benchmark against; run seed_data first.')
+
+        n = options['requests']
+        view = BlogPostViewSet.as_view({'get': 'retrieve'})
+        factory = APIRequestFactory()
+
+        self.stdout.write(f'Benchmarking /posts/{post.slug}/ with {n} requests per run...')
+        results = {}
+        for label, buffered in [('per-request write', False), ('buffered', True)]:
+            results[label] = self.run(view, factory, post.slug, n, buffered)
+            elapsed = results[label]
+            self.stdout.write(f'  {label:<18} {elapsed:8.3f}s  {n / elapsed:10.1f} req/s')
+
+        speedup = results['per-request write'] / results['buffered']
+        self.stdout.write(self.style.SUCCESS(f'Buffered counting is {speedup:.2f}x faster'))
+
+    def run(self, view, factory, slug, n, buffered):
+        # Everything runs inside a rolled-back transaction so the benchmark
+        # leaves view counts untouched. The buffer flush is included in the
+        # timing so both runs pay for the same number of increments.
+        with transaction.atomic(), override_settings(
+            VIEW_COUNTER_BUFFERED=buffered,
+            VIEW_COUNTER_FLUSH_INTERVAL=3600,
+            VIEW_COUNTER_MAX_PENDING=n + 1,
+        ):
+            start = time.perf_counter()
+            for _ in range(n):
+                response = view(factory.get(f'/api/v1/content/posts/{slug}/'), slug=slug)
+                if response.status_code != 200:
+                    raise CommandError(f'Unexpected status {response.status_code}')
+            view_counter.flush()
+            elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        return elapsed
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.content.scheduler import run_scheduled_transitions
+
+
+class Command(BaseCommand):
+    help = 'Publish scheduled posts and videos and expire news items that are due'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running, checking every --interval seconds')
+        parser.add_argument('--interval', type=int, default=60, help='Seconds between checks with --loop')
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.run_once()
+            return
+
+        self.stdout.write(f'Checking for scheduled transitions every {options["interval"]}s...')
+        try:
+            while True:
+                close_old_connections()
+                self.run_once(quiet=True)
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped.')
+
+    def run_once(self, quiet=False):
+        counts = run_scheduled_transitions()
+        if quiet and not any(counts.values()):
+            return
+        summary = ', '.join(f'{count} {label}' for label, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,21 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from apps.content.search import SEARCH_DOCUMENTS, rebuild_search_index, search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild full-text search documents for posts, videos and news'
+
+    def handle(self, *args, **options):
+        for label in SEARCH_DOCUMENTS:
+            model = apps.get_model(label)
+            backend = search_backend(model)
+            if backend is None:
+                self.stdout.write(self.style.WARNING(
+                    f'{model._meta.verbose_name_plural}: no full-text backend for this database, skipped'
+                ))
+                continue
+            count = rebuild_search_index(model)
+            self.stdout.write(f'{model._meta.verbose_name_plural}: indexed {count} rows ({backend})')
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
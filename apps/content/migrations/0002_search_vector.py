@@ -0,0 +1,72 @@
+# Generated by Django 6.0.2 on 2026-10-17 09:12
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+GIN_INDEXES = [
+    ('blogpost', django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='content_blogpost_search_gin')),
+    ('newsitem', django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='content_news_search_gin')),
+    ('videocontent', django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='content_video_search_gin')),
+]
+
+# Shadow table used for search on SQLite, see apps.content.search.
+CREATE_FTS_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS content_search_fts USING fts5("
+    "kind UNINDEXED, object_id UNINDEXED, a, b, c, tokenize='porter unicode61')"
+)
+
+
+def create_search_structures(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for model_name, index in GIN_INDEXES:
+            schema_editor.add_index(apps.get_model('content', model_name), index)
+    elif vendor == 'sqlite':
+        schema_editor.execute(CREATE_FTS_TABLE)
+
+
+def drop_search_structures(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for model_name, index in GIN_INDEXES:
+            schema_editor.remove_index(apps.get_model('content', model_name), index)
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS content_search_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsitem',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='videocontent',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='blogpost',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        # GIN indexes only exist on PostgreSQL; SQLite gets the FTS5 table
+        # instead. The index state is recorded regardless of the backend.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=index)
+                for model_name, index in GIN_INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_structures, drop_search_structures),
+            ],
+        ),
+    ]
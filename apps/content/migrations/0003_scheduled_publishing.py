@@ -0,0 +1,50 @@
+# Generated by Django 6.0.2 on 2026-10-17 10:05
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def apply_schedule_flags(apps, schema_editor):
+    # Rows that relied on request-time datetime filters get the flags the
+    # public querysets now check.
+    VideoContent = apps.get_model('content', 'VideoContent')
+    NewsItem = apps.get_model('content', 'NewsItem')
+    now = timezone.now()
+    VideoContent.objects.filter(is_published=True, published_at__gt=now).update(
+        is_published=False, scheduled_publish_at=F('published_at')
+    )
+    NewsItem.objects.filter(expires_at__lte=now).update(is_active=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0002_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsitem',
+            name='is_active',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='videocontent',
+            name='scheduled_publish_at',
+            field=models.DateTimeField(blank=True, help_text='Published by the publish_scheduled command once this time passes', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['status', 'scheduled_publish_at'], name='content_blo_status_1e2818_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newsitem',
+            index=models.Index(fields=['is_active', 'expires_at'], name='content_new_is_acti_f116d5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videocontent',
+            index=models.Index(fields=['is_published', 'scheduled_publish_at'], name='content_vid_is_publ_1e0d1a_idx'),
+        ),
+        migrations.RunPython(apply_schedule_flags, migrations.RunPython.noop),
+    ]
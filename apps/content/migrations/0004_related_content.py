@@ -0,0 +1,32 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0003_scheduled_publishing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedContent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_kind', models.CharField(choices=[('post', 'Blog Post'), ('video', 'Video')], max_length=10)),
+                ('source_id', models.UUIDField()),
+                ('target_kind', models.CharField(choices=[('post', 'Blog Post'), ('video', 'Video')], max_length=10)),
+                ('target_id', models.UUIDField()),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'content_related',
+                'ordering': ['source_kind', 'source_id', 'target_kind', 'rank'],
+                'indexes': [models.Index(fields=['source_kind', 'source_id', 'target_kind', 'rank'], name='content_rel_source__753117_idx'), models.Index(fields=['target_kind', 'target_id'], name='content_rel_target__f6def3_idx')],
+                'unique_together': {('source_kind', 'source_id', 'target_kind', 'target_id')},
+            },
+        ),
+    ]
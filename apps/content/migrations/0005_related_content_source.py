@@ -0,0 +1,26 @@
+# Generated by Django 6.0.2 on 2026-10-17 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0004_related_content'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedContentSource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Blog Post'), ('video', 'Video')], max_length=10)),
+                ('item_id', models.UUIDField()),
+                ('scored_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'content_related_source',
+                'unique_together': {('kind', 'item_id')},
+            },
+        ),
+    ]
@@ -1,6 +1,8 @@
 import uuid
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
-
+from django.utils import timezone
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 
@@ -73,8 +75,16 @@ class VideoContent(models.Model):
     is_featured = models.BooleanField(default=False)
     is_published = models.BooleanField(default=True)
     published_at = models.DateTimeField(null=True, blank=True)
+    scheduled_publish_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Published by the publish_scheduled command once this time passes'
+    )
     display_order = models.PositiveSmallIntegerField(default=0)
     
+    # Search (maintained by apps.content.search)
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+    
     # Relations
     author = models.ForeignKey(
         'accounts.User',
@@ -110,6 +120,8 @@ class VideoContent(models.Model):
             models.Index(fields=['platform', 'is_published']),
             models.Index(fields=['content_type', 'is_published']),
             models.Index(fields=['-published_at']),
+            models.Index(fields=['is_published', 'scheduled_publish_at']),
+            GinIndex(fields=['search_vector'], name='content_video_search_gin'),
         ]
     
     def __str__(self):
@@ -118,6 +130,15 @@ class VideoContent(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)[:50]
+        
+        # A future publish date holds the video back until the scheduler
+        # publishes it, so public queries only need to check is_published.
+        if self.is_published and self.published_at and self.published_at > timezone.now():
+            self.is_published = False
+            self.scheduled_publish_at = self.published_at
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'is_published', 'scheduled_publish_at'}
+        
         super().save(*args, **kwargs)
 
 
@@ -209,8 +230,8 @@ class BlogPost(models.Model):
     meta_description = models.CharField(max_length=160, blank=True)
     og_image = models.ImageField(upload_to='blog/og/', blank=True)
     
-    # Search
-    search_vector = models.TextField(null=True, blank=True, editable=False)
+    # Search (maintained by apps.content.search)
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
     
     # Sponsor integration
     sponsored_by = models.ForeignKey(
@@ -234,6 +255,8 @@ class BlogPost(models.Model):
         indexes = [
             models.Index(fields=['status', '-published_at']),
             models.Index(fields=['post_type', 'status']),
+            models.Index(fields=['status', 'scheduled_publish_at']),
+            GinIndex(fields=['search_vector'], name='content_blogpost_search_gin'),
         ]
     
     def __str__(self):
@@ -264,10 +287,19 @@ class NewsItem(models.Model):
     is_breaking = models.BooleanField(default=False)
     published_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField(null=True, blank=True)
+    # Kept in step with expires_at by save() and the publish_scheduled command
+    is_active = models.BooleanField(default=True, editable=False)
+    
+    # Search (maintained by apps.content.search)
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
     
     class Meta:
         db_table = 'content_newsitem'
         ordering = ['-is_breaking', '-published_at']
+        indexes = [
+            models.Index(fields=['is_active', 'expires_at']),
+            GinIndex(fields=['search_vector'], name='content_news_search_gin'),
+        ]
     
     def __str__(self):
         return self.title
@@ -275,4 +307,48 @@ class NewsItem(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        self.is_active = self.expires_at is None or self.expires_at > timezone.now()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'is_active'}
         super().save(*args, **kwargs)
+
+
+class RelatedContent(models.Model):
+    """Precomputed content neighbours, maintained by the build_related_content command"""
+    class Kind(models.TextChoices):
+        POST = 'post', _('Blog Post')
+        VIDEO = 'video', _('Video')
+    
+    source_kind = models.CharField(max_length=10, choices=Kind.choices)
+    source_id = models.UUIDField()
+    target_kind = models.CharField(max_length=10, choices=Kind.choices)
+    target_id = models.UUIDField()
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'content_related'
+        ordering = ['source_kind', 'source_id', 'target_kind', 'rank']
+        unique_together = ['source_kind', 'source_id', 'target_kind', 'target_id']
+        indexes = [
+            models.Index(fields=['source_kind', 'source_id', 'target_kind', 'rank']),
+            models.Index(fields=['target_kind', 'target_id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.source_kind}:{self.source_id} -> {self.target_kind}:{self.target_id} ({self.score:.3f})"
+
+
+class RelatedContentSource(models.Model):
+    """When build_related_content last computed an item's neighbours, found or not"""
+    kind = models.CharField(max_length=10, choices=RelatedContent.Kind.choices)
+    item_id = models.UUIDField()
+    scored_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'content_related_source'
+        unique_together = ['kind', 'item_id']
+    
+    def __str__(self):
+        return f"{self.kind}:{self.item_id} scored {self.scored_at}"
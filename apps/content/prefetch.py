@@ -0,0 +1,50 @@
+"""
+Declarative per-action prefetch plans for viewsets.
+
+Each action declares the ``select_related``/``prefetch_related`` graph its
+serializer walks, and ``get_queryset`` applies it::
+
+    class BlogPostViewSet(PrefetchPlanMixin, viewsets.ReadOnlyModelViewSet):
+        prefetch_plans = {
+            'list': PrefetchPlan(select=['author'], prefetch=['categories']),
+            'retrieve': PrefetchPlan(select=['author', 'sponsored_by'], ...),
+        }
+
+``apps.content.tests.assert_plan_covers`` checks that a plan loads every
+relation its serializer touches.
+"""
+
+
+class PrefetchPlan:
+    """The relations a serializer needs loaded up front."""
+
+    def __init__(self, select=(), prefetch=()):
+        self.select = tuple(select)
+        self.prefetch = tuple(prefetch)
+
+    def apply(self, queryset):
+        if self.select:
+            queryset = queryset.select_related(*self.select)
+        if self.prefetch:
+            queryset = queryset.prefetch_related(*self.prefetch)
+        return queryset
+
+
+class PrefetchPlanMixin:
+    """Apply ``prefetch_plans[self.action]`` in ``get_queryset``.
+
+    A ``'default'`` entry covers actions without their own plan.
+    """
+    prefetch_plans = {}
+
+    def get_prefetch_plan(self):
+        plans = self.prefetch_plans
+        return plans.get(self.action, plans.get('default'))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        plan = self.get_prefetch_plan()
+        if plan is not None:
+            queryset = plan.apply(queryset)
+        return queryset
+
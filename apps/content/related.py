@@ -0,0 +1,291 @@
+"""
+TF-IDF related-content engine.
+
+Published posts and videos are vectorised over one shared vocabulary
+(title, excerpt/description, body, tags and category names). Rows are
+L2-normalised so a sparse dot product is their cosine similarity, and the
+top ``RELATED_TOP_K`` neighbours of every item, per target kind, are stored
+in ``RelatedContent``. The API only ever reads that table.
+
+Every item a build scores is recorded in ``RelatedContentSource``, whether
+or not it has neighbours above ``MIN_SCORE``. An incremental build only
+scores items that were never scored or were edited since, items that lost
+a neighbour, and existing items whose neighbour lists one of the new
+items would enter. IDF weights drift a little between full builds, so run
+``--full`` periodically as well.
+"""
+
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from scipy import sparse
+
+from .models import BlogPost, RelatedContent, RelatedContentSource, VideoContent
+
+
+RELATED_TOP_K = 10
+MIN_SCORE = 0.05
+CHUNK_SIZE = 256
+WRITE_BATCH_SIZE = 1000
+
+# Title and taxonomy tokens count more than body tokens.
+TITLE_WEIGHT = 3
+TAG_WEIGHT = 2
+
+TOKEN_RE = re.compile(r'[a-z0-9]{2,}')
+STOP_WORDS = frozenset('''
+    about after all also an and any are as at be been but by can could did do
+    does for from had has have he her his how if in into is it its just more
+    most no not of on one or other our out over she so some such than that the
+    their them then there these they this those through to up us was we were
+    what when where which while who will with would you your
+'''.split())
+
+POST = RelatedContent.Kind.POST
+VIDEO = RelatedContent.Kind.VIDEO
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def document(title, body, tags=()):
+    counts = Counter(tokenize(body))
+    for token in tokenize(title):
+        counts[token] += TITLE_WEIGHT
+    for token in tokenize(' '.join(tags)):
+        counts[token] += TAG_WEIGHT
+    return counts
+
+
+def load_corpus():
+    """Return ``(keys, documents, updated)`` for every published post and video.
+
+    ``keys`` holds ``(kind, id)`` pairs, and ``updated`` their ``updated_at``,
+    aligned with ``documents``.
+    """
+    keys, documents, updated = [], [], []
+
+    post_categories = defaultdict(list)
+    for post_id, name in BlogPost.categories.through.objects.filter(
+        blogpost__status=BlogPost.Status.PUBLISHED
+    ).values_list('blogpost_id', 'category__name'):
+        post_categories[post_id].append(name)
+
+    posts = BlogPost.objects.filter(status=BlogPost.Status.PUBLISHED).order_by()
+    for pk, title, excerpt, content, tags, updated_at in posts.values_list(
+        'id', 'title', 'excerpt', 'content', 'tags', 'updated_at'
+    ).iterator(chunk_size=500):
+        tags = [str(tag) for tag in tags] if isinstance(tags, list) else []
+        keys.append((POST, pk))
+        updated.append(updated_at)
+        documents.append(document(title, f'{excerpt} {content}', tags + post_categories[pk]))
+
+    video_categories = defaultdict(list)
+    for video_id, name in VideoContent.categories.through.objects.filter(
+        videocontent__is_published=True
+    ).values_list('videocontent_id', 'category__name'):
+        video_categories[video_id].append(name)
+
+    videos = VideoContent.objects.filter(is_published=True).order_by()
+    for pk, title, description, updated_at in videos.values_list(
+        'id', 'title', 'description', 'updated_at'
+    ).iterator(chunk_size=500):
+        keys.append((VIDEO, pk))
+        updated.append(updated_at)
+        documents.append(document(title, description, video_categories[pk]))
+
+    return keys, documents, updated
+
+
+def vectorize(documents):
+    """Build an L2-normalised TF-IDF matrix (documents x vocabulary)."""
+    vocabulary = {}
+    indptr, indices, data = [0], [], []
+    for counts in documents:
+        for token, count in counts.items():
+            indices.append(vocabulary.setdefault(token, len(vocabulary)))
+            data.append(count)
+        indptr.append(len(indices))
+
+    matrix = sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), indptr),
+        shape=(len(documents), len(vocabulary)),
+    )
+    # Sublinear term frequency and smoothed inverse document frequency.
+    matrix.data = 1 + np.log(matrix.data)
+    document_frequency = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    idf = np.log((1 + matrix.shape[0]) / (1 + document_frequency)) + 1
+    matrix.data *= idf[matrix.indices].astype(np.float32)
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix, dtype=np.float32)
+
+
+def top_neighbours(matrix, sources, targets, k=RELATED_TOP_K):
+    """Yield ``(source, target_rows, scores)`` for each row index in ``sources``.
+
+    ``targets`` are the row indices that may be returned as neighbours; a
+    source is never its own neighbour.
+    """
+    targets = np.asarray(targets, dtype=np.int64)
+    target_matrix = matrix[targets].T.tocsc()
+    position = np.full(matrix.shape[0], -1, dtype=np.int64)
+    position[targets] = np.arange(len(targets))
+
+    for start in range(0, len(sources), CHUNK_SIZE):
+        chunk = sources[start:start + CHUNK_SIZE]
+        similarities = (matrix[chunk] @ target_matrix).tocsr()
+        for i, source in enumerate(chunk):
+            row = slice(similarities.indptr[i], similarities.indptr[i + 1])
+            columns, scores = similarities.indices[row], similarities.data[row]
+            keep = (scores >= MIN_SCORE) & (columns != position[source])
+            columns, scores = columns[keep], scores[keep]
+            if len(scores) > k:
+                best = np.argpartition(-scores, k - 1)[:k]
+                columns, scores = columns[best], scores[best]
+            order = np.argsort(-scores, kind='stable')
+            yield source, targets[columns[order]], scores[order]
+
+
+def _affected_sources(matrix, new_targets, thresholds, keys, k):
+    """Existing sources whose top-k a newly scored target would enter."""
+    if not len(new_targets):
+        return set()
+    best = (matrix[new_targets] @ matrix.T).max(axis=0).toarray().ravel()
+    affected = set()
+    for row in np.flatnonzero(best >= MIN_SCORE):
+        minimum, count = thresholds.get(keys[row], (None, 0))
+        if count < k or best[row] > minimum:
+            affected.add(int(row))
+    return affected
+
+
+def _prune(keys):
+    """Drop rows and scoring records of items no longer published.
+
+    Returns the ``(kind, id)`` sources that lost a neighbour.
+    """
+    live = set(keys)
+    scored = set(RelatedContentSource.objects.values_list('kind', 'item_id'))
+    for kind, pk in scored - live:
+        RelatedContentSource.objects.filter(kind=kind, item_id=pk).delete()
+
+    stored_sources = set(RelatedContent.objects.values_list('source_kind', 'source_id').distinct())
+    stored_targets = set(RelatedContent.objects.values_list('target_kind', 'target_id').distinct())
+
+    for kind, pk in stored_sources - live:
+        RelatedContent.objects.filter(source_kind=kind, source_id=pk).delete()
+
+    lost = set()
+    for kind, pk in stored_targets - live:
+        rows = RelatedContent.objects.filter(target_kind=kind, target_id=pk)
+        lost.update(rows.values_list('source_kind', 'source_id'))
+        rows.delete()
+    return lost & live
+
+
+def _replace(rows_by_source, target_kind, keys):
+    by_kind = defaultdict(list)
+    for source in rows_by_source:
+        by_kind[keys[source][0]].append(keys[source][1])
+    for kind, ids in by_kind.items():
+        for start in range(0, len(ids), 500):
+            RelatedContent.objects.filter(
+                source_kind=kind, source_id__in=ids[start:start + 500], target_kind=target_kind
+            ).delete()
+
+    objects = [
+        RelatedContent(
+            source_kind=keys[source][0],
+            source_id=keys[source][1],
+            target_kind=target_kind,
+            target_id=keys[target][1],
+            score=float(score),
+            rank=rank,
+        )
+        for source, neighbours in rows_by_source.items()
+        for rank, (target, score) in enumerate(neighbours, start=1)
+    ]
+    RelatedContent.objects.bulk_create(objects, batch_size=WRITE_BATCH_SIZE)
+    return len(objects)
+
+
+def _mark_scored(sources, keys, scored_at):
+    RelatedContentSource.objects.bulk_create(
+        [RelatedContentSource(kind=keys[row][0], item_id=keys[row][1], scored_at=scored_at) for row in sources],
+        batch_size=WRITE_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['kind', 'item_id'],
+        update_fields=['scored_at'],
+    )
+
+
+def build_related(full=False, k=RELATED_TOP_K):
+    """Recompute stored neighbours and return counts of the work done."""
+    # Taken before reading, so edits made during the build are picked up
+    # by the next one.
+    started = timezone.now()
+    keys, documents, updated = load_corpus()
+    stats = {'items': len(keys), 'sources': 0, 'rows': 0}
+    if not keys:
+        if full:
+            RelatedContent.objects.all().delete()
+            RelatedContentSource.objects.all().delete()
+        return stats
+
+    matrix = vectorize(documents)
+    index = {key: row for row, key in enumerate(keys)}
+
+    with transaction.atomic():
+        if full:
+            RelatedContent.objects.all().delete()
+            RelatedContentSource.objects.all().delete()
+            new = set(range(len(keys)))
+            lost = set()
+        else:
+            lost = _prune(keys)
+            scored = {
+                (kind, pk): scored_at
+                for kind, pk, scored_at in RelatedContentSource.objects.values_list('kind', 'item_id', 'scored_at')
+            }
+            new = {
+                row for row, key in enumerate(keys)
+                if key not in scored or (updated[row] is not None and updated[row] > scored[key])
+            }
+
+        rescored = set()
+        for target_kind in (POST, VIDEO):
+            targets = [row for row, (kind, _) in enumerate(keys) if kind == target_kind]
+            if not targets:
+                continue
+
+            if full:
+                sources = range(len(keys))
+            else:
+                thresholds = {
+                    (row['source_kind'], row['source_id']): (row['minimum'], row['count'])
+                    for row in RelatedContent.objects.filter(target_kind=target_kind).order_by()
+                    .values('source_kind', 'source_id')
+                    .annotate(minimum=Min('score'), count=Count('id'))
+                }
+                new_targets = [row for row in targets if row in new]
+                sources = new | {index[key] for key in lost}
+                sources |= _affected_sources(matrix, new_targets, thresholds, keys, k)
+                sources = sorted(sources)
+
+            rows_by_source = {
+                source: list(zip(rows, scores))
+                for source, rows, scores in top_neighbours(matrix, sources, targets, k)
+            }
+            rescored.update(rows_by_source)
+            stats['sources'] += len(rows_by_source)
+            stats['rows'] += _replace(rows_by_source, target_kind, keys)
+
+        _mark_scored(sorted(rescored), keys, started)
+    return stats
@@ -0,0 +1,62 @@
+"""
+Time-based publishing transitions.
+
+Posts and videos with a ``scheduled_publish_at`` that has passed are
+published, and news items past ``expires_at`` are deactivated. Public
+querysets then only filter on ``status``/``is_published``/``is_active``
+instead of comparing datetimes on every request.
+
+Each transition is a regular ``save(update_fields=...)`` so the content
+signals invalidate the affected caches.
+"""
+
+from django.utils import timezone
+
+from .models import BlogPost, NewsItem, VideoContent
+
+
+def publish_due_posts(now):
+    due = BlogPost.objects.filter(
+        status__in=[BlogPost.Status.DRAFT, BlogPost.Status.REVIEW],
+        scheduled_publish_at__lte=now,
+    )
+    count = 0
+    for post in due:
+        post.status = BlogPost.Status.PUBLISHED
+        post.published_at = post.published_at or post.scheduled_publish_at
+        post.scheduled_publish_at = None
+        post.save(update_fields=['status', 'published_at', 'scheduled_publish_at', 'updated_at'])
+        count += 1
+    return count
+
+
+def publish_due_videos(now):
+    due = VideoContent.objects.filter(is_published=False, scheduled_publish_at__lte=now)
+    count = 0
+    for video in due:
+        video.is_published = True
+        if video.published_at is None or video.published_at > now:
+            video.published_at = video.scheduled_publish_at
+        video.scheduled_publish_at = None
+        video.save(update_fields=['is_published', 'published_at', 'scheduled_publish_at', 'updated_at'])
+        count += 1
+    return count
+
+
+def expire_news(now):
+    due = NewsItem.objects.filter(is_active=True, expires_at__lte=now)
+    count = 0
+    for item in due:
+        item.save(update_fields=['is_active'])
+        count += 1
+    return count
+
+
+def run_scheduled_transitions(now=None):
+    """Apply every transition that is due and return counts per kind."""
+    now = now or timezone.now()
+    return {
+        'posts published': publish_due_posts(now),
+        'videos published': publish_due_videos(now),
+        'news expired': expire_news(now),
+    }
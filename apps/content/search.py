@@ -0,0 +1,179 @@
+"""
+Full-text search for posts, videos and news.
+
+On PostgreSQL each searchable model keeps a weighted ``search_vector``
+tsvector column (GIN indexed) that is refreshed whenever the row is saved,
+and queries are ranked with ``ts_rank``. On SQLite the same documents are
+mirrored into an FTS5 shadow table and ranked with ``bm25``, so search can be
+exercised locally. Any other backend falls back to DRF's ``ILIKE`` search.
+"""
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import DatabaseError, connections, router
+from django.db.models import Case, F, FloatField, Value, When
+from rest_framework.filters import SearchFilter
+
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'content_search_fts'
+FTS_MAX_HITS = 1000
+
+# Indexed fields and their weight for each searchable model.
+SEARCH_DOCUMENTS = {
+    'content.blogpost': (('title', 'A'), ('excerpt', 'B'), ('content', 'C')),
+    'content.videocontent': (('title', 'A'), ('description', 'B')),
+    'content.newsitem': (('title', 'A'), ('content', 'B')),
+}
+
+# bm25 column weights standing in for the tsvector A/B/C weights. The first
+# two FTS5 columns (kind, object_id) are unindexed bookkeeping columns.
+FTS_WEIGHTS = {'A': 10.0, 'B': 4.0, 'C': 1.0}
+
+
+def search_fields(model):
+    return SEARCH_DOCUMENTS.get(model._meta.label_lower, ())
+
+
+def search_backend(model):
+    """Return ``'postgresql'``, ``'sqlite'`` or ``None`` for ``model``."""
+    if not search_fields(model):
+        return None
+    vendor = connections[router.db_for_write(model)].vendor
+    if vendor in ('postgresql', 'sqlite'):
+        return vendor
+    return None
+
+
+def search_vector(model):
+    vector = None
+    for field, weight in search_fields(model):
+        part = SearchVector(field, weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def _fts_row(model, values):
+    columns = {weight: [] for weight in FTS_WEIGHTS}
+    for (field, weight), value in zip(search_fields(model), values[1:]):
+        if value:
+            columns[weight].append(value)
+    kind = model._meta.label_lower
+    return [kind, str(values[0])] + [' '.join(columns[w]) for w in FTS_WEIGHTS]
+
+
+def update_search_index(instance):
+    """Refresh the search document for a single saved instance."""
+    model = type(instance)
+    backend = search_backend(model)
+    if backend == 'postgresql':
+        model._default_manager.filter(pk=instance.pk).update(search_vector=search_vector(model))
+    elif backend == 'sqlite':
+        values = [instance.pk] + [getattr(instance, field) for field, _ in search_fields(model)]
+        _fts_replace(model, [_fts_row(model, values)], [str(instance.pk)])
+
+
+def remove_from_search_index(instance):
+    model = type(instance)
+    if search_backend(model) == 'sqlite':
+        _fts_replace(model, [], [str(instance.pk)])
+
+
+def rebuild_search_index(model, batch_size=500):
+    """Rebuild the search documents for every row of ``model``."""
+    backend = search_backend(model)
+    if backend == 'postgresql':
+        return model._default_manager.update(search_vector=search_vector(model))
+    if backend != 'sqlite':
+        return 0
+
+    fields = ['pk'] + [field for field, _ in search_fields(model)]
+    connection = connections[router.db_for_write(model)]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE kind = %s', [model._meta.label_lower])
+    rows, count = [], 0
+    for values in model._default_manager.values_list(*fields).iterator(chunk_size=batch_size):
+        rows.append(_fts_row(model, values))
+        if len(rows) >= batch_size:
+            count += _fts_replace(model, rows)
+            rows = []
+    return count + _fts_replace(model, rows)
+
+
+def _fts_replace(model, rows, delete_ids=()):
+    connection = connections[router.db_for_write(model)]
+    placeholders = ', '.join(['%s'] * (2 + len(FTS_WEIGHTS)))
+    with connection.cursor() as cursor:
+        for object_id in delete_ids:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE kind = %s AND object_id = %s',
+                [model._meta.label_lower, object_id],
+            )
+        if rows:
+            cursor.executemany(f'INSERT INTO {FTS_TABLE} VALUES ({placeholders})', rows)
+    return len(rows)
+
+
+def search(queryset, terms):
+    """Filter ``queryset`` to rows matching ``terms``, best match first.
+
+    Matching rows are annotated with ``search_rank`` (higher is better).
+    Returns ``None`` when the database has no full-text backend.
+    """
+    model = queryset.model
+    backend = search_backend(model)
+    if backend == 'postgresql':
+        query = SearchQuery(' '.join(terms), search_type='websearch', config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank')
+    if backend == 'sqlite':
+        hits = _fts_search(model, terms)
+        if hits is None:
+            return None
+        ranks = [When(pk=pk, then=Value(rank)) for pk, rank in hits]
+        return queryset.filter(pk__in=[pk for pk, _ in hits]).annotate(
+            search_rank=Case(*ranks, default=Value(0.0), output_field=FloatField())
+        ).order_by('-search_rank')
+    return None
+
+
+def _fts_search(model, terms):
+    # Quote every term so user input can't inject FTS5 query syntax; quoted
+    # terms separated by spaces are ANDed together.
+    match = ' '.join('"%s"' % term.replace('"', '""') for term in terms)
+    weights = ', '.join(['0.0', '0.0'] + [str(w) for w in FTS_WEIGHTS.values()])
+    connection = connections[router.db_for_read(model)]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT object_id, bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+                f'WHERE kind = %s AND {FTS_TABLE} MATCH %s '
+                f'ORDER BY 2 LIMIT {FTS_MAX_HITS}',
+                [model._meta.label_lower, match],
+            )
+            rows = cursor.fetchall()
+    except DatabaseError:
+        # FTS5 table missing (migrations not applied, or SQLite built
+        # without FTS5): let the caller fall back to ILIKE search.
+        return None
+    to_python = model._meta.pk.to_python
+    # bm25 scores are negative, lower meaning more relevant.
+    return [(to_python(object_id), -score) for object_id, score in rows]
+
+
+class FullTextSearchFilter(SearchFilter):
+    """Drop-in replacement for ``SearchFilter`` backed by the search index.
+
+    Views keep declaring ``search_fields``; they are only used when the
+    database has no full-text backend and the filter falls back to
+    ``SearchFilter``'s ``ILIKE`` matching.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        results = search(queryset, terms)
+        if results is None:
+            return super().filter_queryset(request, queryset, view)
+        return results
@@ -1,5 +1,7 @@
+from django.db import models
 from rest_framework import serializers
 from .models import VideoContent, BlogPost, Playlist, Category, NewsItem
+from .stats import category_counts
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -12,10 +14,18 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'description', 'color', 'icon', 'order', 'is_active', 'video_count', 'post_count']
     
     def get_video_count(self, obj):
-        return obj.videocontent_set.filter(is_published=True).count()
+        return self.get_counts(obj)[0]
     
     def get_post_count(self, obj):
-        return obj.blogpost_set.filter(status='published').count()
+        return self.get_counts(obj)[1]
+    
+    def get_counts(self, obj):
+        # Fetch the cached count map once per serialization, shared with any
+        # sibling or nested CategorySerializer through the root context.
+        context = self.context
+        if 'category_counts' not in context:
+            context['category_counts'] = category_counts()
+        return context['category_counts'].get(obj.pk, (0, 0))
 
 
 class CategoryListSerializer(serializers.ModelSerializer):
@@ -116,25 +126,49 @@ class PlaylistSerializer(serializers.ModelSerializer):
         ]
     
     def get_video_count(self, obj):
-        return obj.videos.filter(is_published=True).count()
+        return playlist_video_count(obj)
     
     def get_total_duration(self, obj):
-        total = obj.videos.filter(is_published=True).aggregate(
-            total=models.Sum('duration_seconds')
-        )['total'] or 0
-        return total // 60
+        return playlist_total_duration(obj)
 
 
 class PlaylistListSerializer(serializers.ModelSerializer):
     """Lightweight playlist serializer"""
     video_count = serializers.SerializerMethodField()
+    total_duration = serializers.SerializerMethodField()
     
     class Meta:
         model = Playlist
-        fields = ['id', 'title', 'slug', 'thumbnail', 'is_featured', 'difficulty_level', 'video_count']
+        fields = [
+            'id', 'title', 'slug', 'thumbnail', 'is_featured', 'difficulty_level',
+            'video_count', 'total_duration'
+        ]
     
     def get_video_count(self, obj):
-        return obj.videos.filter(is_published=True).count()
+        return playlist_video_count(obj)
+    
+    def get_total_duration(self, obj):
+        return playlist_total_duration(obj)
+
+
+# PlaylistViewSet annotates these in SQL; the fallbacks keep the serializers
+# usable on plain Playlist instances.
+
+def playlist_video_count(playlist):
+    if hasattr(playlist, 'published_video_count'):
+        return playlist.published_video_count
+    return playlist.videos.filter(is_published=True).count()
+
+
+def playlist_total_duration(playlist):
+    """Total published duration in minutes."""
+    if hasattr(playlist, 'published_duration_seconds'):
+        total = playlist.published_duration_seconds
+    else:
+        total = playlist.videos.filter(is_published=True).aggregate(
+            total=models.Sum('duration_seconds')
+        )['total']
+    return (total or 0) // 60
 
 
 class BlogPostListSerializer(serializers.ModelSerializer):
@@ -0,0 +1,84 @@
+"""Cache and derived-data maintenance for content changes."""
+
+from django.db import models
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.core.cache import bump_version
+
+from .feeds import VIDEO_CACHE_NAMESPACE
+from .models import BlogPost, Category, NewsItem, Playlist, RelatedContent, RelatedContentSource, VideoContent
+from .search import remove_from_search_index, search_fields, update_search_index
+from .stats import invalidate_category_counts
+
+
+# Saves restricted to other fields (e.g. metrics syncs) can't change what a
+# category counts, so they don't need to drop the cached counts.
+PUBLICATION_FIELDS = {'is_published', 'status'}
+
+
+@receiver(post_save, sender=VideoContent)
+@receiver(post_save, sender=BlogPost)
+def content_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not PUBLICATION_FIELDS.intersection(update_fields):
+        return
+    invalidate_category_counts()
+
+
+@receiver(post_delete, sender=VideoContent)
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def content_deleted(sender, instance, **kwargs):
+    invalidate_category_counts()
+
+
+@receiver(m2m_changed, sender=VideoContent.categories.through)
+@receiver(m2m_changed, sender=BlogPost.categories.through)
+def content_recategorised(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_category_counts()
+
+
+@receiver(post_save, sender=VideoContent)
+@receiver(post_save, sender=BlogPost)
+@receiver(post_save, sender=NewsItem)
+def reindex_content(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None:
+        indexed = {field for field, _ in search_fields(sender)}
+        if not indexed.intersection(update_fields):
+            return
+    update_search_index(instance)
+
+
+@receiver(post_delete, sender=VideoContent)
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_delete, sender=NewsItem)
+def unindex_content(sender, instance, **kwargs):
+    remove_from_search_index(instance)
+
+
+@receiver(post_save, sender=VideoContent)
+@receiver(post_delete, sender=VideoContent)
+@receiver(post_save, sender=Playlist)
+@receiver(post_delete, sender=Playlist)
+def videos_changed(sender, instance, **kwargs):
+    bump_version(VIDEO_CACHE_NAMESPACE)
+
+
+@receiver(post_delete, sender=VideoContent)
+@receiver(post_delete, sender=BlogPost)
+def drop_related_content(sender, instance, **kwargs):
+    # Unpublished items are skipped at read time and pruned by the next
+    # build_related_content run; deleted ones can go straight away. Items
+    # that lose a neighbour are rescored by that run.
+    kind = RelatedContent.Kind.POST if sender is BlogPost else RelatedContent.Kind.VIDEO
+    losing = RelatedContent.objects.filter(target_kind=kind, target_id=instance.pk)
+    stale = models.Q(kind=kind, item_id=instance.pk)
+    for source_kind, source_id in losing.values_list('source_kind', 'source_id').distinct():
+        stale |= models.Q(kind=source_kind, item_id=source_id)
+    RelatedContentSource.objects.filter(stale).delete()
+    RelatedContent.objects.filter(
+        models.Q(source_kind=kind, source_id=instance.pk) |
+        models.Q(target_kind=kind, target_id=instance.pk)
+    ).delete()
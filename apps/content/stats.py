@@ -0,0 +1,50 @@
+"""
+Cached per-category content counts.
+
+The counts for every category are computed in a single query, one
+correlated subquery per content type, and cached as one ``{category_id: (video_count, post_count)}`` map, which both
+the category list endpoint and the nested category serializer read from.
+``apps.content.signals`` drops the cached map whenever publication state or
+category membership changes.
+"""
+
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import BlogPost, Category, VideoContent
+
+
+CATEGORY_COUNTS_CACHE_KEY = 'content:category_counts'
+CATEGORY_COUNTS_TIMEOUT = 60 * 15
+
+
+def _membership_count(memberships):
+    """The number of ``memberships`` (through-table rows) of the outer category."""
+    counts = memberships.filter(category=OuterRef('pk')).order_by().values('category').annotate(
+        count=Count('pk')
+    ).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def category_counts():
+    """Return ``{category_id: (published_video_count, published_post_count)}``."""
+    counts = cache.get(CATEGORY_COUNTS_CACHE_KEY)
+    if counts is None:
+        # Each count is grouped on its own through table. Joining both in
+        # one GROUP BY would produce videos x posts rows per category.
+        rows = Category.objects.order_by().annotate(
+            video_count=_membership_count(
+                VideoContent.categories.through.objects.filter(videocontent__is_published=True)
+            ),
+            post_count=_membership_count(
+                BlogPost.categories.through.objects.filter(blogpost__status=BlogPost.Status.PUBLISHED)
+            ),
+        ).values_list('id', 'video_count', 'post_count')
+        counts = {pk: (video_count, post_count) for pk, video_count, post_count in rows}
+        cache.set(CATEGORY_COUNTS_CACHE_KEY, counts, CATEGORY_COUNTS_TIMEOUT)
+    return counts
+
+
+def invalidate_category_counts():
+    cache.delete(CATEGORY_COUNTS_CACHE_KEY)
@@ -0,0 +1,169 @@
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.accounts.models import User
+from .counters import view_counter
+from .models import BlogPost, Category, RelatedContent, RelatedContentSource, VideoContent
+from .related import build_related
+from .serializers import BlogPostDetailSerializer, BlogPostListSerializer, VideoListSerializer
+from .stats import category_counts
+from .views import DETAIL_POST_PLAN, BlogPostViewSet, VideoContentViewSet
+
+
+def assert_plan_covers(plan, serializer_class, queryset, many=True, context=None):
+    """Fail if serializing ``queryset`` runs queries outside ``plan``.
+
+    The planned queryset is evaluated first, so its own queries don't count.
+    Any query issued while the serializer renders means it reached for a
+    relation the plan doesn't load. Pass the view's serializer context so
+    precomputed values such as category counts are available.
+    """
+    instances = list(plan.apply(queryset))
+    if not many:
+        instances = instances[0]
+    with CaptureQueriesContext(connections[queryset.db]) as captured:
+        serializer_class(instances, many=many, context=context or {}).data
+    if captured.captured_queries:
+        queries = '\n'.join(query['sql'] for query in captured.captured_queries)
+        raise AssertionError(
+            f'{serializer_class.__name__} ran {len(captured.captured_queries)} '
+            f'queries outside its prefetch plan:\n{queries}'
+        )
+
+
+@override_settings(VIEW_COUNTER_BUFFERED=True)
+class PostQueryCountTests(TestCase):
+    # Post detail and related must cost the same number of queries however
+    # many categories, co-authors and related items a post has.
+
+    def setUp(self):
+        cache.clear()
+        self.author = self.user('author')
+        # Detail views record into the process-wide counter; write them
+        # while the test database still exists.
+        self.addCleanup(view_counter.flush)
+
+    def user(self, name):
+        return User.objects.create_user(
+            email=f'{name}@example.com', username=name, first_name=name, last_name='Test', password=None
+        )
+
+    def video(self, number):
+        return VideoContent.objects.create(
+            title=f'Video {number}', slug=f'video-{number}', platform='youtube', external_id=str(number),
+            external_url=f'https://youtube.com/watch?v={number}', content_type='explainer', author=self.author,
+        )
+
+    def post(self, slug, related=1):
+        post = BlogPost.objects.create(
+            title=slug, slug=slug, post_type='explainer', content='Budget words', author=self.author,
+            status=BlogPost.Status.PUBLISHED, published_at=timezone.now(),
+        )
+        categories = [Category.objects.create(name=f'{slug} {i}', slug=f'{slug}-{i}') for i in range(related)]
+        post.categories.set(categories)
+        post.co_authors.set([self.user(f'{slug}-co-{i}') for i in range(related)])
+        videos = [self.video(f'{slug}-{i}') for i in range(related)]
+        posts = [
+            BlogPost.objects.create(
+                title=f'{slug} related {i}', slug=f'{slug}-related-{i}', post_type='explainer',
+                author=self.author, status=BlogPost.Status.PUBLISHED, published_at=timezone.now(),
+            )
+            for i in range(related)
+        ]
+        post.related_videos.set(videos)
+        post.related_posts.set(posts)
+        for rank, target in enumerate(posts):
+            target.categories.set(categories)
+            RelatedContent.objects.create(
+                source_kind='post', source_id=post.pk, target_kind='post', target_id=target.pk, score=1, rank=rank
+            )
+        for rank, target in enumerate(videos):
+            RelatedContent.objects.create(
+                source_kind='post', source_id=post.pk, target_kind='video', target_id=target.pk, score=1, rank=rank
+            )
+        return post
+
+    def get(self, url):
+        response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_detail(self):
+        for related in (1, 3):
+            post = self.post(f'detail-{related}', related)
+            cache.clear()
+            with self.subTest(related=related), self.assertNumQueries(6):
+                data = self.get(f'/api/v1/content/posts/{post.slug}/')
+            self.assertEqual(len(data['categories']), related)
+            self.assertEqual(len(data['co_authors']), related)
+            self.assertEqual(len(data['related_videos']), related)
+
+    def test_related(self):
+        for related in (1, 3):
+            post = self.post(f'related-{related}', related)
+            with self.subTest(related=related, type='posts'), self.assertNumQueries(4):
+                data = self.get(f'/api/v1/content/posts/{post.slug}/related/')
+            self.assertEqual(len(data), related)
+            with self.subTest(related=related, type='videos'), self.assertNumQueries(3):
+                data = self.get(f'/api/v1/content/posts/{post.slug}/related/?type=videos')
+            self.assertEqual(len(data), related)
+
+    def test_plans_cover_serializers(self):
+        post = self.post('plans', 3)
+        posts = BlogPost.objects.filter(pk=post.pk)
+        assert_plan_covers(
+            DETAIL_POST_PLAN, BlogPostDetailSerializer, posts, many=False,
+            context={'category_counts': category_counts()},
+        )
+        assert_plan_covers(BlogPostViewSet.prefetch_plans['list'], BlogPostListSerializer, BlogPost.objects.all())
+        assert_plan_covers(
+            VideoContentViewSet.prefetch_plans['default'], VideoListSerializer, VideoContent.objects.all()
+        )
+
+
+class BuildRelatedTests(TestCase):
+
+    def post(self, slug, content):
+        return BlogPost.objects.create(
+            title=slug.replace('-', ' '), slug=slug, post_type='explainer', content=content,
+            status=BlogPost.Status.PUBLISHED, published_at=timezone.now(),
+        )
+
+    def test_incremental_builds_converge(self):
+        self.post('county-budget', 'county budget allocation for health clinics')
+        self.post('county-health', 'health clinics county budget allocation')
+        # Shares no words with the others, so it never has neighbours.
+        loner = self.post('wildlife', 'elephants migrate across savannah grasslands')
+
+        first = build_related()
+        self.assertEqual(first['sources'], 3)
+        self.assertFalse(RelatedContent.objects.filter(source_id=loner.pk).exists())
+        self.assertTrue(RelatedContentSource.objects.filter(item_id=loner.pk).exists())
+        self.assertEqual(build_related()['sources'], 0)
+
+        self.post('county-roads', 'county budget allocation for roads')
+        second = build_related()
+        self.assertEqual(second['sources'], 3)  # the new post and the two lists it enters
+        self.assertEqual(build_related()['sources'], 0)
+
+    def test_edited_and_deleted_items_are_rescored(self):
+        first = self.post('county-budget', 'county budget allocation for health clinics')
+        second = self.post('county-health', 'health clinics county budget allocation')
+        build_related()
+
+        second.title = 'Wildlife'
+        second.content = 'elephants migrate across savannah grasslands'
+        second.save()
+        self.assertIn(second.pk, set(RelatedContent.objects.values_list('target_id', flat=True)))
+        build_related()
+        self.assertFalse(RelatedContent.objects.filter(source_id=second.pk).exists())
+
+        third = self.post('county-roads', 'county budget allocation for health roads')
+        build_related()
+        self.assertTrue(RelatedContent.objects.filter(source_id=first.pk, target_id=third.pk).exists())
+        third.delete()
+        self.assertFalse(RelatedContentSource.objects.filter(item_id=first.pk).exists())
+        self.assertEqual(build_related()['sources'], 1)
@@ -3,14 +3,37 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from django_filters.rest_framework import DjangoFilterBackend
-from django.utils import timezone
 from django.db import models
-from .models import VideoContent, BlogPost, Playlist, Category, NewsItem
+from apps.analytics.bots import request_bot
+from .counters import record_view
+from .feeds import videos_by_platform
+from .models import VideoContent, BlogPost, Playlist, Category, NewsItem, RelatedContent
+from .prefetch import PrefetchPlan, PrefetchPlanMixin
+from .search import FullTextSearchFilter
 from .serializers import (
     VideoListSerializer, VideoDetailSerializer,
     BlogPostListSerializer, BlogPostDetailSerializer,
-    PlaylistSerializer, CategorySerializer, NewsItemSerializer
+    PlaylistSerializer, PlaylistListSerializer, CategorySerializer, NewsItemSerializer
 )
+from .stats import category_counts
+
+
+RELATED_LIMIT = 3
+
+
+def related_items(source, source_kind, target_kind, queryset, limit=RELATED_LIMIT):
+    """Return up to ``limit`` objects from ``queryset`` related to ``source``.
+
+    Neighbours come from the table precomputed by build_related_content, in
+    rank order; targets no longer in ``queryset`` (e.g. unpublished) are skipped.
+    """
+    ranked = list(RelatedContent.objects.filter(
+        source_kind=source_kind, source_id=source.pk, target_kind=target_kind
+    ).order_by('rank').values_list('target_id', flat=True))
+    if not ranked:
+        return []
+    items = {item.pk: item for item in queryset.filter(pk__in=ranked)}
+    return [items[pk] for pk in ranked if pk in items][:limit]
 
 
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
@@ -18,12 +41,19 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = CategorySerializer
 
 
-class VideoContentViewSet(viewsets.ReadOnlyModelViewSet):
+class VideoContentViewSet(PrefetchPlanMixin, viewsets.ReadOnlyModelViewSet):
     queryset = VideoContent.objects.filter(is_published=True)
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['platform', 'content_type', 'categories', 'is_featured']
     search_fields = ['title', 'description']
     ordering_fields = ['published_at', 'view_count', 'created_at']
+    prefetch_plans = {
+        'default': PrefetchPlan(select=['author']),
+        'retrieve': PrefetchPlan(
+            select=['author', 'playlist', 'sponsored_by'],
+            prefetch=['categories'],
+        ),
+    }
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -38,21 +68,29 @@ class VideoContentViewSet(viewsets.ReadOnlyModelViewSet):
         if playlist:
             queryset = queryset.filter(playlist__slug=playlist)
         
-        # Exclude expired or future content
-        queryset = queryset.filter(
-            models.Q(published_at__lte=timezone.now()) | models.Q(published_at__isnull=True)
-        )
-        
-        return queryset.select_related('author', 'playlist', 'sponsored_by').prefetch_related('categories')
+        return queryset
+    
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        # Crawlers and link previews aren't readers.
+        if not request_bot(request):
+            record_view(instance)
+            instance.view_count += 1
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def by_platform(self, request):
-        platforms = VideoContent.Platform.values
-        result = {}
-        for platform in platforms:
-            videos = self.get_queryset().filter(platform=platform)[:12]
-            result[platform] = VideoListSerializer(videos, many=True).data
-        return Response(result)
+        playlist = request.query_params.get('playlist', '')
+        return Response(videos_by_platform(self.get_queryset(), cache_parts=[playlist]))
+    
+    @action(detail=True, methods=['get'])
+    def related(self, request, pk=None):
+        video = self.get_object()
+        videos = self.prefetch_plans['default'].apply(self.queryset)
+        related = related_items(video, RelatedContent.Kind.VIDEO, RelatedContent.Kind.VIDEO, videos)
+        serializer = VideoListSerializer(related, many=True)
+        return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def featured(self, request):
@@ -61,22 +99,49 @@ class VideoContentViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
-class BlogPostViewSet(viewsets.ReadOnlyModelViewSet):
+DETAIL_POST_PLAN = PrefetchPlan(
+    select=['author', 'sponsored_by'],
+    prefetch=[
+        'categories',
+        'co_authors',
+        models.Prefetch('related_videos', queryset=VideoContent.objects.select_related('author')),
+        models.Prefetch('related_posts', queryset=BlogPost.objects.only('id', 'title', 'slug')),
+    ],
+)
+
+
+class BlogPostViewSet(PrefetchPlanMixin, viewsets.ReadOnlyModelViewSet):
     queryset = BlogPost.objects.filter(status=BlogPost.Status.PUBLISHED)
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_fields = ['post_type', 'categories', 'author']
     search_fields = ['title', 'excerpt', 'content']
     lookup_field = 'slug'
+    prefetch_plans = {
+        'list': PrefetchPlan(select=['author'], prefetch=['categories']),
+        'retrieve': DETAIL_POST_PLAN,
+        'featured': DETAIL_POST_PLAN,
+        'related': PrefetchPlan(),
+    }
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return BlogPostDetailSerializer
         return BlogPostListSerializer
     
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('retrieve', 'featured'):
+            # Category counts for the nested CategorySerializer come from one
+            # cached query rather than two COUNTs per category.
+            context['category_counts'] = category_counts()
+        return context
+    
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        instance.view_count += 1
-        instance.save(update_fields=['view_count'])
+        # Crawlers and link previews aren't readers.
+        if not request_bot(request):
+            record_view(instance)
+            instance.view_count += 1
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
     
@@ -85,36 +150,74 @@ class BlogPostViewSet(viewsets.ReadOnlyModelViewSet):
         # Get the latest published post as featured
         featured = self.get_queryset().first()
         if featured:
-            serializer = BlogPostDetailSerializer(featured)
+            serializer = BlogPostDetailSerializer(featured, context=self.get_serializer_context())
             return Response(serializer.data)
         return Response({'detail': 'No posts available'}, status=404)
     
     @action(detail=True, methods=['get'])
     def related(self, request, slug=None):
         post = self.get_object()
-        related = post.related_posts.filter(status=BlogPost.Status.PUBLISHED)[:3]
+        if request.query_params.get('type') == 'videos':
+            videos = VideoContentViewSet.prefetch_plans['default'].apply(
+                VideoContent.objects.filter(is_published=True)
+            )
+            related = related_items(post, RelatedContent.Kind.POST, RelatedContent.Kind.VIDEO, videos)
+            return Response(VideoListSerializer(related, many=True).data)
+        
+        posts = self.prefetch_plans['list'].apply(self.queryset)
+        related = related_items(post, RelatedContent.Kind.POST, RelatedContent.Kind.POST, posts)
         serializer = BlogPostListSerializer(related, many=True)
         return Response(serializer.data)
 
 
-class PlaylistViewSet(viewsets.ReadOnlyModelViewSet):
+class PlaylistViewSet(PrefetchPlanMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Playlist.objects.all()
     serializer_class = PlaylistSerializer
     lookup_field = 'slug'
+    prefetch_plans = {
+        'retrieve': PrefetchPlan(prefetch=[
+            models.Prefetch(
+                'videos',
+                queryset=VideoContent.objects.filter(is_published=True).select_related('author'),
+            ),
+        ]),
+    }
+    
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return PlaylistListSerializer
+        return PlaylistSerializer
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        
+        published = models.Q(videos__is_published=True)
+        # Meta.ordering isn't applied to aggregate queries, so restate it.
+        return queryset.annotate(
+            published_video_count=models.Count('videos', filter=published),
+            published_duration_seconds=models.Sum('videos__duration_seconds', filter=published),
+        ).order_by(*Playlist._meta.ordering)
     
     @action(detail=True, methods=['get'])
     def videos(self, request, slug=None):
         playlist = self.get_object()
-        videos = playlist.videos.filter(is_published=True)
+        videos = playlist.videos.filter(is_published=True).select_related('author')
+        page = self.paginate_queryset(videos)
+        if page is not None:
+            serializer = VideoListSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = VideoListSerializer(videos, many=True)
         return Response(serializer.data)
 
 
 class NewsItemViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = NewsItem.objects.filter(
-        models.Q(expires_at__gt=timezone.now()) | models.Q(expires_at__isnull=True)
-    )
+    # Expired items are deactivated by the publish_scheduled command
+    queryset = NewsItem.objects.filter(is_active=True)
     serializer_class = NewsItemSerializer
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
+    search_fields = ['title', 'content']
     
     @action(detail=False, methods=['get'])
     def breaking(self, request):
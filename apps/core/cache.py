@@ -0,0 +1,47 @@
+"""
+Namespaced cache keys with bulk invalidation.
+
+Keys built with ``versioned_key()`` embed the current version of their
+namespace, so ``bump_version()`` invalidates every key in the namespace at
+once (whatever query parameters went into them) without tracking the keys.
+Stale entries simply age out of the cache.
+"""
+
+import time
+
+from django.core.cache import cache
+
+
+def _version_key(namespace):
+    return f'cache-version:{namespace}'
+
+
+def namespace_version(namespace):
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock rather than 1 so an evicted version counter
+        # can't come back to a number that old entries were stored under.
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def namespace_versions(namespaces):
+    """Return ``{namespace: version}`` for several namespaces in one round trip."""
+    keys = {_version_key(namespace): namespace for namespace in namespaces}
+    versions = {keys[key]: version for key, version in cache.get_many(keys).items()}
+    for namespace in set(namespaces) - versions.keys():
+        versions[namespace] = namespace_version(namespace)
+    return versions
+
+
+def versioned_key(namespace, *parts):
+    return ':'.join([namespace, str(namespace_version(namespace)), *map(str, parts)])
+
+
+def bump_version(namespace):
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        cache.set(_version_key(namespace), int(time.time() * 1000), None)
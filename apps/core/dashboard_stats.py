@@ -0,0 +1,127 @@
+"""
+Headline numbers for the staff dashboard.
+
+Every figure comes from four queries: one aggregate over donations, one
+``UNION ALL`` of per-table counts, one over the analytics rollups (so
+audience figures are as fresh as the last ``rollup_analytics`` run) and
+one over the donor funnel table kept by ``refresh_donor_funnel``. Results are cached with
+stale-while-revalidate semantics. A fresh value is served as is. A value
+that is older than ``DASHBOARD_STATS_FRESH_FOR`` seconds, or was
+invalidated by a write (see ``apps.core.signals``), is still served, and a
+background thread recomputes it. Only the very first request, or one after
+the entry has been evicted, waits for the queries.
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q, Sum, Value
+
+from apps.accounts.models import ConsortiumPartner, SponsorProfile, User
+from apps.analytics.funnel import funnel_overview
+from apps.analytics.models import PageViewDaily, VideoEngagementDaily
+from apps.analytics.rollups import local_today
+from apps.content.models import BlogPost, VideoContent
+from apps.core.cache import namespace_version
+from apps.newsletter.models import Subscriber
+from apps.sponsors.models import Donation
+
+
+STATS_CACHE_NAMESPACE = 'dashboard-stats'
+STATS_CACHE_KEY = 'dashboard:stats'
+STATS_LOCK_KEY = 'dashboard:stats:refreshing'
+STATS_TIMEOUT = 60 * 60 * 24  # how long a stale value may still be served
+STATS_LOCK_TIMEOUT = 60
+
+DEFAULT_FRESH_FOR = 60
+
+logger = logging.getLogger(__name__)
+
+
+def _count(queryset, name):
+    return queryset.order_by().values(kind=Value(name)).annotate(total=Count('pk')).values_list('kind', 'total')
+
+
+def compute_stats():
+    """Compute the dashboard figures from the database."""
+    donations = Donation.objects.aggregate(
+        donation_count=Count('pk'),
+        completed_donation_count=Count('pk', filter=Q(status=Donation.Status.COMPLETED)),
+        total_donations=Sum('amount', filter=Q(status=Donation.Status.COMPLETED)),
+    )
+
+    # Tables with no matching rows produce no row, hence the zero defaults.
+    counts = dict.fromkeys(
+        ['user_count', 'subscriber_count', 'video_count', 'post_count', 'sponsor_count', 'partner_count'], 0
+    )
+    counts.update(_count(User.objects.all(), 'user_count').union(
+        _count(Subscriber.objects.filter(status=Subscriber.Status.ACTIVE), 'subscriber_count'),
+        _count(VideoContent.objects.all(), 'video_count'),
+        _count(BlogPost.objects.all(), 'post_count'),
+        _count(SponsorProfile.objects.all(), 'sponsor_count'),
+        _count(ConsortiumPartner.objects.all(), 'partner_count'),
+        all=True,
+    ))
+
+    week_start = local_today() - timedelta(days=7)
+    audience = dict.fromkeys(['page_views_7d', 'video_plays_7d'], 0)
+    audience.update(PageViewDaily.objects.filter(day__gte=week_start).order_by().values(
+        kind=Value('page_views_7d')
+    ).annotate(total=Sum('views')).values_list('kind', 'total').union(
+        VideoEngagementDaily.objects.filter(day__gte=week_start, event_type='play').order_by().values(
+            kind=Value('video_plays_7d')
+        ).annotate(total=Sum('events')).values_list('kind', 'total'),
+        all=True,
+    ))
+
+    return {
+        **counts,
+        **donations,
+        **{name: total or 0 for name, total in audience.items()},
+        'total_donations': donations['total_donations'] or 0,
+        'donor_funnel': funnel_overview(cohorts=False)['stages'],
+    }
+
+
+def _store(version):
+    entry = {'stats': compute_stats(), 'computed_at': time.time(), 'version': version}
+    cache.set(STATS_CACHE_KEY, entry, STATS_TIMEOUT)
+    return entry
+
+
+def _refresh_in_background(version):
+    # cache.add is atomic, so only one worker refreshes at a time.
+    if not cache.add(STATS_LOCK_KEY, True, STATS_LOCK_TIMEOUT):
+        return
+
+    def run():
+        # A failure leaves the stale value in place; the next request retries.
+        try:
+            _store(version)
+        except Exception:
+            logger.exception('Refreshing dashboard stats failed')
+        finally:
+            cache.delete(STATS_LOCK_KEY)
+            # The thread owns its own connection; don't leak it.
+            connection.close()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def get_dashboard_stats():
+    """Return ``(stats, computed_at)``, refreshing stale values in the background."""
+    version = namespace_version(STATS_CACHE_NAMESPACE)
+    entry = cache.get(STATS_CACHE_KEY)
+    if entry is None:
+        entry = _store(version)
+
+    fresh_for = getattr(settings, 'DASHBOARD_STATS_FRESH_FOR', DEFAULT_FRESH_FOR)
+    if entry['version'] != version or time.time() - entry['computed_at'] > fresh_for:
+        _refresh_in_background(version)
+    return entry['stats'], entry['computed_at']
+
@@ -0,0 +1,115 @@
+"""
+Composite homepage feed.
+
+``/api/v1/home/`` returns every homepage section in one document. Each
+section is cached as its own fragment under a versioned namespace, so an
+edit only rebuilds the sections it touches (see ``apps.core.signals``),
+and each fragment has its own timeout. Fragments are stored with a digest
+of their JSON, which makes the feed's ETag cheap to compute: a matching
+``If-None-Match`` is answered without sending the body.
+"""
+
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from apps.accounts.models import OrganizationProfile
+from apps.accounts.serializers import ImpactStatisticsSerializer
+from apps.cms.models import Widget
+from apps.cms.serializers import WidgetListSerializer
+from apps.content.feeds import VIDEO_CACHE_NAMESPACE, videos_by_platform as group_by_platform
+from apps.content.models import NewsItem
+from apps.content.serializers import BlogPostDetailSerializer, NewsItemSerializer, VideoListSerializer
+from apps.content.stats import category_counts
+from apps.content.views import BlogPostViewSet, VideoContentViewSet
+from apps.core.cache import namespace_versions
+
+
+POSTS_CACHE_NAMESPACE = 'posts'
+NEWS_CACHE_NAMESPACE = 'news'
+ORGANIZATION_CACHE_NAMESPACE = 'organization'
+WIDGETS_CACHE_NAMESPACE = 'widgets'
+
+FEATURED_VIDEOS_LIMIT = 6
+BREAKING_NEWS_LIMIT = 3
+
+
+def featured_videos():
+    videos = VideoContentViewSet.prefetch_plans['default'].apply(VideoContentViewSet.queryset)
+    featured = videos.filter(is_featured=True)[:FEATURED_VIDEOS_LIMIT]
+    return VideoListSerializer(featured, many=True).data
+
+
+def videos_by_platform():
+    videos = VideoContentViewSet.prefetch_plans['default'].apply(VideoContentViewSet.queryset)
+    # Shares its cache entry with /videos/by_platform/ without a playlist.
+    return group_by_platform(videos, cache_parts=[''])
+
+
+def featured_post():
+    posts = BlogPostViewSet.prefetch_plans['featured'].apply(BlogPostViewSet.queryset)
+    post = posts.first()
+    if post is None:
+        return None
+    return BlogPostDetailSerializer(post, context={'category_counts': category_counts()}).data
+
+
+def breaking_news():
+    news = NewsItem.objects.filter(is_active=True, is_breaking=True)[:BREAKING_NEWS_LIMIT]
+    return NewsItemSerializer(news, many=True).data
+
+
+def impact():
+    profile = OrganizationProfile.objects.first()
+    return ImpactStatisticsSerializer(profile).data if profile else None
+
+
+def widgets():
+    return WidgetListSerializer(Widget.objects.filter(is_active=True).order_by('order'), many=True).data
+
+
+# name: (builder, cache namespace, timeout in seconds)
+HOME_SECTIONS = {
+    'featured_videos': (featured_videos, VIDEO_CACHE_NAMESPACE, 60 * 5),
+    'videos_by_platform': (videos_by_platform, VIDEO_CACHE_NAMESPACE, 60 * 5),
+    'featured_post': (featured_post, POSTS_CACHE_NAMESPACE, 60 * 5),
+    # Time-dependent content, but the expiry scheduler saves through signals too.
+    'breaking_news': (breaking_news, NEWS_CACHE_NAMESPACE, 60),
+    'impact': (impact, ORGANIZATION_CACHE_NAMESPACE, 60 * 60),
+    'widgets': (widgets, WIDGETS_CACHE_NAMESPACE, 60 * 60),
+}
+
+
+def _render(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+
+
+def home_feed():
+    """Return ``(body, etag)``, rebuilding only the fragments that expired.
+
+    The body is assembled from the cached JSON fragments without decoding
+    them again.
+    """
+    versions = namespace_versions({namespace for _, namespace, _ in HOME_SECTIONS.values()})
+    keys = {
+        name: f'home:{name}:{versions[namespace]}'
+        for name, (_, namespace, _) in HOME_SECTIONS.items()
+    }
+    cached = cache.get_many(keys.values())
+
+    fragments = {}
+    for name, (builder, _, timeout) in HOME_SECTIONS.items():
+        fragment = cached.get(keys[name])
+        if fragment is None:
+            rendered = _render(builder())
+            fragment = (hashlib.md5(rendered.encode()).hexdigest(), rendered)
+            cache.set(keys[name], fragment, timeout)
+        fragments[name] = fragment
+
+    etag = hashlib.md5(
+        ''.join(f'{name}:{digest};' for name, (digest, _) in fragments.items()).encode()
+    ).hexdigest()
+    body = '{%s}' % ','.join(f'"{name}":{rendered}' for name, (_, rendered) in fragments.items())
+    return body, etag
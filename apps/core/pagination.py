@@ -0,0 +1,78 @@
+"""
+Keyset (cursor) pagination for large, append-mostly tables.
+
+``PageNumberPagination`` runs a ``COUNT(*)`` and an ``OFFSET`` scan for every
+page, both of which grow with the table. Views over large tables can opt
+into ``KeysetPagination`` instead::
+
+    class PageViewViewSet(viewsets.ModelViewSet):
+        pagination_class = KeysetPagination
+        cursor_ordering = ('-created_at', '-id')
+
+Pages are then fetched with an indexed ``WHERE created_at < <cursor>``. No
+total is returned unless the client asks for one with ``?include_total=1``,
+in which case a planner estimate is used on PostgreSQL.
+"""
+
+from django.db import connections
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+def approximate_count(queryset):
+    """Estimate the number of rows in ``queryset`` without counting them.
+
+    Uses the PostgreSQL planner's row estimate; other databases fall back to
+    an exact ``COUNT(*)``.
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination keyed on the view's ``cursor_ordering``.
+
+    The first ordering field is the cursor position and should be indexed
+    together with the remaining tie-breaker fields. Client ``?ordering=`` is
+    ignored, since arbitrary orderings can't be served from an index.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    total_query_param = 'include_total'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.include_total = request.query_params.get(self.total_query_param) in ('1', 'true')
+        self.unpaginated_queryset = queryset
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.include_total:
+            payload['approximate_count'] = approximate_count(self.unpaginated_queryset)
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['approximate_count'] = {
+            'type': 'integer',
+            'example': 123,
+        }
+        return response_schema
@@ -0,0 +1,70 @@
+"""Invalidation of the cached homepage feed sections and dashboard stats."""
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.accounts.models import ConsortiumPartner, OrganizationProfile, SponsorProfile, User
+from apps.cms.models import Widget
+from apps.content.models import BlogPost, Category, NewsItem, VideoContent
+from apps.newsletter.models import Subscriber
+from apps.sponsors.models import Donation
+
+from .cache import bump_version
+from .dashboard_stats import STATS_CACHE_NAMESPACE
+from .home_feed import (
+    NEWS_CACHE_NAMESPACE, ORGANIZATION_CACHE_NAMESPACE, POSTS_CACHE_NAMESPACE, WIDGETS_CACHE_NAMESPACE,
+)
+
+
+# Video sections live in the ``videos`` namespace, which apps.content.signals
+# already bumps.
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def posts_changed(sender, **kwargs):
+    bump_version(POSTS_CACHE_NAMESPACE)
+
+
+@receiver(m2m_changed, sender=BlogPost.categories.through)
+def posts_recategorised(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version(POSTS_CACHE_NAMESPACE)
+
+
+@receiver(post_save, sender=NewsItem)
+@receiver(post_delete, sender=NewsItem)
+def news_changed(sender, **kwargs):
+    bump_version(NEWS_CACHE_NAMESPACE)
+
+
+@receiver(post_save, sender=OrganizationProfile)
+@receiver(post_delete, sender=OrganizationProfile)
+def organization_changed(sender, **kwargs):
+    bump_version(ORGANIZATION_CACHE_NAMESPACE)
+
+
+@receiver(post_save, sender=Widget)
+@receiver(post_delete, sender=Widget)
+def widgets_changed(sender, **kwargs):
+    bump_version(WIDGETS_CACHE_NAMESPACE)
+
+
+@receiver(post_save, sender=Donation)
+@receiver(post_delete, sender=Donation)
+@receiver(post_save, sender=Subscriber)
+@receiver(post_delete, sender=Subscriber)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=VideoContent)
+@receiver(post_delete, sender=VideoContent)
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_save, sender=SponsorProfile)
+@receiver(post_delete, sender=SponsorProfile)
+@receiver(post_save, sender=ConsortiumPartner)
+@receiver(post_delete, sender=ConsortiumPartner)
+def dashboard_stats_changed(sender, **kwargs):
+    bump_version(STATS_CACHE_NAMESPACE)
@@ -73,6 +73,7 @@ urlpatterns = [
     
     # Dashboard
     path('dashboard/', views_crud.dashboard, name='dashboard'),
+    path('api/dashboard/stats/', views_crud.dashboard_stats_api, name='dashboard_stats_api'),
     
     # Accounts URLs
     path('dashboard/users/', views_crud.AccountsListView.as_view(), {'model': 'users'}, name='user-list'),
@@ -89,8 +90,8 @@ urlpatterns = [
     # Content - Videos
     path('dashboard/videos/', views_crud.VideoListView.as_view(), name='video-list'),
     path('dashboard/videos/create/', views_crud.VideoCreateView.as_view(), name='video-create'),
-    path('dashboard/videos/<int:pk>/edit/', views_crud.VideoUpdateView.as_view(), name='video-update'),
-    path('dashboard/videos/<int:pk>/delete/', views_crud.VideoDeleteView.as_view(), name='video-delete'),
+    path('dashboard/videos/<uuid:pk>/edit/', views_crud.VideoUpdateView.as_view(), name='video-update'),
+    path('dashboard/videos/<uuid:pk>/delete/', views_crud.VideoDeleteView.as_view(), name='video-delete'),
     
     # Content - Playlists
     path('dashboard/playlists/', views_crud.PlaylistListView.as_view(), name='playlist-list'),
@@ -101,8 +102,8 @@ urlpatterns = [
     # Content - Blog Posts
     path('dashboard/posts/', views_crud.BlogPostListView.as_view(), name='blogpost-list'),
     path('dashboard/posts/create/', views_crud.BlogPostCreateView.as_view(), name='blogpost-create'),
-    path('dashboard/posts/<int:pk>/edit/', views_crud.BlogPostUpdateView.as_view(), name='blogpost-update'),
-    path('dashboard/posts/<int:pk>/delete/', views_crud.BlogPostDeleteView.as_view(), name='blogpost-delete'),
+    path('dashboard/posts/<uuid:pk>/edit/', views_crud.BlogPostUpdateView.as_view(), name='blogpost-update'),
+    path('dashboard/posts/<uuid:pk>/delete/', views_crud.BlogPostDeleteView.as_view(), name='blogpost-delete'),
     
     # Content - News
     path('dashboard/news/', views_crud.NewsItemListView.as_view(), name='newsitem-list'),
@@ -113,20 +114,20 @@ urlpatterns = [
     # Newsletter - Subscribers
     path('dashboard/subscribers/', views_crud.SubscriberListView.as_view(), name='subscriber-list'),
     path('dashboard/subscribers/create/', views_crud.SubscriberCreateView.as_view(), name='subscriber-create'),
-    path('dashboard/subscribers/<int:pk>/edit/', views_crud.SubscriberUpdateView.as_view(), name='subscriber-update'),
-    path('dashboard/subscribers/<int:pk>/delete/', views_crud.SubscriberDeleteView.as_view(), name='subscriber-delete'),
+    path('dashboard/subscribers/<uuid:pk>/edit/', views_crud.SubscriberUpdateView.as_view(), name='subscriber-update'),
+    path('dashboard/subscribers/<uuid:pk>/delete/', views_crud.SubscriberDeleteView.as_view(), name='subscriber-delete'),
     
     # Newsletter - Campaigns
     path('dashboard/campaigns/', views_crud.NewsletterCampaignListView.as_view(), name='campaign-list'),
     path('dashboard/campaigns/create/', views_crud.NewsletterCampaignCreateView.as_view(), name='campaign-create'),
-    path('dashboard/campaigns/<int:pk>/edit/', views_crud.NewsletterCampaignUpdateView.as_view(), name='campaign-update'),
-    path('dashboard/campaigns/<int:pk>/delete/', views_crud.NewsletterCampaignDeleteView.as_view(), name='campaign-delete'),
+    path('dashboard/campaigns/<uuid:pk>/edit/', views_crud.NewsletterCampaignUpdateView.as_view(), name='campaign-update'),
+    path('dashboard/campaigns/<uuid:pk>/delete/', views_crud.NewsletterCampaignDeleteView.as_view(), name='campaign-delete'),
     
     # Sponsors - Donations
     path('dashboard/donations/', views_crud.DonationListView.as_view(), name='donation-list'),
     path('dashboard/donations/create/', views_crud.DonationCreateView.as_view(), name='donation-create'),
-    path('dashboard/donations/<int:pk>/edit/', views_crud.DonationUpdateView.as_view(), name='donation-update'),
-    path('dashboard/donations/<int:pk>/delete/', views_crud.DonationDeleteView.as_view(), name='donation-delete'),
+    path('dashboard/donations/<uuid:pk>/edit/', views_crud.DonationUpdateView.as_view(), name='donation-update'),
+    path('dashboard/donations/<uuid:pk>/delete/', views_crud.DonationDeleteView.as_view(), name='donation-delete'),
     
     # Sponsors - Deliverables
     path('dashboard/deliverables/', views_crud.DeliverableListView.as_view(), name='deliverable-list'),
@@ -1,3 +1,6 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib import messages
@@ -5,6 +8,8 @@ from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
+from django.core import signing
+from django.db.models import Q
 
 # Accounts models
 from apps.accounts.models import User, DonorProfile, SponsorProfile, ConsortiumPartner, OrganizationProfile
@@ -34,6 +39,10 @@ from apps.sponsors.forms import (
     SponsorshipDeliverableForm, SponsorAssetForm
 )
 
+from apps.analytics.middleware import track_content
+
+from .dashboard_stats import get_dashboard_stats
+
 
 # ==================== ACCOUNTS VIEWS ====================
 
@@ -43,32 +52,196 @@ class AdminRequiredMixin(UserPassesTestMixin):
         return self.request.user.is_staff
 
 
-class AccountsListView(AdminRequiredMixin, ListView):
+class KeysetPage:
+    """Page of a keyset-paginated list, with cursors for its neighbours"""
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+    
+    def has_next(self):
+        return self.next_cursor is not None
+    
+    def has_previous(self):
+        return self.previous_cursor is not None
+    
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class DashboardListMixin:
+    """Server-side paging, sorting, search and filtering for dashboard lists.
+    
+    ``sort_fields`` maps ``?sort=`` values (``-`` prefix for descending) to
+    model fields, ``search_fields`` are matched against ``?q=`` and
+    ``filter_fields`` are exact-match query parameters. ``list_fields``
+    restricts the columns loaded to the ones the template shows.
+    
+    With ``keyset = True`` pages are addressed by ``?after=``/``?before=``
+    cursors on the sort field and pk instead of OFFSET and COUNT, so the
+    last page of a 100k-row table costs the same as the first.
+    """
+    paginate_by = 50
+    list_select_related = ()
+    list_fields = None
+    sort_fields = {'created': 'created_at'}
+    default_sort = '-created'
+    search_fields = ()
+    filter_fields = ()
+    keyset = False
+    
+    def get_base_queryset(self):
+        return self.model._default_manager.all()
+    
+    def get_queryset(self):
+        queryset = self.get_base_queryset()
+        if self.list_select_related:
+            queryset = queryset.select_related(*self.list_select_related)
+        if self.list_fields:
+            queryset = queryset.only(*self.list_fields)
+        
+        for field in self.filter_fields:
+            value = self.request.GET.get(field)
+            if value:
+                queryset = queryset.filter(**{field: value})
+        
+        search = self.request.GET.get('q', '').strip()
+        if search and self.search_fields:
+            condition = Q()
+            for field in self.search_fields:
+                condition |= Q(**{f'{field}__icontains': search})
+            queryset = queryset.filter(condition)
+        
+        return queryset.order_by(*self.get_ordering())
+    
+    def get_sort(self):
+        sort = self.request.GET.get('sort', self.default_sort)
+        return sort if sort.lstrip('-') in self.sort_fields else self.default_sort
+    
+    def get_ordering(self):
+        sort = self.get_sort()
+        prefix = '-' if sort.startswith('-') else ''
+        # pk breaks ties so pages never overlap or skip rows
+        return [prefix + self.sort_fields[sort.lstrip('-')], prefix + 'pk']
+    
+    def paginate_queryset(self, queryset, page_size):
+        if not self.keyset:
+            return super().paginate_queryset(queryset, page_size)
+        
+        field, _ = self.get_ordering()
+        descending = field.startswith('-')
+        field = field.lstrip('-')
+        
+        after = self._decode_cursor(self.request.GET.get('after'), field)
+        before = self._decode_cursor(self.request.GET.get('before'), field)
+        if before is not None:
+            # Walk backwards from the cursor, then restore display order.
+            rows = list(self._seek(queryset, field, before, not descending).reverse()[:page_size + 1])
+            has_more = len(rows) > page_size
+            rows = rows[:page_size][::-1]
+            page = KeysetPage(
+                rows,
+                next_cursor=self._encode_cursor(rows[-1], field) if rows else None,
+                previous_cursor=self._encode_cursor(rows[0], field) if has_more else None,
+            )
+        else:
+            if after is not None:
+                queryset = self._seek(queryset, field, after, descending)
+            rows = list(queryset[:page_size + 1])
+            has_more = len(rows) > page_size
+            rows = rows[:page_size]
+            page = KeysetPage(
+                rows,
+                next_cursor=self._encode_cursor(rows[-1], field) if has_more else None,
+                previous_cursor=self._encode_cursor(rows[0], field) if after is not None and rows else None,
+            )
+        return (None, page, page.object_list, page.has_other_pages())
+    
+    def _seek(self, queryset, field, cursor, descending):
+        value, pk = cursor
+        op = 'lt' if descending else 'gt'
+        return queryset.filter(
+            Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'pk__{op}': pk})
+        )
+    
+    def _encode_cursor(self, obj, field):
+        return signing.dumps([str(getattr(obj, field)), str(obj.pk)], compress=True)
+    
+    def _decode_cursor(self, cursor, field):
+        if not cursor:
+            return None
+        try:
+            value, pk = signing.loads(cursor)
+            opts = self.model._meta
+            return opts.get_field(field).to_python(value), opts.pk.to_python(pk)
+        except Exception:
+            # A stale or mangled cursor just starts from the first page.
+            return None
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['sort'] = self.get_sort()
+        context['search'] = self.request.GET.get('q', '')
+        return context
+
+
+class AccountsListView(AdminRequiredMixin, DashboardListMixin, ListView):
     """List view for all account-related models"""
     template_name = 'dashboard/accounts/list.html'
+    context_object_name = 'items'
+    account_lists = {
+        'users': {
+            'title': 'Users',
+            'model': User,
+            'columns': ['Email', 'Role', 'Verified', 'Created'],
+            'list_fields': ['email', 'username', 'is_staff', 'is_verified', 'date_joined'],
+            'sort_fields': {'email': 'email', 'joined': 'date_joined'},
+            'default_sort': '-joined',
+            'search_fields': ['email', 'username', 'first_name', 'last_name'],
+        },
+        'donors': {
+            'title': 'Donors',
+            'model': DonorProfile,
+            'columns': ['User', 'Type', 'Total Donated', 'Donations'],
+            'list_select_related': ['user'],
+            'list_fields': ['user__email', 'donor_type', 'total_donated', 'donation_count'],
+            'sort_fields': {'total': 'total_donated', 'donations': 'donation_count'},
+            'default_sort': '-total',
+            'search_fields': ['user__email', 'user__first_name', 'user__last_name'],
+        },
+        'sponsors': {
+            'title': 'Sponsors',
+            'model': SponsorProfile,
+            'columns': ['Company', 'Level', 'Contract Value', 'Status'],
+            'list_fields': ['company_name', 'level', 'contract_value', 'is_active'],
+            'sort_fields': {'company': 'company_name', 'value': 'contract_value'},
+            'default_sort': '-value',
+            'search_fields': ['company_name'],
+        },
+        'partners': {
+            'title': 'Partners',
+            'model': ConsortiumPartner,
+            'columns': ['Name', 'Website', 'Active', 'Joined'],
+            'list_fields': ['name', 'website', 'is_active', 'joined_date'],
+            'sort_fields': {'name': 'name', 'joined': 'joined_date'},
+            'default_sort': 'name',
+            'search_fields': ['name'],
+        },
+    }
+    
+    def setup(self, request, *args, **kwargs):
+        super().setup(request, *args, **kwargs)
+        self.model_type = kwargs.get('model', 'users')
+        self.account_list = self.account_lists[self.model_type]
+        for attr in ('model', 'list_select_related', 'list_fields', 'sort_fields', 'default_sort', 'search_fields'):
+            if attr in self.account_list:
+                setattr(self, attr, self.account_list[attr])
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        model_type = self.kwargs.get('model', 'users')
-        
-        if model_type == 'users':
-            context['title'] = 'Users'
-            context['items'] = User.objects.all()
-            context['columns'] = ['Email', 'Role', 'Verified', 'Created']
-        elif model_type == 'donors':
-            context['title'] = 'Donors'
-            context['items'] = DonorProfile.objects.all().select_related('user')
-            context['columns'] = ['User', 'Type', 'Total Donated', 'Donations']
-        elif model_type == 'sponsors':
-            context['title'] = 'Sponsors'
-            context['items'] = SponsorProfile.objects.all().select_related('user')
-            context['columns'] = ['Company', 'Level', 'Contract Value', 'Status']
-        elif model_type == 'partners':
-            context['title'] = 'Partners'
-            context['items'] = ConsortiumPartner.objects.all()
-            context['columns'] = ['Name', 'Website', 'Active', 'Joined']
-        
-        context['model'] = model_type
+        context['title'] = self.account_list['title']
+        context['columns'] = self.account_list['columns']
+        context['model'] = self.model_type
         return context
 
 
@@ -113,14 +286,14 @@ class CategoryDeleteView(AdminRequiredMixin, DeleteView):
         return super().form_valid(form)
 
 
-class VideoListView(AdminRequiredMixin, ListView):
+class VideoListView(AdminRequiredMixin, DashboardListMixin, ListView):
     model = VideoContent
     template_name = 'dashboard/content/video_list.html'
     context_object_name = 'videos'
-    ordering = ['-created_at']
-    
-    def get_queryset(self):
-        return VideoContent.objects.all().select_related('author', 'playlist')
+    list_fields = ['title', 'slug', 'platform', 'content_type', 'view_count', 'is_published']
+    sort_fields = {'created': 'created_at', 'title': 'title', 'views': 'view_count'}
+    search_fields = ['title', 'slug']
+    filter_fields = ['platform', 'content_type']
 
 
 class VideoCreateView(AdminRequiredMixin, CreateView):
@@ -194,14 +367,16 @@ class PlaylistDeleteView(AdminRequiredMixin, DeleteView):
         return super().form_valid(form)
 
 
-class BlogPostListView(AdminRequiredMixin, ListView):
+class BlogPostListView(AdminRequiredMixin, DashboardListMixin, ListView):
     model = BlogPost
     template_name = 'dashboard/content/blogpost_list.html'
     context_object_name = 'posts'
-    ordering = ['-created_at']
-    
-    def get_queryset(self):
-        return BlogPost.objects.all().select_related('author')
+    list_select_related = ['author']
+    # Leaves out the content/content_html bodies; author only needs what User.__str__ shows
+    list_fields = ['title', 'slug', 'post_type', 'status', 'view_count', 'author__email', 'author__role']
+    sort_fields = {'created': 'created_at', 'title': 'title', 'views': 'view_count'}
+    search_fields = ['title', 'slug']
+    filter_fields = ['status', 'post_type']
 
 
 class BlogPostCreateView(AdminRequiredMixin, CreateView):
@@ -277,14 +452,14 @@ class NewsItemDeleteView(AdminRequiredMixin, DeleteView):
 
 # ==================== NEWSLETTER VIEWS ====================
 
-class SubscriberListView(AdminRequiredMixin, ListView):
+class SubscriberListView(AdminRequiredMixin, DashboardListMixin, ListView):
     model = Subscriber
     template_name = 'dashboard/newsletter/subscriber_list.html'
     context_object_name = 'subscribers'
-    ordering = ['-created_at']
-    
-    def get_queryset(self):
-        return Subscriber.objects.all()
+    keyset = True
+    list_fields = ['email', 'first_name', 'last_name', 'status', 'subscribed_at', 'created_at']
+    search_fields = ['email']
+    filter_fields = ['status']
 
 
 class SubscriberCreateView(AdminRequiredMixin, CreateView):
@@ -360,14 +535,18 @@ class NewsletterCampaignDeleteView(AdminRequiredMixin, DeleteView):
 
 # ==================== SPONSORS VIEWS ====================
 
-class DonationListView(AdminRequiredMixin, ListView):
+class DonationListView(AdminRequiredMixin, DashboardListMixin, ListView):
     model = Donation
     template_name = 'dashboard/sponsors/donation_list.html'
     context_object_name = 'donations'
-    ordering = ['-created_at']
-    
-    def get_queryset(self):
-        return Donation.objects.all().select_related('donor__user')
+    keyset = True
+    list_select_related = ['donor__user']
+    list_fields = [
+        'amount', 'currency', 'payment_method', 'status', 'created_at',
+        'donor__user__email', 'donor__user__first_name', 'donor__user__last_name',
+    ]
+    search_fields = ['donor__user__email', 'receipt_number', 'transaction_id']
+    filter_fields = ['status', 'payment_method']
 
 
 class DonationCreateView(AdminRequiredMixin, CreateView):
@@ -481,24 +660,29 @@ def dashboard(request):
     """Main dashboard view"""
     if not request.user.is_staff:
         raise PermissionDenied
-    
+
+    stats, _ = get_dashboard_stats()
     context = {
-        'user_count': User.objects.count(),
-        'subscriber_count': Subscriber.objects.filter(status='active').count(),
-        'video_count': VideoContent.objects.count(),
-        'post_count': BlogPost.objects.count(),
-        'donation_total': sum(d.amount for d in Donation.objects.filter(status='completed')),
-        # Additional context for new dashboard
-        'recent_videos': VideoContent.objects.all().order_by('-created_at')[:5],
-        'recent_posts': BlogPost.objects.all().order_by('-created_at')[:5],
-        'sponsor_count': SponsorProfile.objects.count(),
-        'partner_count': ConsortiumPartner.objects.count(),
-        'donation_count': Donation.objects.count(),
-        'total_donations': sum(d.amount for d in Donation.objects.filter(status='completed')),
+        **stats,
+        'donation_total': stats['total_donations'],
+        'recent_videos': VideoContent.objects.only('title', 'created_at').order_by('-created_at')[:5],
+        'recent_posts': BlogPost.objects.only('title', 'created_at').order_by('-created_at')[:5],
     }
     return render(request, 'dashboard/index.html', context)
 
 
+def dashboard_stats_api(request):
+    """Dashboard figures as JSON for the admin frontend"""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Staff access required'}, status=403)
+
+    stats, computed_at = get_dashboard_stats()
+    return JsonResponse({
+        **stats,
+        'computed_at': datetime.fromtimestamp(computed_at, tz=dt_timezone.utc),
+    })
+
+
 def public_videos(request):
     """Public video listing"""
     videos = VideoContent.objects.filter(is_published=True).order_by('-published_at')
@@ -508,6 +692,7 @@ def public_videos(request):
 def public_video_detail(request, slug):
     """Public video detail"""
     video = get_object_or_404(VideoContent, slug=slug, is_published=True)
+    track_content(request, video)
     return render(request, 'public/video_detail.html', {'video': video})
 
 
@@ -520,6 +705,7 @@ def public_blog(request):
 def public_blog_detail(request, slug):
     """Public blog post detail"""
     post = get_object_or_404(BlogPost, slug=slug, status='published')
+    track_content(request, post)
     return render(request, 'public/blog_detail.html', {'post': post})
 
 
@@ -0,0 +1,27 @@
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from django.views.decorators.http import require_GET
+
+from .home_feed import home_feed
+
+
+@require_GET
+def home_feed_view(request):
+    """All homepage sections in one conditional JSON response.
+
+    A plain Django view rather than a DRF one: the feed is public, so
+    there's no authentication or session lookup to pay for.
+    """
+    body, etag = home_feed()
+    etag = quote_etag(etag)
+    # Weak comparison, as compression middleware or a CDN may weaken the tag.
+    client_etags = [tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))]
+    if etag in client_etags or '*' in client_etags:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    # Let browsers and the CDN keep a copy but revalidate it on every load.
+    patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+    return response
@@ -0,0 +1,21 @@
+# Generated by Django 6.0.2 on 2026-10-17 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsletter', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emaillog',
+            index=models.Index(fields=['-created_at', '-id'], name='newsletter__created_26f717_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emaillog',
+            index=models.Index(fields=['campaign', '-created_at'], name='newsletter__campaig_32a65e_idx'),
+        ),
+    ]
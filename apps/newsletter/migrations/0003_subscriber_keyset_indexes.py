@@ -0,0 +1,21 @@
+# Generated by Django 6.0.2 on 2026-10-17 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsletter', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscriber',
+            index=models.Index(fields=['-created_at', '-id'], name='newsletter__created_2217f3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscriber',
+            index=models.Index(fields=['status', '-created_at'], name='newsletter__status_9ac9df_idx'),
+        ),
+    ]
@@ -59,6 +59,10 @@ class Subscriber(models.Model):
     class Meta:
         db_table = 'newsletter_subscriber'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['status', '-created_at']),
+        ]
     
     def __str__(self):
         return f"{self.email} ({self.status})"
@@ -168,3 +172,7 @@ class EmailLog(models.Model):
     class Meta:
         db_table = 'newsletter_emaillog'
         unique_together = ['campaign', 'subscriber']
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['campaign', '-created_at']),
+        ]
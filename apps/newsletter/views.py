@@ -4,6 +4,8 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.utils import timezone
 import uuid
+from apps.core.exports import ExportMixin
+from apps.core.pagination import KeysetPagination
 from .models import Subscriber, NewsletterCampaign, EmailLog
 from .serializers import (
     SubscriberSerializer, SubscriberCreateSerializer,
@@ -131,10 +133,17 @@ class NewsletterCampaignViewSet(viewsets.ModelViewSet):
         return Response({'message': 'Campaign queued for sending'})
 
 
-class EmailLogViewSet(viewsets.ReadOnlyModelViewSet):
+class EmailLogViewSet(ExportMixin, viewsets.ReadOnlyModelViewSet):
     queryset = EmailLog.objects.all()
     serializer_class = EmailLogSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-created_at', '-id')
+    export_filename = 'email-logs'
+    export_fields = (
+        'id', 'created_at', 'campaign_id', 'subscriber_id', 'subscriber__email', 'message_id',
+        'sent_at', 'delivered_at', 'opened_at', 'clicked_at', 'bounced_at', 'complained_at', 'clicked_links',
+    )
     
     def get_queryset(self):
         queryset = super().get_queryset()
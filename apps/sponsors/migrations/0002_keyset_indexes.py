@@ -0,0 +1,21 @@
+# Generated by Django 6.0.2 on 2026-10-17 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sponsors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['-created_at', '-id'], name='sponsors_do_created_2aa945_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['status', '-created_at'], name='sponsors_do_status_4a24a2_idx'),
+        ),
+    ]
@@ -66,6 +66,10 @@ class Donation(models.Model):
     class Meta:
         db_table = 'sponsors_donation'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['status', '-created_at']),
+        ]
     
     def __str__(self):
         return f"{self.donor.user.email} - {self.amount} {self.currency}"
@@ -6,6 +6,8 @@ from django.db.models import Sum, Count
 from django.utils import timezone
 import uuid
 from django.shortcuts import render
+from apps.core.exports import ExportMixin
+from apps.core.pagination import KeysetPagination
 from .models import Donation, SponsorshipDeliverable, SponsorAsset
 from .serializers import (
     DonationSerializer, DonationCreateSerializer,
@@ -13,9 +15,17 @@ from .serializers import (
 )
 
 
-class DonationViewSet(viewsets.ModelViewSet):
+class DonationViewSet(ExportMixin, viewsets.ModelViewSet):
     queryset = Donation.objects.all()
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-created_at', '-id')
+    export_filename = 'donations'
+    export_fields = (
+        'id', 'created_at', 'completed_at', 'donor_id', 'donor__user__email', 'amount', 'currency',
+        'payment_method', 'status', 'transaction_id', 'payment_provider', 'is_recurring',
+        'recurring_frequency', 'campaign_source', 'landing_page', 'receipt_number',
+    )
     
     def get_serializer_class(self):
         if self.action == 'create':